@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+#
+# Per-user storage locations for the audio converter
+
+"""Application paths
+
+Resolves the per‑user directories where the converter keeps persistent
+state (job journal) and disposable caches, following the XDG base
+directory conventions on Unix and ``%LOCALAPPDATA%`` on Windows.
+"""
+
+
+import os
+
+APP_NAME = "audio_converter"
+
+
+def _base_dir(xdg_variable: str, unix_default: str) -> str:
+    if os.name == "nt":
+        return os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    return os.environ.get(xdg_variable) or os.path.expanduser(unix_default)
+
+
+def user_data_dir() -> str:
+    """Return (and create) the directory for persistent state."""
+    path = os.path.join(_base_dir("XDG_DATA_HOME", "~/.local/share"),
+                        APP_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def user_cache_dir() -> str:
+    """Return (and create) the directory for disposable caches."""
+    path = os.path.join(_base_dir("XDG_CACHE_HOME", "~/.cache"), APP_NAME)
+    if os.name == "nt":
+        path = os.path.join(path, "cache")
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -9,17 +9,97 @@ Requires **FFmpeg** to be installed and available in your ``PATH``.
 """
 
 
+import asyncio
 import os
+import sqlite3
+from collections import deque
 import subprocess
 import threading
+import time
 import tkinter as tk
-from abc import ABC, abstractmethod
-from typing import Dict, List
+from typing import (Any, Callable, Deque, Dict, Iterable, List, Optional,
+                    Tuple)
 
 from tkinter import filedialog, messagebox
 
 import ttkbootstrap as ttk
-from ttkbootstrap.constants import DANGER, SUCCESS
+from ttkbootstrap.constants import DANGER, INFO, SUCCESS, WARNING
+
+from batch_converter import (BatchConverter, output_collisions,
+                             output_filename)
+from concurrency_governor import ConcurrencyGovernor, LoadSample
+from conversion_engine import (ConversionCancelled, ConversionScheduler,
+                               default_worker_count, engine_loop)
+from conversion_manifest import ConversionManifest
+from cost_model import BatchEstimate, BatchForecast, CostModel
+from conversion_strategies import (QUALITY_PRESETS, SUPPORTED_FORMATS,
+                                   AudioConversionStrategy,
+                                   default_strategies)
+from ffmpeg_capabilities import FFmpegCapabilities, select_encoders
+from ffmpeg_progress import BatchProgress, ProgressState
+from folder_scanner import (BackgroundScanner, ScannedFile, scan_directory,
+                            stat_files)
+from job_journal import JobJournal
+from job_queue import (HIGH, LOW, NORMAL, PRIORITY_NAMES, JobQueue,
+                       estimated_duration)
+from loudness import LoudnessCache, LoudnessNormalizer
+from media_probe import MediaInfo, MetadataProber, ProbeCache
+from output_staging import OutputStager
+from remote_workers import WorkerPool
+from source_dedup import DedupSavings, DuplicateGroups, find_duplicates
+from trace_events import Tracer, span, start_tracing, stop_tracing
+from virtual_list import Column, VirtualList
+from waveform import Waveform, WaveformCache, WaveformGenerator
+
+#: Milliseconds between two runs of the UI update pump.
+UI_PUMP_INTERVAL = 50
+
+#: Milliseconds the selection and settings must stay unchanged before the
+#: pre‑flight estimate is recomputed.
+ESTIMATE_DELAY = 300
+
+
+def format_size(size_bytes: int) -> str:
+    """Return *size_bytes* as a short KB/MB string."""
+    return (f"{size_bytes / 1024:.1f} KB" if size_bytes < 1024 * 1024
+            else f"{size_bytes / (1024 * 1024):.1f} MB")
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Return *seconds* as ``H:MM:SS`` (or ``M:SS``); blank if unknown."""
+    if seconds is None:
+        return ""
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return (f"{hours}:{minutes:02d}:{secs:02d}" if hours
+            else f"{minutes}:{secs:02d}")
+
+
+def format_estimate(estimate: BatchEstimate) -> str:
+    """Return the predicted output size and conversion time of a batch."""
+    return (f"≈ {format_size(int(estimate.size))}, "
+            f"{format_duration(estimate.seconds)} to convert")
+
+
+def format_waveform(waveform: Optional[Waveform]) -> str:
+    """Return a sparkline of *waveform*, flagging clipping and silence."""
+    if waveform is None:
+        return ""
+    if waveform.silent:
+        return "silent"
+    return waveform.sparkline() + (" ⚠" if waveform.clipped else "")
+
+
+def format_priority(priority: Optional[int]) -> str:
+    """Return an arrow for a raised or lowered priority; blank if normal."""
+    return {HIGH: "↑", LOW: "↓"}.get(priority or NORMAL, "")
+
+
+def format_optional(value: Any, unit: str = "", scale: float = 1) -> str:
+    """Return *value* divided by *scale* with *unit*; blank if unknown."""
+    if value is None:
+        return ""
+    return f"{value / scale:g}{unit}" if scale != 1 else f"{value}{unit}"
 
 
 class AudioConverterApp:
@@ -39,37 +119,111 @@ class AudioConverterApp:
         """
         self.root: tk.Tk = root
         self.root.title("Audio Converter")
-        self.root.geometry("800x600")
+        self.root.geometry("880x600")
         self.root.minsize(700, 550)
 
         # ------------------------------------------------------------------
         # Conversion parameters
         # ------------------------------------------------------------------
         self.source_files: List[str] = []
+        self.file_sizes: Dict[str, int] = {}
+        self.media_info: Dict[str, MediaInfo] = {}
+        self.priorities: Dict[str, int] = {}
+        # Folders added; their sub‑directories are kept in the output
+        self.source_roots: List[str] = []
+        self._probed: List[Tuple[str, Optional[MediaInfo]]] = []
+        self._probed_lock = threading.Lock()
+        try:
+            probe_cache: Optional[ProbeCache] = ProbeCache()
+        except (OSError, sqlite3.Error):
+            probe_cache = None  # probing still works, just uncached
+        self.prober = MetadataProber(probe_cache)
+        self.waveforms: Dict[str, Optional[Waveform]] = {}
+        self._rendered: List[Tuple[str, Optional[Waveform]]] = []
+        self._rendered_lock = threading.Lock()
+        try:
+            waveform_cache: Optional[WaveformCache] = WaveformCache()
+        except (OSError, sqlite3.Error):
+            waveform_cache = None
+        self.waveform_generator = WaveformGenerator(waveform_cache)
+        try:
+            self.loudness_cache: Optional[LoudnessCache] = LoudnessCache()
+        except (OSError, sqlite3.Error):
+            self.loudness_cache = None
+        try:
+            self.cost_model: Optional[CostModel] = CostModel.load()
+        except OSError:
+            self.cost_model = None
+        self._estimate_after: Optional[str] = None
+        self._estimate_generation = 0
+        self.scanner: Optional[BackgroundScanner] = None
+        self.filter_text_var: tk.StringVar = tk.StringVar()
+        self.filter_format_var: tk.StringVar = tk.StringVar(
+            value="All Formats")
+        self.filter_min_size_var: tk.StringVar = tk.StringVar()
         self.output_directory: str = os.path.expanduser("~/Music")
         self.source_directory: str = os.path.expanduser("~/Music")
-        self.supported_formats: List[str] = ["mp3", "wav", "ogg",
-                                             "flac", "aac", "m4a"]
+        self.supported_formats: List[str] = list(SUPPORTED_FORMATS)
         self.source_format: tk.StringVar = tk.StringVar(value="All Formats")
         self.target_format: tk.StringVar = tk.StringVar(value="mp3")
+        self.extra_formats: Dict[str, tk.BooleanVar] = {
+            fmt: tk.BooleanVar(value=False) for fmt in self.supported_formats
+        }
         self.quality_var: tk.StringVar = tk.StringVar(value="High")
+        self.workers_var: tk.IntVar = tk.IntVar(value=default_worker_count())
+        self.skip_unchanged_var: tk.BooleanVar = tk.BooleanVar(value=True)
+        self.hash_sources_var: tk.BooleanVar = tk.BooleanVar(value=False)
+        self.split_long_files_var: tk.BooleanVar = tk.BooleanVar(value=False)
+        self.stream_copy_var: tk.BooleanVar = tk.BooleanVar(value=True)
+        self.stage_outputs_var: tk.BooleanVar = tk.BooleanVar(value=False)
+        self.normalize_var: tk.BooleanVar = tk.BooleanVar(value=False)
+        self.dedup_var: tk.BooleanVar = tk.BooleanVar(value=False)
+        self.timeout_minutes_var: tk.IntVar = tk.IntVar(value=0)
+        self.adaptive_workers_var: tk.BooleanVar = tk.BooleanVar(value=True)
+        self.trace_batches_var: tk.BooleanVar = tk.BooleanVar(value=False)
+        self.remote_workers_var: tk.StringVar = tk.StringVar()
 
         # Conversion state
         self.conversion_queue: List[str] = []
         self.is_converting: bool = False
+        self.scheduler: Optional[ConversionScheduler] = None
+        self.batch_progress: Optional[BatchProgress] = None
+        self._ui_calls: Deque[Callable[[], None]] = deque()
+        self._status_message: Optional[str] = None
+        self._status_lock = threading.Lock()
+        self.converter: Optional[BatchConverter] = None
+        self.batch_hash_sources: bool = False
+        self.batch_dedup: bool = False
+        self.batch_settings: Dict[str, Any] = {}
+        self.batch_media_info: Dict[str, MediaInfo] = {}
+        self.batch_forecast: Optional[BatchForecast] = None
+        self.batch_tracer: Optional[Tracer] = None
+        self.batch_governor: Optional[ConcurrencyGovernor] = None
+        self.batch_jobs: Dict[str, Tuple[int, float]] = {}
+        self.batch_id: Optional[int] = None
+        self.batch_queue: Optional[JobQueue[str]] = None
+        self.journal: Optional[JobJournal] = None
+        try:
+            self.journal = JobJournal()
+        except (OSError, sqlite3.Error):
+            pass  # conversions still work, just not resumably
 
         # Strategy registry
-        self._conversion_strategies: Dict[str, AudioConversionStrategy] = {
-            "mp3": Mp3ConversionStrategy(),
-            "ogg": OggConversionStrategy(),
-            "flac": FlacConversionStrategy(),
-            "wav": WavConversionStrategy(),
-            "aac": AacM4aConversionStrategy(),
-            "m4a": AacM4aConversionStrategy(),
-        }
+        self._conversion_strategies: Dict[str, AudioConversionStrategy] = (
+            default_strategies())
+        # Formats the local FFmpeg cannot write, with the reason; filled in
+        # by discover_ffmpeg(), which may have to query and time FFmpeg
+        self.unsupported_formats: Dict[str, str] = {}
+        engine_loop().submit(self.discover_ffmpeg())
 
         # Build UI
         self.create_main_layout()
+        for variable in (self.target_format, self.quality_var,
+                         self.workers_var, self.stream_copy_var,
+                         self.normalize_var, *self.extra_formats.values()):
+            variable.trace_add("write", lambda *_: self.schedule_estimate())
+        self.check_unfinished_batch()
+        self.pump_ui()
 
     # --------------------------------------------------------------------- #
     # Menu
@@ -84,24 +238,54 @@ class AudioConverterApp:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Select Files", command=self.select_files)
+        file_menu.add_command(label="Add Folder", command=self.select_folder)
         file_menu.add_command(label="Set Output Directory",
                               command=self.select_output_directory)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.root.destroy)
+        file_menu.add_command(label="Exit", command=self.exit_app)
 
         # ------------------------- Conversion -----------------------------
         conversion_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Conversion", menu=conversion_menu)
         conversion_menu.add_command(label="Start Conversion",
                                     command=self.start_conversion)
+        conversion_menu.add_command(label="Resume Unfinished Batch",
+                                    command=self.resume_conversion)
+        conversion_menu.add_command(label="Cancel Conversion",
+                                    command=self.cancel_conversion)
         conversion_menu.add_command(label="Clear Selection",
                                     command=self.clear_selection)
+        conversion_menu.add_separator()
+        conversion_menu.add_checkbutton(label="Record Trace",
+                                        variable=self.trace_batches_var)
+        conversion_menu.add_command(label="Export Trace…",
+                                    command=self.export_trace)
 
         # ---------------------------- Help --------------------------------
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="About", command=self.show_about)
 
+    def export_trace(self) -> None:
+        """Save the trace of the last recorded batch as Chrome JSON."""
+        if self.batch_tracer is None:
+            messagebox.showinfo(
+                "Export Trace",
+                "No trace recorded yet. Enable Conversion → Record Trace "
+                "and run a batch first.")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Chrome trace", "*.json")],
+            initialfile="audio_converter_trace.json")
+        if not path:
+            return
+        try:
+            self.batch_tracer.save(path)
+        except OSError as exc:
+            messagebox.showerror("Export Trace",
+                                 f"Could not write the trace: {exc}")
+
     def show_about(self) -> None:
         """Display a modal *About* dialog."""
         messagebox.showinfo(
@@ -157,12 +341,21 @@ class AudioConverterApp:
             command=self.select_files,
         ).pack(side=tk.LEFT, padx=(0, 10))
 
+        # Add‑folder button
+        ttk.Button(
+            file_section_lbl_frame,
+            text="Add Folder",
+            command=self.select_folder,
+        ).pack(side=tk.LEFT, padx=(0, 10))
+
         # File counter
         self.files_label = ttk.Label(
             file_section_lbl_frame,
             text="No files selected",
         )
         self.files_label.pack(side=tk.LEFT, padx=5)
+        self.estimate_label = ttk.Label(file_section_lbl_frame, text="")
+        self.estimate_label.pack(side=tk.LEFT, padx=5)
 
         # --------------------- Selected‑files listbox ---------------------
         files_lbl_frame = ttk.Labelframe(
@@ -170,26 +363,59 @@ class AudioConverterApp:
         )
         files_lbl_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
 
-        self.files_listbox = tk.Listbox(
-            files_lbl_frame,
-            font=("Helvetica", 10),
-            selectmode=tk.EXTENDED,
-            height=6,
-            borderwidth=1,
-            relief="solid",
-        )
+        # Filters (view only: every selected file is still converted)
+        filter_frame = ttk.Frame(files_lbl_frame)
+        filter_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 8))
 
-        # Scrollbar
-        y_scrollbar = ttk.Scrollbar(
-            files_lbl_frame, orient="vertical",
-            command=self.files_listbox.yview,
+        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT,
+                                                     padx=(0, 5))
+        ttk.Entry(filter_frame, textvariable=self.filter_text_var,
+                  width=20).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(filter_frame, text="Format:").pack(side=tk.LEFT,
+                                                     padx=(0, 5))
+        ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_format_var,
+            values=["All Formats"] + self.supported_formats,
+            state="readonly",
+            width=12,
+        ).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(filter_frame, text="Min size (MB):").pack(side=tk.LEFT,
+                                                            padx=(0, 5))
+        ttk.Entry(filter_frame, textvariable=self.filter_min_size_var,
+                  width=6).pack(side=tk.LEFT)
+        for variable in (self.filter_text_var, self.filter_format_var,
+                         self.filter_min_size_var):
+            variable.trace_add("write", lambda *_: self.apply_file_filter())
+
+        self.files_list = VirtualList(
+            files_lbl_frame,
+            columns=[
+                Column("name", "Name", 160),
+                Column("priority", "Pri", 35, formatter=format_priority),
+                Column("waveform", "Waveform", 130,
+                       formatter=format_waveform),
+                Column("format", "Format", 60),
+                Column("size", "Size", 80, anchor=tk.E,
+                       formatter=format_size),
+                Column("duration", "Duration", 70, anchor=tk.E,
+                       formatter=format_duration),
+                Column("codec", "Codec", 60,
+                       formatter=lambda codec: codec or ""),
+                Column("bitrate", "Bitrate", 75, anchor=tk.E,
+                       formatter=lambda bitrate: format_optional(
+                           bitrate and round(bitrate / 1000), " kb/s")),
+                Column("sample_rate", "Rate", 65, anchor=tk.E,
+                       formatter=lambda rate: format_optional(
+                           rate, " kHz", 1000)),
+                Column("channels", "Ch", 35, anchor=tk.E,
+                       formatter=format_optional),
+            ],
         )
-        self.files_listbox.configure(yscrollcommand=y_scrollbar.set)
 
         self.create_listbox_context_menu()
 
-        self.files_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.files_list.pack(fill=tk.BOTH, expand=True)
 
         # ------------------------- Output settings ------------------------
         output_section_lbl_frame = ttk.Labelframe(
@@ -226,32 +452,138 @@ class AudioConverterApp:
             width=10,
         ).pack(side=tk.LEFT)
 
+        # Additional formats encoded from the same decode
+        also_button = ttk.Menubutton(format_frame, text="Also…")
+        also_menu = tk.Menu(also_button, tearoff=0)
+        for fmt in self.supported_formats:
+            also_menu.add_checkbutton(label=fmt,
+                                      variable=self.extra_formats[fmt])
+        also_button.config(menu=also_menu)
+        also_button.pack(side=tk.LEFT, padx=(10, 0))
+
         ttk.Label(format_frame,
                   text="Quality:"
                   ).pack(side=tk.LEFT, padx=(20, 10))
         ttk.Combobox(
             format_frame,
             textvariable=self.quality_var,
-            values=["Low", "Medium", "High", "Lossless"],
+            values=QUALITY_PRESETS,
             state="readonly",
             width=10,
         ).pack(side=tk.LEFT)
 
+        ttk.Label(format_frame,
+                  text="Workers:"
+                  ).pack(side=tk.LEFT, padx=(20, 10))
+        ttk.Spinbox(
+            format_frame,
+            textvariable=self.workers_var,
+            from_=1,
+            to=max(64, default_worker_count()),
+            width=5,
+        ).pack(side=tk.LEFT)
+        ttk.Checkbutton(
+            format_frame,
+            text="Adaptive",
+            variable=self.adaptive_workers_var,
+        ).pack(side=tk.LEFT, padx=(10, 0))
+
+        ttk.Label(format_frame,
+                  text="Timeout (min):"
+                  ).pack(side=tk.LEFT, padx=(20, 10))
+        ttk.Spinbox(
+            format_frame,
+            textvariable=self.timeout_minutes_var,
+            from_=0,
+            to=600,
+            width=5,
+        ).pack(side=tk.LEFT)
+
+        # Incremental conversion
+        incremental_frame = ttk.Frame(output_section_lbl_frame)
+        incremental_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ttk.Checkbutton(
+            incremental_frame,
+            text="Skip unchanged files",
+            variable=self.skip_unchanged_var,
+        ).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(
+            incremental_frame,
+            text="Verify by content hash",
+            variable=self.hash_sources_var,
+        ).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(
+            incremental_frame,
+            text="Encode duplicates once",
+            variable=self.dedup_var,
+        ).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(
+            incremental_frame,
+            text="Split long files into parallel segments",
+            variable=self.split_long_files_var,
+        ).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(
+            incremental_frame,
+            text="Remux matching codecs",
+            variable=self.stream_copy_var,
+        ).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(
+            incremental_frame,
+            text="Stage in scratch dir",
+            variable=self.stage_outputs_var,
+        ).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(
+            incremental_frame,
+            text="Normalize loudness (EBU R128)",
+            variable=self.normalize_var,
+        ).pack(side=tk.LEFT)
+
+        # Worker daemons (see remote_workers.py)
+        remote_frame = ttk.Frame(output_section_lbl_frame)
+        remote_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ttk.Label(remote_frame, text="Remote Workers:",
+                  width=15).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Entry(remote_frame, textvariable=self.remote_workers_var
+                  ).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Label(remote_frame,
+                  text="host:port or unix:/path, comma‑separated",
+                  font=("Helvetica", 9, "italic"),
+                  ).pack(side=tk.LEFT, padx=(10, 0))
+
         # ------------------------ Conversion section ----------------------
         conversion_section_lbl_frame = ttk.Labelframe(
             main_container_frame, text="Conversion", padding=15
         )
         conversion_section_lbl_frame.pack(fill=tk.X)
 
+        progress_frame = ttk.Frame(conversion_section_lbl_frame)
+        progress_frame.pack(fill=tk.X, pady=(0, 10))
+
         self.progress_var = tk.DoubleVar(value=0.0)
         self.progress_bar = ttk.Progressbar(
-            conversion_section_lbl_frame,
+            progress_frame,
             variable=self.progress_var,
             orient=tk.HORIZONTAL,
             mode="determinate",
             length=100,
         )
-        self.progress_bar.pack(fill=tk.X, pady=(0, 10))
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        # Live concurrency gauge
+        self.concurrency_label = ttk.Label(progress_frame, text="",
+                                           width=24, anchor=tk.E)
+        self.concurrency_label.pack(side=tk.RIGHT, padx=(10, 0))
+        self.concurrency_var = tk.DoubleVar(value=0.0)
+        ttk.Progressbar(
+            progress_frame,
+            variable=self.concurrency_var,
+            orient=tk.HORIZONTAL,
+            mode="determinate",
+            length=60,
+            bootstyle=INFO,
+        ).pack(side=tk.RIGHT, padx=(10, 0))
 
         self.status_label = ttk.Label(
             conversion_section_lbl_frame,
@@ -281,8 +613,25 @@ class AudioConverterApp:
         )
         self.convert_btn.pack(side=tk.LEFT, padx=(0, 10))
 
+        self.cancel_btn = ttk.Button(
+            buttons_frame,
+            text="Cancel",
+            command=self.cancel_conversion,
+            bootstyle=WARNING,
+            state="disabled",
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.resume_btn = ttk.Button(
+            buttons_frame,
+            text="Resume",
+            command=self.resume_conversion,
+            state="disabled",
+        )
+        self.resume_btn.pack(side=tk.LEFT, padx=(0, 10))
+
         ttk.Button(buttons_frame, text="Exit",
-                   command=self.root.destroy).pack(side=tk.LEFT)
+                   command=self.exit_app).pack(side=tk.LEFT)
 
     # --------------------------------------------------------------------- #
     # List‑box helpers
@@ -290,14 +639,25 @@ class AudioConverterApp:
 
     def create_listbox_context_menu(self) -> None:
         """Add *Right‑click* context actions to the listbox."""
-        self.context_menu = tk.Menu(self.files_listbox, tearoff=0)
+        self.context_menu = tk.Menu(self.files_list, tearoff=0)
         self.context_menu.add_command(label="Remove Selected",
                                       command=self.remove_selected_files)
         self.context_menu.add_command(label="Remove All",
                                       command=self.clear_selection)
-
-        self.files_listbox.bind("<Button-3>", self.show_context_menu)
-        self.files_listbox.bind("<Double-Button-1>", self.preview_file)
+        priority_menu = tk.Menu(self.context_menu, tearoff=0)
+        for level in (HIGH, NORMAL, LOW):
+            priority_menu.add_command(
+                label=PRIORITY_NAMES[level],
+                command=lambda level=level: self.set_selected_priority(level))
+        self.context_menu.add_cascade(label="Priority", menu=priority_menu)
+
+        self.files_list.bind_row("<Button-3>",
+                                 lambda event, _key: self.show_context_menu(
+                                     event))
+        self.files_list.bind_row("<Double-Button-1>",
+                                 lambda event, _key: self.preview_file(event))
+        self.files_list.bind("<<VirtualListRendered>>",
+                             lambda _e: self.request_waveforms())
 
     def show_context_menu(self, event: tk.Event) -> None:  # noqa: D401
         """Display the context menu."""
@@ -308,28 +668,46 @@ class AudioConverterApp:
 
     def remove_selected_files(self) -> None:
         """Remove highlighted items from *source_files* and refresh UI."""
-        selected_indices = self.files_listbox.curselection()
-        if not selected_indices:
+        selected = set(self.files_list.selection())
+        if not selected:
             return
 
-        for index in sorted(selected_indices, reverse=True):
-            self.source_files.pop(index)
-
-        self.files_label.config(
-            text=f"{len(self.source_files)} files selected")
-        self.update_files_list()
+        self.source_files = [file_path for file_path in self.source_files
+                             if file_path not in selected]
+        for file_path in selected:
+            self.file_sizes.pop(file_path, None)
+            self.media_info.pop(file_path, None)
+            self.waveforms.pop(file_path, None)
+            self.priorities.pop(file_path, None)
+        self.files_list.delete(selected)
+        self.update_files_label()
 
         if not self.source_files:
             self.convert_btn.config(state="disabled")
             self.clear_btn.config(state="disabled")
 
+    def set_selected_priority(self, priority: int) -> None:
+        """
+        Give the highlighted files *priority*, also in the running batch
+        if they are still queued there.
+        """
+        queue = self.batch_queue
+        for file_path in self.files_list.selection():
+            if priority == NORMAL:
+                self.priorities.pop(file_path, None)
+            else:
+                self.priorities[file_path] = priority
+            self.files_list.update_row(file_path, priority=priority)
+            if queue is not None:
+                queue.set_priority(file_path, priority)
+
     def preview_file(self, event: tk.Event) -> None:
         """Open the first selected file with the OS default player."""
-        selected_indices = self.files_listbox.curselection()
-        if not selected_indices:
+        selected = self.files_list.selection()
+        if not selected:
             return
 
-        file_path = self.source_files[selected_indices[0]]
+        file_path = selected[0]
         try:
             if os.name == "nt":
                 os.startfile(file_path)  # type: ignore[arg-type]
@@ -358,27 +736,262 @@ class AudioConverterApp:
         files = [f for f in files if not os.path.basename(f).startswith(".")]
 
         if files:
-            self.source_files = list(files)
-            self.files_label.config(
-                text=f"{len(self.source_files)} files selected")
-            self.update_files_list()
-            self.convert_btn.config(state="normal")
-            self.clear_btn.config(state="normal")
+            self.clear_selection()
+            self.start_scan(stat_files(files))
+
+    def select_folder(self) -> None:
+        """Prompt for a directory and add every audio file below it."""
+        directory = filedialog.askdirectory(initialdir=self.source_directory)
+        if not directory:
+            return
+
+        self.source_directory = directory
+        if directory not in self.source_roots:
+            self.source_roots.append(directory)
+        selected_format = self.source_format.get()
+        formats = (self.supported_formats if selected_format == "All Formats"
+                   else [selected_format])
+        cancel_event = threading.Event()
+        self.start_scan(scan_directory(directory, formats,
+                                       cancel_event=cancel_event),
+                        cancel_event)
+
+    def start_scan(self, files: Iterable[ScannedFile],
+                   cancel_event: Optional[threading.Event] = None) -> None:
+        """Stat/walk *files* off the Tk thread, streaming them into the list."""
+        if self.scanner is not None:
+            self.scanner.cancel()
+
+        scanner = BackgroundScanner(
+            files,
+            on_batch=lambda batch: self.post_ui(
+                lambda: self.add_scanned_files(scanner, batch)),
+            on_done=lambda: self.post_ui(lambda: self.finish_scan(scanner)),
+            cancel_event=cancel_event,
+        )
+        self.scanner = scanner
+        self.status_label.config(text="Scanning…")
+        scanner.start()
+
+    def add_scanned_files(self, scanner: BackgroundScanner,
+                          batch: List[ScannedFile]) -> None:
+        """Append a batch of scanned files to the selection (Tk thread)."""
+        if scanner is not self.scanner:
+            return  # superseded or cleared meanwhile
+
+        rows = []
+        for file_path, size_bytes in batch:
+            if file_path in self.file_sizes:
+                continue
+            self.file_sizes[file_path] = size_bytes
+            self.source_files.append(file_path)
+            rows.append((file_path, self.file_row(file_path)))
+        if not rows:
+            return
+
+        self.files_list.insert(rows)
+        self.update_files_label()
+        self.prober.probe_many((file_path for file_path, _ in rows),
+                               self.report_media_info)
+        if self.is_converting:
+            self.extend_batch([file_path for file_path, _ in rows])
+            return
+        self.status_label.config(
+            text=f"Scanning… {len(self.source_files)} files found")
+        self.convert_btn.config(state="normal")
+        self.clear_btn.config(state="normal")
+
+    def finish_scan(self, scanner: BackgroundScanner) -> None:
+        """Report the end of *scanner* unless it was superseded."""
+        if scanner is not self.scanner:
+            return
+        self.scanner = None
+        if self.is_converting:
+            return
+        self.status_label.config(
+            text=f"Ready – {len(self.source_files)} files selected")
+
+    def file_row(self, file_path: str) -> Dict[str, Any]:
+        """Return the list fields shown for *file_path*."""
+        filename = os.path.basename(file_path)
+        size_bytes = self.file_sizes.get(file_path)
+        if size_bytes is None:
+            size_bytes = self.file_sizes[file_path] = os.path.getsize(
+                file_path)
+        info = self.media_info.get(file_path) or MediaInfo()
+        return {
+            "name": filename,
+            "format": os.path.splitext(filename)[1][1:].upper(),
+            "size": size_bytes,
+            "duration": info.duration,
+            "codec": info.codec,
+            "bitrate": info.bitrate,
+            "sample_rate": info.sample_rate,
+            "channels": info.channels,
+            "waveform": self.waveforms.get(file_path),
+            "priority": self.priorities.get(file_path, NORMAL),
+        }
+
+    def report_media_info(self, file_path: str,
+                          info: Optional[MediaInfo]) -> None:
+        """Queue a probe result for the Tk thread (called from the pool)."""
+        with self._probed_lock:
+            schedule = not self._probed
+            self._probed.append((file_path, info))
+        if schedule:
+            self.post_ui(self.apply_media_info)
+
+    def apply_media_info(self) -> None:
+        """Show every probe result received since the last call."""
+        with self._probed_lock:
+            probed, self._probed = self._probed, []
+        for file_path, info in probed:
+            if info is None or file_path not in self.file_sizes:
+                continue  # unprobeable, or removed meanwhile
+            self.media_info[file_path] = info
+            self.files_list.update_row(file_path, **self.file_row(file_path))
+        self.update_files_label()
+
+    def request_waveforms(self) -> None:
+        """Queue thumbnails for the visible rows that have none yet."""
+        self.waveform_generator.request(
+            (file_path for file_path in self.files_list.visible_keys()
+             if file_path not in self.waveforms),
+            self.report_waveform)
+
+    def report_waveform(self, file_path: str,
+                        waveform: Optional[Waveform]) -> None:
+        """Queue a thumbnail for the Tk thread (called from the pool)."""
+        with self._rendered_lock:
+            schedule = not self._rendered
+            self._rendered.append((file_path, waveform))
+        if schedule:
+            self.post_ui(self.apply_waveforms)
+
+    def apply_waveforms(self) -> None:
+        """Show every thumbnail received since the last call."""
+        with self._rendered_lock:
+            rendered, self._rendered = self._rendered, []
+        for file_path, waveform in rendered:
+            if file_path not in self.file_sizes:
+                continue  # removed meanwhile
+            # Failures are remembered too, so they are not retried
+            self.waveforms[file_path] = waveform
+            self.files_list.update_row(file_path, waveform=waveform)
 
     def update_files_list(self) -> None:
-        """Refresh the listbox to reflect *source_files*."""
-        self.files_listbox.delete(0, tk.END)
-        for file_path in self.source_files:
-            filename = os.path.basename(file_path)
-            file_ext = os.path.splitext(filename)[1][1:].lower()
-
-            size_bytes = os.path.getsize(file_path)
-            size_str = (f"{size_bytes / 1024:.1f} KB" if size_bytes < 1024 * 1024
-                        else f"{size_bytes / (1024 * 1024):.1f} MB")
-
-            self.files_listbox.insert(
-                tk.END, f"{filename} ({file_ext.upper()}, {size_str})"
-            )
+        """Reload the file list from *source_files*."""
+        self.files_list.clear()
+        self.files_list.insert((file_path, self.file_row(file_path))
+                               for file_path in self.source_files)
+        self.update_files_label()
+
+    def update_files_label(self) -> None:
+        """Show how many files are selected (and shown, when filtered)."""
+        total = len(self.source_files)
+        if not total:
+            text = "No files selected"
+        elif self.files_list.visible_count != total:
+            text = (f"{total} files selected "
+                    f"({self.files_list.visible_count} shown)")
+        else:
+            text = f"{total} files selected"
+        durations = [self.media_info[file_path].duration
+                     for file_path in self.source_files
+                     if file_path in self.media_info]
+        if any(duration is not None for duration in durations):
+            text += (", " + format_duration(
+                sum(duration or 0 for duration in durations)) + " total")
+        self.files_label.config(text=text)
+        self.schedule_estimate()
+
+    def schedule_estimate(self) -> None:
+        """Recompute the pre‑flight estimate once changes settle down."""
+        if self._estimate_after is not None:
+            self.root.after_cancel(self._estimate_after)
+        self._estimate_after = self.root.after(ESTIMATE_DELAY,
+                                               self.update_estimate)
+
+    def update_estimate(self) -> None:
+        """Estimate the selection with the current settings (Tk thread)."""
+        self._estimate_after = None
+        if self.is_converting:
+            return  # the label shows the batch forecast meanwhile
+        self._estimate_generation += 1
+        if self.cost_model is None or not self.media_info:
+            self.estimate_label.config(text="")
+            return
+        engine_loop().submit(self.estimate_async(
+            self._estimate_generation, self.current_settings(),
+            list(self.source_files), dict(self.media_info)))
+
+    async def estimate_async(self, generation: int,
+                             settings: Dict[str, Any], sources: List[str],
+                             media_info: Dict[str, MediaInfo]) -> None:
+        """Compute an estimate on the engine's executor and show it."""
+        estimate = await asyncio.get_running_loop().run_in_executor(
+            None, self.estimate_batch, settings, sources, media_info)
+
+        def show() -> None:
+            if (generation == self._estimate_generation
+                    and not self.is_converting):
+                self.estimate_label.config(text=format_estimate(estimate))
+
+        self.post_ui(show)
+
+    async def discover_ffmpeg(self) -> None:
+        """
+        Pick the local FFmpeg's fastest encoders on the engine's executor
+        and use them from the next batch on.
+        """
+        strategies = default_strategies()
+
+        def discover() -> Dict[str, str]:
+            capabilities = FFmpegCapabilities.load()
+            if capabilities is None:
+                return {}  # conversions will report the missing FFmpeg
+            return select_encoders(strategies, capabilities)
+
+        problems = await asyncio.get_running_loop().run_in_executor(
+            None, discover)
+
+        def apply() -> None:
+            # Running batches keep the strategies they started with
+            self._conversion_strategies = strategies
+            self.unsupported_formats = problems
+
+        self.post_ui(apply)
+
+    def estimate_batch(self, settings: Dict[str, Any], sources: List[str],
+                       media_info: Dict[str, MediaInfo]) -> BatchEstimate:
+        """Predict the cost of converting *sources* with *settings*."""
+        assert self.cost_model is not None
+        return self.cost_model.estimate_batch(
+            sources, media_info.get,
+            [self._conversion_strategies[fmt]
+             for fmt in settings["target_formats"]],
+            settings["quality"], workers=settings["workers"],
+            stream_copy=settings.get("stream_copy", True),
+            normalize=settings.get("normalize", False))
+
+    def apply_file_filter(self) -> None:
+        """Filter the file list by name, format and minimum size."""
+        text = self.filter_text_var.get().strip().lower()
+        fmt = self.filter_format_var.get()
+        fmt = "" if fmt == "All Formats" else fmt.upper()
+        try:
+            min_size = float(self.filter_min_size_var.get() or 0) * 1024 ** 2
+        except ValueError:
+            min_size = 0
+
+        if not (text or fmt or min_size):
+            self.files_list.set_filter(None)
+        else:
+            self.files_list.set_filter(
+                lambda row: (text in row["name"].lower()
+                             and (not fmt or row["format"] == fmt)
+                             and row["size"] >= min_size))
+        self.update_files_label()
 
     def select_output_directory(self) -> None:
         """Let the user choose a destination directory."""
@@ -394,8 +1007,15 @@ class AudioConverterApp:
 
     def clear_selection(self) -> None:
         """Reset UI and internal file selections."""
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.scanner = None
         self.source_files.clear()
-        self.files_label.config(text="No files selected")
+        self.file_sizes.clear()
+        self.media_info.clear()
+        self.waveforms.clear()
+        self.priorities.clear()
+        self.source_roots.clear()
         self.update_files_list()
         self.convert_btn.config(state="disabled")
         self.clear_btn.config(state="disabled")
@@ -403,200 +1023,645 @@ class AudioConverterApp:
         self.progress_var.set(0.0)
 
     def start_conversion(self) -> None:
-        """Kick‑off conversion in a background *thread*."""
+        """Kick‑off conversion as a batch on the engine loop."""
+        self.begin_trace()
+        with span("start_conversion", "ui"):
+            self._start_conversion()
+        if not self.is_converting:
+            stop_tracing()  # nothing was started
+
+    def _start_conversion(self) -> None:
+        """Validate the selection and launch it as a journaled batch."""
         if not self.source_files:
             messagebox.showwarning("No Files",
                                    "Please select audio files to convert.")
             return
 
         self.output_directory = self.output_dir_entry.get()
-        if not os.path.exists(self.output_directory):
+        if not self.ensure_output_directory():
+            return
+
+        # Tk variables must not be read from worker threads: snapshot them
+        settings = self.current_settings()
+        if settings["stage_outputs"] and settings["remote_workers"]:
+            messagebox.showerror(
+                "Staging Unavailable",
+                "Remote workers cannot write to this machine's scratch "
+                "directory.  Turn off staging or clear the remote "
+                "workers.")
+            return
+        missing = [f"{fmt}: {self.unsupported_formats[fmt]}"
+                   for fmt in settings["target_formats"]
+                   if fmt in self.unsupported_formats]
+        if missing and not settings["remote_workers"]:
+            messagebox.showerror("Unsupported Format",
+                                 "The installed FFmpeg cannot produce:\n"
+                                 + "\n".join(missing))
+            return
+        sources = self.source_files.copy()
+        collisions = output_collisions(
+            sources, self.output_directory, settings["target_formats"][0],
+            self.source_roots)
+        if collisions:
+            examples = [f"{os.path.basename(output_file)}: "
+                        f"{', '.join(writers)}"
+                        for output_file, writers
+                        in sorted(collisions.items())[:5]]
+            messagebox.showerror(
+                "Duplicate Outputs",
+                f"{len(collisions)} output file(s) would be written by "
+                "several sources:\n" + "\n".join(examples)
+                + "\nRemove or rename the duplicates first.")
+            return
+        jobs: Dict[str, Tuple[int, float]] = {}
+        batch_id = None
+        if self.journal is not None:
             try:
-                os.makedirs(self.output_directory)
-            except OSError:
-                messagebox.showerror("Error",
-                                     "Could not create output directory.")
-                return
+                batch_id, job_ids = self.journal.create_batch(settings,
+                                                              sources)
+                jobs = {source: (job_id, 0.0)
+                        for source, job_id in job_ids.items()}
+            except sqlite3.Error as exc:
+                self.status_label.config(text=f"Job journal disabled: {exc}")
+        self.launch_batch(settings, sources, jobs, batch_id)
+
+    def current_settings(self) -> Dict[str, Any]:
+        """Return the conversion settings chosen in the UI."""
+        try:
+            workers = int(self.workers_var.get())
+        except (tk.TclError, ValueError):
+            workers = default_worker_count()
+        try:
+            timeout_minutes = int(self.timeout_minutes_var.get())
+        except (tk.TclError, ValueError):
+            timeout_minutes = 0
+        return {
+            "output_directory": self.output_directory,
+            "target_formats": self.selected_target_formats(),
+            "quality": self.quality_var.get(),
+            "workers": workers,
+            "skip_unchanged": self.skip_unchanged_var.get(),
+            "hash_sources": self.hash_sources_var.get(),
+            "split_long_files": self.split_long_files_var.get(),
+            "stream_copy": self.stream_copy_var.get(),
+            "stage_outputs": self.stage_outputs_var.get(),
+            "normalize": self.normalize_var.get(),
+            "dedup": self.dedup_var.get(),
+            "timeout": timeout_minutes * 60 or None,
+            "adaptive_workers": self.adaptive_workers_var.get(),
+            "remote_workers": [
+                address.strip()
+                for address in self.remote_workers_var.get().split(",")
+                if address.strip()],
+            "priorities": dict(self.priorities),
+            "source_roots": list(self.source_roots),
+        }
 
-        self.conversion_queue = self.source_files.copy()
+    def apply_settings(self, settings: Dict[str, Any]) -> None:
+        """Show journaled batch *settings* in the UI."""
+        self.output_directory = settings["output_directory"]
+        self.output_dir_entry.delete(0, tk.END)
+        self.output_dir_entry.insert(0, self.output_directory)
+        formats = settings["target_formats"]
+        self.target_format.set(formats[0])
+        for fmt, selected in self.extra_formats.items():
+            selected.set(fmt in formats[1:])
+        self.quality_var.set(settings["quality"])
+        self.workers_var.set(settings["workers"])
+        self.skip_unchanged_var.set(settings["skip_unchanged"])
+        self.hash_sources_var.set(settings["hash_sources"])
+        self.split_long_files_var.set(settings["split_long_files"])
+        self.stream_copy_var.set(settings.get("stream_copy", True))
+        self.stage_outputs_var.set(settings.get("stage_outputs", False))
+        self.normalize_var.set(settings.get("normalize", False))
+        self.dedup_var.set(settings.get("dedup", False))
+        self.timeout_minutes_var.set((settings.get("timeout") or 0) // 60)
+        self.adaptive_workers_var.set(settings.get("adaptive_workers", False))
+        self.remote_workers_var.set(
+            ", ".join(settings.get("remote_workers", [])))
+        self.source_roots = list(settings.get("source_roots", []))
+
+    def launch_batch(self, settings: Dict[str, Any], sources: List[str],
+                     jobs: Dict[str, Tuple[int, float]],
+                     batch_id: Optional[int] = None) -> None:
+        """
+        Convert *sources* with *settings* in a background *thread*.
+
+        *jobs* maps each source to its journal job id and the earliest time
+        it may be attempted (empty when the journal is unavailable);
+        *batch_id* is the journaled batch files added meanwhile join.
+        """
+        self.conversion_queue = sources
+        self.batch_jobs = jobs
+        self.batch_id = batch_id
+        self.priorities.update(settings.get("priorities", {}))
+        self.scheduler = ConversionScheduler(
+            max_workers=settings["workers"], timeout=settings.get("timeout"))
+        self.converter = BatchConverter(
+            self.scheduler,
+            settings["output_directory"],
+            settings["target_formats"],
+            settings["quality"],
+            # Remote daemons encode with their own FFmpeg's defaults
+            strategies=(default_strategies()
+                        if settings.get("remote_workers")
+                        else self._conversion_strategies),
+            skip_unchanged=settings["skip_unchanged"],
+            split_long_files=settings["split_long_files"],
+            stream_copy=settings.get("stream_copy", True),
+            prober=self.prober,
+            # Remote workers cannot write to the local scratch directory
+            stager=(OutputStager() if settings.get("stage_outputs")
+                    and not settings.get("remote_workers") else None),
+            normalizer=(LoudnessNormalizer(cache=self.loudness_cache)
+                        if settings.get("normalize") else None),
+            cost_model=self.cost_model,
+            remote=(WorkerPool(settings["remote_workers"])
+                    if settings.get("remote_workers") else None),
+            source_roots=settings.get("source_roots", ()),
+        )
+        self.batch_settings = settings
+        self.batch_media_info = dict(self.media_info)
+        # Longest first, by the durations probed so far
+        self.batch_queue = JobQueue(
+            lambda source_file: estimated_duration(
+                source_file, self.batch_media_info.get(source_file)))
+        self.batch_forecast = None
+        self.batch_hash_sources = settings["hash_sources"]
+        self.batch_dedup = settings.get("dedup", False)
+        self.batch_governor = None
+        if (settings.get("adaptive_workers")
+                and self.converter.remote is None):  # it watches local load
+            self.batch_governor = ConcurrencyGovernor(
+                self.scheduler,
+                max_jobs=max(settings["workers"],
+                             4 * default_worker_count()),
+                on_sample=lambda jobs, sample: self.post_ui(
+                    lambda: self.show_concurrency(jobs, sample)),
+            )
+        self.show_concurrency(self.scheduler.concurrency)
         self.progress_var.set(0.0)
         self.convert_btn.config(state="disabled")
         self.clear_btn.config(state="disabled")
+        self.resume_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
 
         self.is_converting = True
-        threading.Thread(target=self.conversion_worker,
-                         daemon=True).start()
+        engine_loop().submit(self.run_conversion_batch())
 
-    def conversion_worker(self) -> None:
-        """Worker loop converting each file in *conversion_queue*."""
-        total_files = len(self.conversion_queue)
-        completed = 0
+    def begin_trace(self) -> None:
+        """Start recording a trace of the next batch if enabled."""
+        if self.trace_batches_var.get() and not self.is_converting:
+            self.batch_tracer = start_tracing()
 
-        for source_file in self.conversion_queue:
-            if not self.is_converting:
-                break
+    def check_unfinished_batch(self) -> None:
+        """Offer to resume a journaled batch that did not complete."""
+        self.resume_btn.config(state="disabled")
+        if self.journal is None or self.is_converting:
+            return
+        try:
+            unfinished = self.journal.unfinished_batch()
+        except sqlite3.Error:
+            return
+        if unfinished is not None:
+            _, _, count = unfinished
+            self.resume_btn.config(state="normal")
+            self.status_label.config(
+                text=f"Unfinished batch found: {count} files left – "
+                     f"press Resume to continue.")
+
+    def resume_conversion(self) -> None:
+        """Continue the unfinished jobs of the last journaled batch."""
+        if self.journal is None or self.is_converting:
+            return
+        try:
+            unfinished = self.journal.unfinished_batch()
+            if unfinished is None:
+                self.check_unfinished_batch()
+                return
+            batch_id, settings, _ = unfinished
+            jobs = self.journal.resumable_jobs(batch_id)
+        except sqlite3.Error as exc:
+            messagebox.showerror("Resume Error",
+                                 f"Could not read the job journal: {exc}")
+            return
 
-            filename = os.path.basename(source_file)
-            self.update_status(f"Converting: {filename}")
+        self.apply_settings(settings)
+        if not self.ensure_output_directory():
+            return
+        self.begin_trace()
+        sources = [job.source for job in jobs]
+        self.clear_selection()
+        self.start_scan(stat_files(sources))
+        self.launch_batch(settings, sources,
+                          {job.source: (job.id, job.next_attempt_at)
+                           for job in jobs}, batch_id)
+
+    def ensure_output_directory(self) -> bool:
+        """Create *output_directory* if needed; report failure to the user."""
+        if not os.path.exists(self.output_directory):
+            try:
+                os.makedirs(self.output_directory)
+            except OSError:
+                messagebox.showerror("Error",
+                                     "Could not create output directory.")
+                return False
+        return True
 
-            output_file = self.get_output_filename(source_file)
+    def cancel_conversion(self) -> None:
+        """Stop the running batch, including all in‑flight FFmpeg jobs."""
+        if not self.is_converting:
+            return
+        self.is_converting = False
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+        self.cancel_btn.config(state="disabled")
+        self.update_status("Canceling…")
+
+    def exit_app(self) -> None:
+        """Cancel any running batch and close the main window."""
+        self.cancel_conversion()
+        self.prober.shutdown()
+        self.waveform_generator.shutdown()
+        self.root.destroy()
+
+    async def run_conversion_batch(self) -> None:
+        """
+        Run *conversion_queue* on the scheduler and aggregate results.
+
+        Runs on the engine loop; widgets are only touched through
+        :meth:`post_ui`.
+        """
+        with span("run_conversion_batch", "batch",
+                  sources=len(self.conversion_queue)):
             try:
-                self.convert_file(source_file, output_file)
-                completed += 1
-                self.progress_var.set((completed / total_files) * 100)
-            except Exception as exc:
-                self.update_status(f"Error converting {filename}: {exc}")
+                await self._run_conversion_batch()
+            finally:
+                self.batch_queue = None
+
+    async def _run_conversion_batch(self) -> None:
+        """Body of :meth:`run_conversion_batch`."""
+        assert self.scheduler is not None and self.converter is not None
+        completed = 0
+        skipped = 0
+        finished = 0
+        self.batch_progress = BatchProgress(len(self.conversion_queue))
+        manifest = ConversionManifest.load(
+            self.output_directory, use_hash=self.batch_hash_sources)
+        self.converter.manifest = manifest
+        loop = asyncio.get_running_loop()
+
+        remote = self.converter.remote
+        if remote is not None:
+            self.update_status("Connecting to remote workers…")
+            try:
+                slots = await remote.start()
+            except ConnectionError as exc:
+                self.update_status(str(exc))
+                self.post_ui(self.finish_conversion)
+                return
+            self.scheduler.set_concurrency(slots)
+            self.post_ui(lambda: self.show_concurrency(slots))
+
+        groups = DuplicateGroups(self.conversion_queue, {}, {})
+        if self.batch_dedup:
+            self.update_status("Looking for duplicate sources…")
+            with span("find_duplicates", "batch"):
+                groups = await loop.run_in_executor(None, find_duplicates,
+                                                    self.conversion_queue)
+        savings = DedupSavings()
+        if self.cost_model is not None:
+            with span("estimate", "batch"):
+                self.batch_forecast = BatchForecast(
+                    await loop.run_in_executor(
+                        None, self.estimate_batch, self.batch_settings,
+                        groups.primaries, self.batch_media_info))
+
+        async def convert_one(source_file: str) -> bool:
+            filename = os.path.basename(source_file)
+            job = self.batch_jobs.get(source_file)
+            if job is None or self.journal is None:
+                self.update_status(f"Converting: {filename}")
+                return await self.convert_file_async(source_file)
+
+            async def back_off(delay: float) -> None:
+                # Leave the worker to other jobs while waiting
+                if delay > 0:
+                    self.scheduler.release_slot()
+                    await self.scheduler.sleep_async(delay)
+                    await self.scheduler.reclaim_slot()
+
+            # Journal writes sync to disk: keep them off the loop
+            journal = self.journal
+            job_id, not_before = job
+            await back_off(not_before - time.time())
+            while True:
+                attempt = await loop.run_in_executor(
+                    None, journal.mark_running, job_id)
+                self.update_status(f"Converting: {filename}")
+                try:
+                    converted = await self.convert_file_async(source_file)
+                except ConversionCancelled:
+                    await loop.run_in_executor(None, journal.mark_pending,
+                                               job_id)
+                    raise
+                except Exception as exc:
+                    # e.g. an unsupported format fails the same way again
+                    retry = not isinstance(exc, ValueError)
+                    delay = await loop.run_in_executor(
+                        None, journal.mark_failed, job_id, attempt,
+                        str(exc), retry)
+                    if delay < 0:
+                        raise
+                    self.update_status(f"Error converting {filename}, "
+                                       f"retrying in {delay:.0f} s: {exc}")
+                    await back_off(delay)
+                    continue
+                await loop.run_in_executor(None, journal.mark_done, job_id)
+                return converted
+
+        async def convert_group(source_file: str) -> bool:
+            started = time.perf_counter()
+            converted = await convert_one(source_file)
+            seconds = time.perf_counter() - started
+            for duplicate in groups.duplicates_of(source_file):
+                with span("replicate", source=duplicate):
+                    linked = await loop.run_in_executor(
+                        None, self.converter.replicate, source_file,
+                        duplicate)
+                if converted:
+                    savings.add(groups.size(duplicate), seconds, linked)
+                job = self.batch_jobs.get(duplicate)
+                if job is not None and self.journal is not None:
+                    await loop.run_in_executor(None, self.journal.mark_done,
+                                               job[0])
+            return converted
+
+        def on_result(source_file: str, converted: Optional[bool],
+                      error: Optional[BaseException]) -> None:
+            nonlocal completed, skipped, finished
+            if isinstance(error, ConversionCancelled):
+                return
+            group = [source_file, *groups.duplicates_of(source_file)]
+            finished += len(group)
+            for path in group:
+                self.batch_progress.complete(path)
+                if self.batch_forecast is not None:
+                    self.batch_forecast.complete(path)
+            if error is None:
+                completed += len(group)
+                skipped += 0 if converted else len(group)
+            else:
+                filename = os.path.basename(source_file)
+                self.update_status(f"Error converting {filename}: {error}")
+
+        priorities = self.batch_settings.get("priorities", {})
+        queue = self.batch_queue
+        assert queue is not None
+        queue.add(groups.primaries,
+                  lambda source_file: priorities.get(source_file, NORMAL))
+
+        governing = None
+        if self.batch_governor is not None:
+            governing = asyncio.ensure_future(self.batch_governor.run())
+        try:
+            await self.scheduler.run_batch_async(queue, convert_group,
+                                                 on_result)
+        finally:
+            if governing is not None:
+                governing.cancel()
+            if remote is not None:
+                await remote.close()
+            if self.converter.stager is not None:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.converter.stager.shutdown)
+            try:
+                manifest.save()
+            except OSError as exc:
+                self.update_status(f"Could not save manifest: {exc}")
+            if self.cost_model is not None:
+                try:
+                    await loop.run_in_executor(None, self.cost_model.save)
+                except OSError:
+                    pass  # only a calibration
 
         # Final status
+        total_files = len(self.conversion_queue)
         if self.is_converting:
+            remuxed = sorted(os.path.basename(source_file) for source_file
+                             in self.converter.stream_copied)
             self.update_status(
-                f"Conversion complete. {completed}/{total_files} files converted."
+                f"Conversion complete. {completed}/{total_files} files converted"
+                f" ({skipped} unchanged, skipped; {len(remuxed)} remuxed "
+                f"without re‑encoding)."
             )
             if completed:
-                messagebox.showinfo(
-                    "Conversion Complete",
-                    f"Successfully converted {completed} out of {total_files} "
-                    f"files.\nFiles saved to: {self.output_directory}",
-                )
+                summary = (f"Successfully converted {completed} out of "
+                           f"{total_files} files.\nFiles saved to: "
+                           f"{self.output_directory}")
+                if remuxed:
+                    summary += (f"\n\nStream‑copied (no re‑encode): "
+                                f"{', '.join(remuxed[:10])}")
+                    if len(remuxed) > 10:
+                        summary += f" and {len(remuxed) - 10} more"
+                if savings.files:
+                    summary += (f"\n\n{savings.files} duplicate(s) reused "
+                                f"instead of re‑encoded: "
+                                f"{format_size(savings.bytes)} and "
+                                f"{savings.seconds:.1f} s saved.")
+                self.post_ui(lambda: messagebox.showinfo(
+                    "Conversion Complete", summary))
         else:
             self.update_status("Conversion canceled.")
 
+        self.post_ui(self.finish_conversion)
+
+    def extend_batch(self, sources: List[str]) -> None:
+        """
+        Add files selected during a batch to it (Tk thread); its own
+        sources, listed again on resume, are left alone.
+        """
+        priorities = {source: self.priorities.get(source, NORMAL)
+                      for source in sources}
+        engine_loop().submit(self._extend_batch(sources, priorities))
+
+    async def _extend_batch(self, sources: List[str],
+                            priorities: Dict[str, int]) -> None:
+        """
+        Loop‑thread part of :meth:`extend_batch`.  The jobs are journaled
+        (off the loop) before they are queued, so none can start
+        unjournaled; those the batch no longer takes are removed again.
+        """
+        queue = self.batch_queue
+        batch = set(self.conversion_queue)
+        sources = [source for source in sources if source not in batch]
+        if queue is None or not sources:
+            return
+        loop = asyncio.get_running_loop()
+        journal = self.journal
+        job_ids: Dict[str, int] = {}
+        if journal is not None and self.batch_id is not None:
+            try:
+                job_ids = await loop.run_in_executor(
+                    None, journal.add_jobs, self.batch_id, sources)
+            except sqlite3.Error:
+                pass  # converted, just not resumably
+
+        # Meanwhile the batch may have ended or been extended by them
+        batch = set(self.conversion_queue)
+        added = [source for source in sources if source not in batch]
+        if (self.batch_queue is not queue or not added
+                or not queue.add(added, priorities.__getitem__)):
+            added = []  # the batch is finishing; they wait for the next one
+        else:
+            self.conversion_queue = self.conversion_queue + added
+            if self.batch_progress is not None:
+                self.batch_progress.total_jobs = len(self.conversion_queue)
+            if self.batch_forecast is not None:
+                loop.run_in_executor(None, self.forecast_added,
+                                     self.batch_forecast,
+                                     self.batch_settings, added)
+            self.batch_jobs.update((source, (job_ids[source], 0.0))
+                                   for source in added if source in job_ids)
+
+        dropped = [job_id for source, job_id in job_ids.items()
+                   if source not in added]
+        if journal is not None and dropped:
+            try:
+                await loop.run_in_executor(None, journal.remove_jobs,
+                                           dropped)
+            except sqlite3.Error:
+                pass
+
+    def forecast_added(self, forecast: BatchForecast,
+                       settings: Dict[str, Any], sources: List[str]) -> None:
+        """Estimate *sources*, just added to the batch, into *forecast*."""
+        media_info = {}
+        for source in sources:
+            info = self.prober.probe(source)
+            if info is not None:
+                media_info[source] = info
+        for estimate in self.estimate_batch(settings, sources, media_info):
+            forecast.add(estimate)
+
+    def finish_conversion(self) -> None:
+        """Restore button states once the batch has stopped."""
+        self.refresh_progress()
+        self.show_concurrency(0)
         self.convert_btn.config(state="normal")
         self.clear_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
         self.is_converting = False
+        self.batch_forecast = None
+        stop_tracing()
+        self.update_estimate()
+        if self.scheduler is not None and self.scheduler.cancelled:
+            self.check_unfinished_batch()
 
     # --------------------------------------------------------------------- #
     # Helpers
     # --------------------------------------------------------------------- #
 
-    def update_status(self, message: str) -> None:
-        """Thread‑safe update of the status label."""
-        self.root.after(0, lambda: self.status_label.config(text=message))
-
-    def get_output_filename(self, source_file: str) -> str:
-        """Return destination filename with chosen extension."""
-        basename = os.path.basename(source_file)
-        filename, _ = os.path.splitext(basename)
-        return os.path.join(
-            self.output_directory, f"{filename}.{self.target_format.get()}")
+    def post_ui(self, callback: Callable[[], None]) -> None:
+        """Run *callback* on the Tk thread at the next pump (any thread)."""
+        self._ui_calls.append(callback)
 
-    def convert_file(self, source_file: str, output_file: str) -> None:
+    def pump_ui(self) -> None:
         """
-        Convert *source_file* to *output_file* using FFmpeg.
-
-        Raises
-        ------
-        ValueError
-            If the requested target format is unsupported.
-        Exception
-            If FFmpeg fails or is not found.
-        """
-        target_format = self.target_format.get()
-        quality = self.quality_var.get()
-
-        strategy = self._conversion_strategies.get(target_format)
-        if strategy is None:
-            raise ValueError(f"Unsupported format: {target_format}")
+        Apply everything posted from other threads, then reschedule.
 
-        cmd = strategy.convert(source_file, output_file, quality)
+        A single recurring *after* replaces one *after* per update, so busy
+        batches cost the Tk loop one wake‑up per interval.
+        """
         try:
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-            )
-            _, stderr = proc.communicate()
-            if proc.returncode:
-                raise Exception(f"FFmpeg error: {stderr}")
-        except FileNotFoundError as exc:
-            raise Exception("FFmpeg not found. Please install FFmpeg "
-                            "and ensure it's in your PATH.") from exc
-
+            # Idle ticks stay out of the trace
+            if self._ui_calls:
+                with span("pump_ui", "ui") as fields:
+                    calls = 0
+                    while self._ui_calls:
+                        self._ui_calls.popleft()()
+                        calls += 1
+                    fields["calls"] = calls
+            with self._status_lock:
+                message, self._status_message = self._status_message, None
+            if message is not None:
+                self.status_label.config(text=message)
+            if self.is_converting:
+                self.refresh_progress()
+        finally:
+            self.root.after(UI_PUMP_INTERVAL, self.pump_ui)
 
-# ===================================================================== #
-# Strategy pattern for individual formats
-# ===================================================================== #
+    def update_status(self, message: str) -> None:
+        """Thread‑safe update of the status label (latest message wins)."""
+        with self._status_lock:
+            self._status_message = message
+
+    def report_file_progress(self, source_file: str,
+                             state: ProgressState) -> None:
+        """Record streamed FFmpeg progress for *source_file* (any thread)."""
+        if self.batch_progress is None:
+            return
+        self.batch_progress.update(source_file, state)
+        speed = f" at {state.speed:.1f}x" if state.speed else ""
+        self.update_status(f"Converting: {os.path.basename(source_file)} "
+                           f"{state.fraction:.0%}{speed} "
+                           f"(batch {self.batch_progress.speed:.1f}x)")
+
+    def show_concurrency(self, jobs: int,
+                         sample: Optional[LoadSample] = None) -> None:
+        """Show the current number of concurrent jobs (and load) in the gauge."""
+        limit = (self.batch_governor.max_jobs
+                 if self.batch_governor is not None else max(jobs, 1))
+        self.concurrency_var.set(100 * jobs / limit)
+        if not jobs:
+            self.concurrency_label.config(text="")
+        elif sample is None:
+            self.concurrency_label.config(text=f"{jobs} jobs")
+        else:
+            self.concurrency_label.config(
+                text=f"{jobs} jobs · CPU {sample.child_cpu:.0%} · "
+                     f"{sample.io_rate / (1024 * 1024):.1f} MB/s")
+
+    def refresh_progress(self) -> None:
+        """Copy the aggregated batch progress onto the progress bar."""
+        if self.batch_progress is not None:
+            self.progress_var.set(self.batch_progress.fraction * 100)
+        if self.batch_forecast is not None and self.is_converting:
+            self.estimate_label.config(
+                text=f"≈ {format_duration(self.batch_forecast.remaining())}"
+                     " left")
+
+    def selected_target_formats(self) -> List[str]:
+        """Return the main target format followed by any extra formats."""
+        formats = [self.target_format.get()]
+        formats.extend(fmt for fmt, selected in self.extra_formats.items()
+                       if selected.get() and fmt not in formats)
+        return formats
+
+    def get_output_filename(self, source_file: str,
+                            target_format: Optional[str] = None) -> str:
+        """Return destination filename with chosen extension."""
+        if self.converter is not None:
+            return self.converter.output_filename(source_file, target_format)
+        return output_filename(source_file, self.output_directory,
+                               target_format or self.target_format.get(),
+                               self.source_roots)
+
+    async def convert_file_async(self, source_file: str,
+                                 output_files: Optional[List[str]] = None
+                                 ) -> bool:
+        """
+        Convert *source_file* with the settings of the running batch.
 
-class AudioConversionStrategy(ABC):
-    """Abstract base class for concrete conversion strategies."""
-
-    @abstractmethod
-    def convert(self, source_file: str, output_file: str,
-                quality: str) -> List[str]:
-        """Return a fully‑formed FFmpeg command line."""
-
-
-class Mp3ConversionStrategy(AudioConversionStrategy):
-    """Convert audio to *MP3* using the **libmp3lame** encoder."""
-
-    def convert(self, source_file: str, output_file: str,
-                quality: str) -> List[str]:
-        cmd = ["ffmpeg", "-i", source_file]
-        cmd.extend({
-            "Low": ["-b:a", "96k"],
-            "Medium": ["-b:a", "192k"],
-            "High": ["-b:a", "320k"],
-            "Lossless": ["-b:a", "320k"],
-        }[quality])
-        cmd.extend(["-y", output_file])
-        return cmd
-
-
-class OggConversionStrategy(AudioConversionStrategy):
-    """Convert audio to *OGG Vorbis*."""
-
-    def convert(self, source_file: str, output_file: str,
-                quality: str) -> List[str]:
-        cmd = ["ffmpeg", "-i", source_file]
-        cmd.extend({
-            "Low": ["-q:a", "3"],
-            "Medium": ["-q:a", "6"],
-            "High": ["-q:a", "9"],
-            "Lossless": ["-q:a", "10"],
-        }[quality])
-        cmd.extend(["-y", output_file])
-        return cmd
-
-
-class FlacConversionStrategy(AudioConversionStrategy):
-    """Convert audio to *FLAC*."""
-
-    def convert(self, source_file: str, output_file: str,
-                quality: str) -> List[str]:
-        cmd = ["ffmpeg", "-i", source_file]
-        cmd.extend({
-            "Low": ["-compression_level", "1"],
-            "Medium": ["-compression_level", "5"],
-            "High": ["-compression_level", "8"],
-            "Lossless": ["-compression_level", "12"],
-        }[quality])
-        cmd.extend(["-y", output_file])
-        return cmd
-
-
-class AacM4aConversionStrategy(AudioConversionStrategy):
-    """Convert audio to *AAC/M4A*."""
-
-    def convert(self, source_file: str, output_file: str,
-                quality: str) -> List[str]:
-        cmd = ["ffmpeg", "-i", source_file]
-        cmd.extend({
-            "Low": ["-b:a", "128k"],
-            "Medium": ["-b:a", "192k"],
-            "High": ["-b:a", "256k"],
-            "Lossless": ["-b:a", "320k"],
-        }[quality])
-        cmd.extend(["-y", output_file])
-        return cmd
-
-
-class WavConversionStrategy(AudioConversionStrategy):
-    """Convert audio to uncompressed *WAV*."""
-
-    def convert(self, source_file: str, output_file: str,
-                quality: str) -> List[str]:  # noqa: D401
-        return ["ffmpeg", "-i", source_file, "-y", output_file]
+        See :meth:`batch_converter.BatchConverter.convert_file_async`.
+        """
+        assert self.converter is not None
+        return await self.converter.convert_file_async(
+            source_file,
+            output_files,
+            on_progress=lambda state: self.report_file_progress(
+                source_file, state),
+        )
 
 
 # ===================================================================== #
@@ -0,0 +1,587 @@
+#!/usr/bin/env python
+#
+# Headless command-line front end for the audio converter
+
+"""Audio Converter (command line)
+
+Converts files, directories or glob patterns without a display, using the
+same strategies, quality presets and output naming as the GUI.  One JSON
+object per source is written to *stdout* as soon as it finishes::
+
+    {"source": "...", "outputs": [...], "status": "converted",
+     "stream_copy": [...], "seconds": 1.234, "error": null}
+
+``status`` is ``converted``, ``skipped`` (outputs already up to date) or
+``failed``; ``stream_copy`` lists the outputs that were remuxed rather
+than re‑encoded.  With ``--dedup``, byte‑identical sources are encoded
+once: the others report ``linked`` or ``copied`` and a ``duplicate_of``
+field naming the source that was encoded.  Exit status: ``0`` if every
+file succeeded, ``1`` if any file failed, ``2`` on usage errors and
+``130`` when interrupted.
+
+Files found in an input directory keep their sub‑directory below the
+output directory.  Sources that would still write the same output (files
+of the same name from different inputs) are a usage error.
+
+With ``--estimate`` nothing is converted: one JSON object per source gives
+its probed duration and the predicted time and output size, and the batch
+totals go to *stderr*.  Predictions come from :mod:`cost_model`, which
+every real run recalibrates.
+
+``--trace FILE`` records the batch as a Chrome trace‑event file (open it
+in ``chrome://tracing`` or Perfetto) showing every worker's probes,
+command builds and FFmpeg children.
+
+Target formats are checked against the installed FFmpeg before anything
+starts, and each one is encoded with the fastest suitable encoder it
+offers; both come from :mod:`ffmpeg_capabilities`, which caches what it
+learns about the binary.
+
+With ``--remote ADDRESS`` (repeatable) the encodes run on worker daemons
+started with ``remote_workers.py``, which must see the same paths.
+
+Sources are converted longest first (by probed duration), which finishes
+mixed batches soonest; ``--priority PATTERN=LEVEL`` moves matching files
+ahead of (``high``) or behind (``low``) the rest and ``--fifo`` keeps the
+given order instead.
+
+With ``--watch`` the converter keeps running and converts files as they
+are dropped into (or change within) the input directories, until it is
+interrupted or receives *SIGTERM*.
+
+Nothing here imports Tk, so start‑up stays fast on headless machines.
+"""
+
+
+import argparse
+import asyncio
+import fnmatch
+import glob
+import json
+import os
+import signal
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, AsyncIterable, Dict, Iterable, List, Optional,
+                    Tuple, Union)
+
+from batch_converter import BatchConverter, output_collisions
+from concurrency_governor import ConcurrencyGovernor
+from conversion_engine import (ConversionCancelled, ConversionScheduler,
+                               default_worker_count, engine_loop)
+from conversion_manifest import ConversionManifest
+from conversion_strategies import (QUALITY_PRESETS, SUPPORTED_FORMATS,
+                                   default_strategies)
+from cost_model import BatchEstimate, CostModel
+from ffmpeg_capabilities import FFmpegCapabilities, select_encoders
+from source_dedup import DedupSavings, DuplicateGroups, find_duplicates
+from folder_watcher import (DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE_TIME,
+                            FolderWatcher)
+from job_queue import NORMAL, PRIORITY_NAMES, JobQueue, estimated_duration
+from loudness import (DEFAULT_INTEGRATED, LoudnessCache, LoudnessNormalizer,
+                      LoudnessTarget)
+from media_probe import (DEFAULT_PROBE_WORKERS, MediaInfo, MetadataProber,
+                         ProbeCache)
+from output_staging import OutputStager
+from remote_workers import WorkerPool
+from trace_events import span, start_tracing, stop_tracing
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+#: Seconds between two manifest saves while watching.
+WATCH_SAVE_INTERVAL = 30.0
+
+
+def is_supported(path: str) -> bool:
+    """Return ``True`` for visible files with a supported audio extension."""
+    name = os.path.basename(path)
+    extension = os.path.splitext(name)[1][1:].lower()
+    return not name.startswith(".") and extension in SUPPORTED_FORMATS
+
+
+def collect_sources(inputs: Iterable[str], recursive: bool) -> List[str]:
+    """Expand files, directories and glob patterns into source files."""
+    sources: List[str] = []
+    seen = set()
+
+    def add(path: str) -> None:
+        path = os.path.abspath(path)
+        if path not in seen and is_supported(path):
+            seen.add(path)
+            sources.append(path)
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, dirnames, filenames in os.walk(item):
+                dirnames[:] = sorted(d for d in dirnames
+                                     if not d.startswith("."))
+                for name in sorted(filenames):
+                    add(os.path.join(dirpath, name))
+                if not recursive:
+                    break
+        elif os.path.isfile(item):
+            add(item)
+        else:
+            for path in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(path):
+                    add(path)
+    return sources
+
+
+def parse_formats(values: List[str]) -> List[str]:
+    """Flatten ``-f mp3 -f ogg,flac`` into an ordered list of formats."""
+    formats: List[str] = []
+    for value in values:
+        for fmt in value.split(","):
+            fmt = fmt.strip().lower()
+            if fmt and fmt not in formats:
+                formats.append(fmt)
+    return formats
+
+
+def parse_priorities(values: List[str]) -> List[Tuple[str, int]]:
+    """
+    Turn ``--priority PATTERN=LEVEL`` values into ``(pattern, level)``.
+
+    Raises
+    ------
+    ValueError
+        If a value has no ``=`` or an unknown level.
+    """
+    levels = {name.lower(): level for level, name in PRIORITY_NAMES.items()}
+    rules = []
+    for value in values:
+        pattern, _, name = value.rpartition("=")
+        if not pattern or name.lower() not in levels:
+            raise ValueError(f"invalid --priority {value!r} (expected "
+                             f"PATTERN={'|'.join(levels)})")
+        rules.append((pattern, levels[name.lower()]))
+    return rules
+
+
+def priority_of(path: str, rules: List[Tuple[str, int]]) -> int:
+    """Return the level of the last rule matching *path* or its name."""
+    for pattern, level in reversed(rules):
+        if (fnmatch.fnmatch(path, pattern)
+                or fnmatch.fnmatch(os.path.basename(path), pattern)):
+            return level
+    return NORMAL
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command‑line parser."""
+    parser = argparse.ArgumentParser(
+        description="Convert audio files between formats using FFmpeg.")
+    parser.add_argument("inputs", nargs="+",
+                        help="files, directories or glob patterns")
+    parser.add_argument("-f", "--format", action="append", default=[],
+                        help="target format(s), repeatable or comma‑separated"
+                             f" ({', '.join(SUPPORTED_FORMATS)}; "
+                             "default: mp3)")
+    parser.add_argument("-q", "--quality", choices=QUALITY_PRESETS,
+                        default="High")
+    parser.add_argument("-o", "--output-dir", default=".",
+                        help="destination directory (default: current)")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="concurrent conversions (default: CPU count)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adjust concurrency to CPU and I/O load, "
+                             "starting from --workers")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="descend into sub‑directories")
+    parser.add_argument("--force", action="store_true",
+                        help="re‑encode outputs that are already up to date")
+    parser.add_argument("--hash", action="store_true",
+                        help="verify unchanged sources by content hash")
+    parser.add_argument("--split-long-files", action="store_true",
+                        help="encode long inputs as parallel segments")
+    parser.add_argument("--timeout", type=float,
+                        help="give up on a file after this many seconds")
+    parser.add_argument("--no-stream-copy", action="store_true",
+                        help="always re‑encode, even when the source codec "
+                             "already matches the target")
+    parser.add_argument("--no-fast-path", action="store_true",
+                        help="always run FFmpeg, even for simple WAV jobs "
+                             "that can be converted in process")
+    parser.add_argument("--stage", nargs="?", const="", metavar="DIR",
+                        help="write outputs to a scratch directory (default:"
+                             " tmpfs) and move them into place once verified")
+    parser.add_argument("--normalize", nargs="?", type=float,
+                        const=DEFAULT_INTEGRATED, metavar="LUFS",
+                        help="two‑pass EBU R128 loudness normalization "
+                             f"(default target: {DEFAULT_INTEGRATED:g} LUFS)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="encode byte‑identical sources once and link "
+                             "(or copy) the outputs to the other names")
+    parser.add_argument("--estimate", action="store_true",
+                        help="only predict the time and output size of "
+                             "the conversion, per file and in total")
+    parser.add_argument("--remote", action="append", default=[],
+                        metavar="ADDRESS",
+                        help="run the encodes on the worker daemon at "
+                             "host:port or unix:/path (repeatable); "
+                             "--workers then defaults to their slots")
+    parser.add_argument("--priority", action="append", default=[],
+                        metavar="PATTERN=LEVEL",
+                        help="convert files matching the glob PATTERN with "
+                             "priority high, normal or low (repeatable; "
+                             "the last match wins)")
+    parser.add_argument("--fifo", action="store_true",
+                        help="convert in the given order instead of "
+                             "longest first")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace‑event JSON file of the "
+                             "batch")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and convert files as they appear"
+                             " in the input directories")
+    parser.add_argument("--poll-interval", type=float,
+                        default=DEFAULT_POLL_INTERVAL,
+                        help="seconds between two looks at the watched "
+                             "directories (default: "
+                             f"{DEFAULT_POLL_INTERVAL:g})")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_TIME,
+                        help="seconds a new file must stop growing before it"
+                             " is converted (default: "
+                             f"{DEFAULT_SETTLE_TIME:g})")
+    return parser
+
+
+def emit(record: Dict[str, Any]) -> None:
+    """Write *record* to stdout as one JSON line."""
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
+def print_estimate(estimate: BatchEstimate) -> None:
+    """Write the per‑file predictions and the batch totals."""
+    for file_estimate in estimate:
+        emit({"source": file_estimate.source_file,
+              "duration": file_estimate.duration,
+              "estimated_seconds": round(file_estimate.seconds, 3),
+              "estimated_bytes": round(file_estimate.size)})
+    unknown = (f" ({estimate.unknown} without a duration, counted at the "
+               "average)" if estimate.unknown else "")
+    print(f"{len(estimate.files)} files: ~{estimate.size / 1e6:.1f} MB in "
+          f"~{estimate.seconds:.1f} s with {estimate.workers} worker(s)"
+          f"{unknown}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command‑line converter and return its exit status."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    formats = parse_formats(args.format) or ["mp3"]
+    strategies = default_strategies()
+    unknown = [fmt for fmt in formats if fmt not in strategies]
+    if unknown:
+        parser.error(f"unsupported format(s): {', '.join(unknown)}")
+    # Remote daemons encode with their own FFmpeg
+    capabilities = None if args.remote else FFmpegCapabilities.load()
+    if capabilities is not None:
+        problems = select_encoders(strategies, capabilities)
+        missing = [f"{fmt} ({problems[fmt]})"
+                   for fmt in formats if fmt in problems]
+        if missing:
+            parser.error("this FFmpeg cannot produce "
+                         f"{', '.join(missing)}")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.adaptive and args.remote:
+        parser.error("--adaptive cannot be combined with --remote")
+    if args.stage is not None and args.remote:
+        parser.error("--stage cannot be combined with --remote: the "
+                     "workers cannot write to this machine's scratch "
+                     "directory")
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    if args.poll_interval <= 0:
+        parser.error("--poll-interval must be positive")
+    if args.dedup and args.watch:
+        parser.error("--dedup cannot be combined with --watch")
+    if args.estimate and args.watch:
+        parser.error("--estimate cannot be combined with --watch")
+    if args.watch and (args.priority or args.fifo):
+        parser.error("--watch converts files as they settle; it cannot be "
+                     "combined with --priority or --fifo")
+    try:
+        priorities = parse_priorities(args.priority)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    watcher = None
+    if args.watch:
+        not_directories = [item for item in args.inputs
+                           if not os.path.isdir(item)]
+        if not_directories:
+            parser.error("--watch needs directories, not "
+                         f"{', '.join(not_directories)}")
+        # Outputs written into a watched directory would come back as
+        # sources; below one, the watcher skips the output directory
+        if os.path.abspath(args.output_dir) in map(os.path.abspath,
+                                                   args.inputs):
+            parser.error("--watch needs an output directory (-o) that is "
+                         "not one of the watched directories")
+        watcher = FolderWatcher(args.inputs, is_supported,
+                                recursive=args.recursive,
+                                exclude=[args.output_dir],
+                                poll_interval=args.poll_interval,
+                                settle_time=max(0.0, args.settle))
+        sources: List[str] = []
+    else:
+        sources = collect_sources(args.inputs, args.recursive)
+        if not sources:
+            print("No supported audio files found.", file=sys.stderr)
+            return EXIT_USAGE
+    # Files found in a directory keep their sub‑directory in the output
+    source_roots = [os.path.abspath(item) for item in args.inputs
+                    if os.path.isdir(item)]
+    collisions = output_collisions(sources, args.output_dir, formats[0],
+                                   source_roots)
+    if collisions:
+        for output_file, writers in sorted(collisions.items()):
+            print(f"{output_file} would be written by "
+                  f"{' and '.join(writers)}", file=sys.stderr)
+        print("Rename the sources or convert them separately.",
+              file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.trace:
+        start_tracing()
+    groups = DuplicateGroups(sources, {}, {})
+    hashing_seconds = 0.0
+    if args.dedup:
+        started = time.perf_counter()
+        with span("find_duplicates", "batch", sources=len(sources)):
+            groups = find_duplicates(sources)
+        hashing_seconds = time.perf_counter() - started
+    savings = DedupSavings()
+
+    try:
+        os.makedirs(args.output_dir, exist_ok=True)
+    except OSError as exc:
+        print(f"Could not create output directory: {exc}", file=sys.stderr)
+        return EXIT_USAGE
+
+    scheduler = ConversionScheduler(max_workers=args.workers,
+                                    timeout=args.timeout)
+    try:
+        probe_cache: Optional[ProbeCache] = ProbeCache()
+    except (OSError, sqlite3.Error):
+        probe_cache = None
+    manifest = ConversionManifest.load(args.output_dir, use_hash=args.hash)
+    normalizer = None
+    if args.normalize is not None:
+        try:
+            loudness_cache: Optional[LoudnessCache] = LoudnessCache()
+        except (OSError, sqlite3.Error):
+            loudness_cache = None
+        normalizer = LoudnessNormalizer(LoudnessTarget(args.normalize),
+                                        loudness_cache)
+    try:
+        cost_model: Optional[CostModel] = CostModel.load()
+    except OSError:
+        cost_model = None
+    prober = MetadataProber(probe_cache, max_workers=1)
+    infos: Dict[str, Optional[MediaInfo]] = {}
+    if args.estimate or not (args.fifo or args.watch):
+        with span("probe_sources", "batch", sources=len(groups.primaries)):
+            with ThreadPoolExecutor(DEFAULT_PROBE_WORKERS) as pool:
+                infos = dict(zip(groups.primaries,
+                                 pool.map(prober.probe, groups.primaries)))
+    if args.estimate:
+        if cost_model is None:
+            cost_model = CostModel(os.devnull)  # defaults only
+        print_estimate(cost_model.estimate_batch(
+            groups.primaries, infos.get,
+            [strategies[fmt] for fmt in formats], args.quality,
+            workers=scheduler.concurrency,
+            stream_copy=not args.no_stream_copy,
+            in_process=not args.no_fast_path,
+            normalize=args.normalize is not None))
+        return EXIT_OK
+
+    stager = None
+    if args.stage is not None:
+        stager = OutputStager(args.stage or None)
+    converter = BatchConverter(
+        scheduler,
+        args.output_dir,
+        formats,
+        args.quality,
+        strategies=strategies,
+        manifest=manifest,
+        skip_unchanged=not args.force,
+        split_long_files=args.split_long_files,
+        stream_copy=not args.no_stream_copy,
+        prober=prober,
+        stager=stager,
+        normalizer=normalizer,
+        in_process=not args.no_fast_path,
+        cost_model=cost_model,
+        source_roots=source_roots,
+    )
+    failed = 0
+    last_save = time.monotonic()
+
+    async def convert_one(source_file: str) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        record: Dict[str, Any] = {
+            "source": source_file,
+            "outputs": converter.output_filenames(source_file),
+            "status": "converted",
+            "stream_copy": [],
+            "seconds": 0.0,
+            "error": None,
+        }
+        try:
+            if not await converter.convert_file_async(source_file):
+                record["status"] = "skipped"
+            record["stream_copy"] = converter.stream_copied.get(
+                source_file, [])
+        except ConversionCancelled:
+            raise
+        except Exception as exc:
+            record["status"] = "failed"
+            record["error"] = str(exc)
+        record["seconds"] = round(time.perf_counter() - started, 3)
+
+        records = [record]
+        loop = asyncio.get_running_loop()
+        for duplicate in groups.duplicates_of(source_file):
+            copy_started = time.perf_counter()
+            copy_record: Dict[str, Any] = {
+                "source": duplicate,
+                "outputs": converter.output_filenames(duplicate),
+                "status": record["status"],
+                "stream_copy": [],
+                "seconds": 0.0,
+                "error": record["error"],
+                "duplicate_of": source_file,
+            }
+            if record["status"] != "failed":
+                try:
+                    with span("replicate", source=duplicate):
+                        linked = await loop.run_in_executor(
+                            None, converter.replicate, source_file,
+                            duplicate)
+                    copy_record["status"] = "linked" if linked else "copied"
+                    if record["status"] == "converted":
+                        savings.add(groups.size(duplicate),
+                                    record["seconds"], linked)
+                except OSError as exc:
+                    copy_record["status"] = "failed"
+                    copy_record["error"] = str(exc)
+            copy_record["seconds"] = round(
+                time.perf_counter() - copy_started, 3)
+            records.append(copy_record)
+        return records
+
+    def save_state() -> None:
+        # A watcher must outlive an unwritable manifest or cost model
+        savers = [("manifest", manifest.save)]
+        if cost_model is not None:
+            savers.append(("cost model", cost_model.save))
+        for name, save in savers:
+            try:
+                save()
+            except OSError as exc:
+                print(f"Could not save the {name}: {exc}", file=sys.stderr)
+
+    def on_result(source_file: str, records: Optional[List[Dict[str, Any]]],
+                  error: Optional[BaseException]) -> None:
+        nonlocal failed, last_save
+        if isinstance(error, ConversionCancelled):
+            return
+        if records is None:
+            records = [{"source": path, "outputs": [],
+                        "status": "failed", "stream_copy": [],
+                        "seconds": None,
+                        "error": str(error)}
+                       for path in [source_file,
+                                    *groups.duplicates_of(source_file)]]
+        for record in records:
+            failed += record["status"] == "failed"
+            emit(record)
+        if (watcher is not None
+                and time.monotonic() - last_save >= WATCH_SAVE_INTERVAL):
+            last_save = time.monotonic()
+            asyncio.get_running_loop().run_in_executor(None, save_state)
+
+    async def run_batch() -> None:
+        if args.remote:
+            converter.remote = WorkerPool(args.remote)
+            slots = await converter.remote.start()
+            if args.workers is None:
+                scheduler.set_concurrency(slots)
+            print(f"Dispatching to {slots} remote slot(s)", file=sys.stderr)
+        governing = None
+        if args.adaptive:
+            governing = asyncio.ensure_future(ConcurrencyGovernor(
+                scheduler, max_jobs=max(scheduler.max_workers,
+                                        4 * default_worker_count())).run())
+        try:
+            with span("run_batch", "batch", sources=len(groups.primaries)):
+                await scheduler.run_batch_async(jobs, convert_one, on_result)
+        finally:
+            if governing is not None:
+                governing.cancel()
+            if converter.remote is not None:
+                await converter.remote.close()
+
+    jobs: Union[Iterable[str], AsyncIterable[str]] = groups.primaries
+    if watcher is not None:
+        jobs = watcher.watch(scheduler)
+    elif not args.fifo:
+        jobs = JobQueue(lambda source_file: estimated_duration(
+            source_file, infos.get(source_file)))
+        jobs.add(groups.primaries,
+                 lambda source_file: priority_of(source_file, priorities))
+
+    if watcher is not None:
+        # Stop a daemonized watcher the same way as on Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        print(f"Watching {', '.join(watcher.roots)} (Ctrl+C to stop)",
+              file=sys.stderr)
+
+    batch_started = time.perf_counter()
+    batch = engine_loop().submit(run_batch())
+    try:
+        batch.result()
+    except KeyboardInterrupt:
+        scheduler.cancel()
+        batch.result()  # wait for the children to exit
+        return EXIT_INTERRUPTED
+    except ConnectionError as exc:
+        print(exc, file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        save_state()
+        if stager is not None:
+            stager.shutdown()
+        tracer = stop_tracing()
+        if tracer is not None:
+            try:
+                tracer.save(args.trace)
+            except OSError as exc:
+                print(f"Could not write trace: {exc}", file=sys.stderr)
+
+    print(f"{len(sources) - failed}/{len(sources)} files OK "
+          f"({len(converter.stream_copied)} stream‑copied) in "
+          f"{time.perf_counter() - batch_started:.2f} s", file=sys.stderr)
+    if args.dedup:
+        print(f"{savings.files} duplicate(s) reused ({savings.linked} "
+              f"hard‑linked): {savings.bytes / 1e6:.1f} MB and "
+              f"{savings.seconds:.2f} s of encoding saved; hashing took "
+              f"{hashing_seconds:.2f} s", file=sys.stderr)
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,538 @@
+#!/usr/bin/env python
+#
+# Tk-free conversion of one batch of audio files
+
+"""Batch converter
+
+Everything needed to convert a batch of sources once the user's choices
+are known: output naming, manifest checks, codec‑aware planning (stream
+copy when the source codec already fits the target), optional two‑pass
+loudness normalization, the single‑ or segment‑parallel FFmpeg run (or an
+in‑process conversion for simple WAV jobs), optional staging in a scratch
+directory and manifest bookkeeping.  Completed jobs can recalibrate a
+:class:`cost_model.CostModel`, and every phase is a :mod:`trace_events`
+span.  Both the GUI and the command‑line front
+end drive conversions through :class:`BatchConverter`.
+"""
+
+
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from conversion_engine import ConversionScheduler
+from conversion_manifest import ConversionManifest
+from conversion_strategies import (AudioConversionStrategy,
+                                   StreamCopyStrategy, compose_conversion,
+                                   default_strategies)
+from cost_model import CostModel
+from ffmpeg_progress import ProgressState
+from loudness import LoudnessNormalizer
+from media_probe import MediaInfo, MetadataProber, probe_media
+from output_staging import OutputStager, StagedJob
+from remote_workers import WorkerPool
+from segment_encoder import DEFAULT_MIN_DURATION, SegmentEncoder, can_segment
+from source_dedup import link_or_copy
+from trace_events import span
+from wav_fast_path import wav_duration
+
+
+def relative_directory(source_file: str, source_roots: Iterable[str]) -> str:
+    """
+    Return the directory of *source_file* relative to the deepest of
+    *source_roots* containing it, or ``""`` if none does.
+    """
+    directory = os.path.dirname(os.path.abspath(source_file))
+    best = None
+    for root in source_roots:
+        root = os.path.abspath(root)
+        if (directory == root
+                or directory.startswith(root.rstrip(os.sep) + os.sep)):
+            if best is None or len(root) > len(best):
+                best = root
+    if best is None:
+        return ""
+    relative = os.path.relpath(directory, best)
+    return "" if relative == os.curdir else relative
+
+
+def output_filename(source_file: str, output_directory: str,
+                    target_format: str,
+                    source_roots: Iterable[str] = ()) -> str:
+    """
+    Return the destination of *source_file* for *target_format*.
+
+    Sources found below one of the folders *source_roots* keep their
+    sub‑directory under *output_directory*, so that ``a/x.wav`` and
+    ``b/x.wav`` do not both become ``x.mp3``.
+    """
+    basename = os.path.basename(source_file)
+    filename, _ = os.path.splitext(basename)
+    return os.path.join(output_directory,
+                        relative_directory(source_file, source_roots),
+                        f"{filename}.{target_format}")
+
+
+def output_collisions(sources: Iterable[str], output_directory: str,
+                      target_format: str,
+                      source_roots: Iterable[str] = ()
+                      ) -> Dict[str, List[str]]:
+    """
+    Return ``{output: sources}`` for the outputs several of *sources*
+    would write (e.g. same‑named files added from different folders).
+    """
+    source_roots = list(source_roots)
+    writers: Dict[str, List[str]] = {}
+    for source_file in sources:
+        output_file = os.path.abspath(output_filename(
+            source_file, output_directory, target_format, source_roots))
+        writers.setdefault(output_file, []).append(source_file)
+    return {output_file: writers_of
+            for output_file, writers_of in writers.items()
+            if len(writers_of) > 1}
+
+
+class BatchConverter:
+    """Convert sources to one or more target formats with fixed settings."""
+
+    def __init__(
+        self,
+        scheduler: ConversionScheduler,
+        output_directory: str,
+        target_formats: List[str],
+        quality: str,
+        strategies: Optional[Dict[str, AudioConversionStrategy]] = None,
+        manifest: Optional[ConversionManifest] = None,
+        skip_unchanged: bool = True,
+        split_long_files: bool = False,
+        stream_copy: bool = True,
+        prober: Optional[MetadataProber] = None,
+        stager: Optional[OutputStager] = None,
+        normalizer: Optional[LoudnessNormalizer] = None,
+        in_process: bool = True,
+        cost_model: Optional[CostModel] = None,
+        remote: Optional[WorkerPool] = None,
+        source_roots: Iterable[str] = (),
+    ) -> None:
+        """
+        Parameters
+        ----------
+        scheduler:
+            Scheduler that starts (and can cancel) every FFmpeg child.
+        output_directory:
+            Directory receiving the converted files.
+        target_formats:
+            Target formats; the first one is the primary format.
+        quality:
+            Quality preset passed to every strategy.
+        strategies:
+            Strategy registry keyed by format.  Defaults to
+            :func:`conversion_strategies.default_strategies`.
+        manifest:
+            Manifest consulted to skip up‑to‑date outputs and updated after
+            every successful conversion.
+        skip_unchanged:
+            Skip outputs the manifest reports as up to date.
+        split_long_files:
+            Encode long inputs as parallel segments when possible.
+        stream_copy:
+            Remux instead of re‑encoding when the probed source codec
+            already suits a target (see
+            :meth:`AudioConversionStrategy.can_copy`).
+        prober:
+            Prober (and cache) used to inspect sources; without one each
+            source is probed with :func:`media_probe.probe_media`.
+        stager:
+            When given, FFmpeg writes to its scratch directory and every
+            output is verified and then moved into place, so the
+            destination never holds a partial file.
+        normalizer:
+            When given, every output is loudness‑normalized to its target
+            (which rules out stream copy and segment‑parallel encoding).
+        in_process:
+            Let strategies convert simple sources without FFmpeg (see
+            :meth:`AudioConversionStrategy.convert_in_process`).
+        cost_model:
+            Recalibrated with the time and output sizes of every job
+            converted.
+        remote:
+            When given, encodes run on these worker daemons instead of
+            locally (loudness analysis and segment‑parallel encodes stay
+            local).  Cannot be combined with *stager*: the daemons would
+            be told to write to this machine's scratch directory.
+        source_roots:
+            Folders the sources were collected from; their sub‑directory
+            structure is recreated under *output_directory* (see
+            :func:`output_filename`).
+
+        Raises
+        ------
+        ValueError
+            If both *stager* and *remote* are given.
+        """
+        if stager is not None and remote is not None:
+            raise ValueError("Outputs of remote workers cannot be staged")
+        self.scheduler = scheduler
+        self.output_directory = output_directory
+        self.target_formats = target_formats
+        self.quality = quality
+        self.strategies = strategies or default_strategies()
+        self.manifest = manifest
+        self.skip_unchanged = skip_unchanged
+        self.split_long_files = split_long_files
+        self.stream_copy = stream_copy
+        self.prober = prober
+        self.stager = stager
+        self.normalizer = normalizer
+        self.in_process = in_process
+        self.cost_model = cost_model
+        self.remote = remote
+        self.source_roots = list(source_roots)
+        #: Outputs written by stream copy, keyed by source.
+        self.stream_copied: Dict[str, List[str]] = {}
+        #: Source writing each output, to refuse a second one.
+        self._writers: Dict[str, str] = {}
+
+    def output_filename(self, source_file: str,
+                        target_format: Optional[str] = None) -> str:
+        """Return destination filename with chosen extension."""
+        return output_filename(source_file, self.output_directory,
+                               target_format or self.target_formats[0],
+                               self.source_roots)
+
+    def output_filenames(self, source_file: str) -> List[str]:
+        """Return one destination filename per format of the batch."""
+        return [self.output_filename(source_file, fmt)
+                for fmt in self.target_formats]
+
+    def probe(self, source_file: str) -> Optional[MediaInfo]:
+        """Return the probed stream info of *source_file*, or ``None``."""
+        if self.prober is not None:
+            return self.prober.probe(source_file)
+        return probe_media(source_file)
+
+    async def convert_file_async(
+        self,
+        source_file: str,
+        output_files: Optional[List[str]] = None,
+        on_progress: Optional[Callable[[ProgressState], None]] = None,
+    ) -> bool:
+        """
+        Convert *source_file* to every file of *output_files* using FFmpeg.
+
+        *output_files* defaults to :meth:`output_filenames`.  The target
+        format of each output is taken from its extension, and all outputs
+        are written by a single FFmpeg invocation so the source is decoded
+        only once.  Outputs whose target accepts the source codec are
+        remuxed rather than re‑encoded and listed in :attr:`stream_copied`;
+        outputs a strategy can write in process (simple PCM WAV) skip
+        FFmpeg, which then only writes the others, if any.
+        Returns ``False`` when every output was skipped because
+        the manifest shows it is already up to date, ``True`` otherwise.
+
+        Must be awaited on :func:`conversion_engine.engine_loop`.  FFmpeg
+        runs without tying up a thread; manifest checks, probing and
+        in‑process conversion, which block, use the loop's default
+        executor.  Staged outputs are verified and copied out on the
+        stager's pool after the job has given its worker slot back (see
+        :meth:`ConversionScheduler.release_slot`); the job only completes
+        once they are in place.
+
+        Raises
+        ------
+        ValueError
+            If a requested target format is unsupported or another source
+            of the batch writes the same output.
+        Exception
+            If FFmpeg fails or is not found.
+        """
+        loop = asyncio.get_running_loop()
+        with span("convert_file", source=source_file) as fields:
+            with span("pending_targets"):
+                targets = await loop.run_in_executor(
+                    None, self._pending_targets, source_file, output_files)
+            fields["outputs"] = len(targets)
+            if not targets:
+                return False
+
+            started = time.perf_counter()
+            with span("stage"):
+                staged = await loop.run_in_executor(None, self._stage,
+                                                    targets)
+            try:
+                with span("in_process"):
+                    converted = await loop.run_in_executor(
+                        None, self._convert_in_process, source_file,
+                        targets, staged)
+                encoded = [target for target in targets
+                           if target not in converted]
+                info, copied = None, []
+                if encoded:
+                    info, copied = await self._encode_async(
+                        source_file, encoded, staged, on_progress)
+                if staged is not None:
+                    # The encode is done: copy out without holding up
+                    # the next one
+                    self.scheduler.release_slot()
+                    with span("finish_staging"):
+                        await self.stager.finish_async(
+                            staged,
+                            info.duration if info is not None else None)
+            finally:
+                if staged is not None:
+                    staged.discard()
+
+            seconds = time.perf_counter() - started
+            with span("record"):
+                await loop.run_in_executor(None, self._record, source_file,
+                                           targets, copied)
+                await loop.run_in_executor(None, self._observe,
+                                           encoded or targets, copied, info,
+                                           not encoded, seconds)
+            return True
+
+    async def _encode_async(
+        self, source_file: str,
+        targets: List[Tuple[AudioConversionStrategy, str]],
+        staged: Optional[StagedJob],
+        on_progress: Optional[Callable[[ProgressState], None]],
+    ) -> Tuple[Optional[MediaInfo], List[str]]:
+        """Run FFmpeg for *targets*; return the source info and remuxes."""
+        loop = asyncio.get_running_loop()
+        try:
+            with span("probe"):
+                info = await loop.run_in_executor(None, self._probe_for,
+                                                  source_file)
+            copied, segment_duration = self._plan(targets, info)
+            audio_filter = None
+            if self.normalizer is not None:
+                with span("loudness_analysis"):
+                    measurement = await self.normalizer.measure_async(
+                        self.scheduler, source_file)
+                audio_filter = self.normalizer.filter(measurement, info)
+            segmented = False
+            if segment_duration is not None:
+                with span("segments", duration=segment_duration) as fields:
+                    encoder = SegmentEncoder(self.scheduler)
+                    segmented = await encoder.encode_async(
+                        source_file, self._written(targets, staged),
+                        self.quality, segment_duration, on_progress)
+                    fields["segmented"] = segmented
+            if not segmented:
+                cmd = self._command(source_file, targets, copied, staged,
+                                    audio_filter)
+                if self.remote is not None:
+                    returncode, stderr = await self.remote.run_ffmpeg_async(
+                        self.scheduler, cmd, on_progress)
+                else:
+                    returncode, stderr = (
+                        await self.scheduler.run_ffmpeg_async(
+                            cmd, on_progress=on_progress))
+                if returncode:
+                    raise Exception(f"FFmpeg error: {stderr}")
+        except FileNotFoundError as exc:
+            raise Exception("FFmpeg not found. Please install FFmpeg "
+                            "and ensure it's in your PATH.") from exc
+        return info, copied
+
+    def replicate(self, source_file: str, duplicate: str) -> bool:
+        """
+        Give *duplicate*, a byte‑identical copy of *source_file*, the outputs
+        just written for *source_file* instead of encoding it again.
+
+        Returns ``True`` if every output could be hard‑linked rather than
+        copied.
+        """
+        linked = True
+        for target_format in self.target_formats:
+            output_file = self.output_filename(source_file, target_format)
+            copy_file = self.output_filename(duplicate, target_format)
+            if os.path.abspath(copy_file) != os.path.abspath(output_file):
+                self._claim(duplicate, copy_file)
+                os.makedirs(os.path.dirname(copy_file) or os.curdir,
+                            exist_ok=True)
+                linked &= link_or_copy(output_file, copy_file)
+            if self.manifest is not None:
+                self.manifest.record(
+                    duplicate, copy_file,
+                    self._recipe(self.strategies[target_format]),
+                    self.quality)
+        return linked
+
+    # --------------------------------------------------------------------- #
+    # Planning
+    # --------------------------------------------------------------------- #
+
+    def _pending_targets(self, source_file: str,
+                         output_files: Optional[List[str]]
+                         ) -> List[Tuple[AudioConversionStrategy, str]]:
+        """Return the ``(strategy, output)`` pairs that need (re)writing."""
+        if output_files is None:
+            output_files = self.output_filenames(source_file)
+
+        targets: List[Tuple[AudioConversionStrategy, str]] = []
+        for output_file in output_files:
+            target_format = os.path.splitext(output_file)[1][1:].lower()
+            strategy = self.strategies.get(target_format)
+            if strategy is None:
+                raise ValueError(f"Unsupported format: {target_format}")
+            self._claim(source_file, output_file)
+            targets.append((strategy, output_file))
+
+        manifest = self.manifest
+        pending = []
+        for strategy, output_file in targets:
+            if manifest is not None:
+                if (self.skip_unchanged and manifest.is_up_to_date(
+                        source_file, output_file, self._recipe(strategy),
+                        self.quality)):
+                    continue
+                manifest.forget(output_file)
+            self._unshare(output_file)
+            os.makedirs(os.path.dirname(output_file) or os.curdir,
+                        exist_ok=True)
+            pending.append((strategy, output_file))
+        return pending
+
+    def _claim(self, source_file: str, output_file: str) -> None:
+        """
+        Reserve *output_file* for *source_file* for the rest of the batch.
+
+        Raises
+        ------
+        ValueError
+            If another source of the batch already writes *output_file*.
+        """
+        writer = self._writers.setdefault(os.path.abspath(output_file),
+                                          source_file)
+        if writer != source_file:
+            raise ValueError(f"{output_file} is already written for "
+                             f"{writer}")
+
+    @staticmethod
+    def _unshare(output_file: str) -> None:
+        """
+        Remove *output_file* if it is hard‑linked to a duplicate's output,
+        so that FFmpeg overwriting it in place leaves the other one intact.
+        """
+        try:
+            if os.stat(output_file).st_nlink > 1:
+                os.remove(output_file)
+        except OSError:
+            pass
+
+    def _recipe(self, strategy: AudioConversionStrategy) -> str:
+        """Return the name the manifest records an output's encoding under."""
+        if self.normalizer is None:
+            return type(strategy).__name__
+        return f"{type(strategy).__name__}+loudnorm({self.normalizer.target})"
+
+    def _probe_for(self, source_file: str) -> Optional[MediaInfo]:
+        """Probe *source_file* only if planning or verification needs it."""
+        if (self.stream_copy or self.split_long_files
+                or self.stager is not None or self.normalizer is not None
+                or self.cost_model is not None):
+            return self.probe(source_file)
+        return None
+
+    def _plan(self, targets: List[Tuple[AudioConversionStrategy, str]],
+              info: Optional[MediaInfo]
+              ) -> Tuple[List[str], Optional[float]]:
+        """
+        Return the outputs to remux and, when the source should be encoded
+        as parallel segments, its duration.
+        """
+        if self.normalizer is not None:
+            return [], None  # every output goes through the filter
+        copied = []
+        if self.stream_copy:
+            copied = [output for strategy, output in targets
+                      if strategy.can_copy(info, self.quality)]
+        duration = info.duration if info is not None else None
+        if (self.split_long_files and not copied
+                and duration is not None
+                and duration >= DEFAULT_MIN_DURATION
+                and can_segment(output for _, output in targets)):
+            return copied, duration
+        return copied, None
+
+    def _convert_in_process(
+            self, source_file: str,
+            targets: List[Tuple[AudioConversionStrategy, str]],
+            staged: Optional[StagedJob]
+    ) -> List[Tuple[AudioConversionStrategy, str]]:
+        """Write the targets that need no FFmpeg and return them."""
+        if not self.in_process or self.normalizer is not None:
+            return []
+        return [target for target, (strategy, written)
+                in zip(targets, self._written(targets, staged))
+                if strategy.convert_in_process(source_file, written,
+                                               self.quality)]
+
+    def _stage(self, targets: List[Tuple[AudioConversionStrategy, str]]
+               ) -> Optional[StagedJob]:
+        """Reserve scratch paths for *targets* when staging is enabled."""
+        if self.stager is None:
+            return None
+        return self.stager.stage([output for _, output in targets])
+
+    @staticmethod
+    def _written(targets: List[Tuple[AudioConversionStrategy, str]],
+                 staged: Optional[StagedJob]
+                 ) -> List[Tuple[AudioConversionStrategy, str]]:
+        """Return *targets* with the paths FFmpeg actually writes to."""
+        if staged is None:
+            return targets
+        return [(strategy, staged.paths[output])
+                for strategy, output in targets]
+
+    def _command(self, source_file: str,
+                 targets: List[Tuple[AudioConversionStrategy, str]],
+                 copied: List[str],
+                 staged: Optional[StagedJob] = None,
+                 audio_filter: Optional[str] = None) -> List[str]:
+        """Return the single FFmpeg command writing every target."""
+        remux = StreamCopyStrategy()
+        with span("build_command", "command", outputs=len(targets)):
+            return compose_conversion(
+                source_file,
+                [(remux if output in copied else strategy, written)
+                 for (strategy, output), (_, written)
+                 in zip(targets, self._written(targets, staged))],
+                self.quality, audio_filter=audio_filter)
+
+    def _record(self, source_file: str,
+                targets: List[Tuple[AudioConversionStrategy, str]],
+                copied: List[str]) -> None:
+        """Note the written outputs in :attr:`stream_copied` and the manifest."""
+        if copied:
+            self.stream_copied[source_file] = copied
+        if self.manifest is not None:
+            for strategy, output_file in targets:
+                self.manifest.record(source_file, output_file,
+                                     self._recipe(strategy), self.quality)
+
+    def _observe(self, targets: List[Tuple[AudioConversionStrategy, str]],
+                 copied: List[str], info: Optional[MediaInfo],
+                 in_process: bool, seconds: float) -> None:
+        """Feed a completed job's time and output sizes to the cost model."""
+        if self.cost_model is None:
+            return
+        duration = info.duration if info is not None else None
+        if duration is None and in_process:
+            duration = wav_duration(targets[0][1])
+        if not duration:
+            return
+        kind, steps = self.cost_model.steps(
+            [(strategy, output in copied) for strategy, output in targets],
+            info, self.quality, in_process=in_process,
+            normalize=self.normalizer is not None)
+        sizes: List[Optional[int]] = []
+        if info is not None:  # otherwise the expected sizes are guesses
+            for _, output_file in targets:
+                try:
+                    sizes.append(os.path.getsize(output_file))
+                except OSError:
+                    sizes.append(None)
+        self.cost_model.observe(kind, steps, duration, seconds, sizes)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+#
+# Benchmark: encodes dispatched to localhost worker daemons
+
+"""Remote workers benchmark
+
+Starts several :class:`remote_workers.WorkerServer` daemons on localhost
+(in this process, on ephemeral TCP ports), sends a batch of encodes of
+one synthetic clip to them through :class:`remote_workers.WorkerPool` and
+prints the wall‑clock time and the throughput.
+
+Unless ``--drop-after 0`` is given, the first daemon stops listening and
+drops its connection part way through the batch, so the jobs it was
+running must be re‑queued on the others.  The run exits with status 1 if
+any job failed, an output is missing, or no job was re‑queued.
+
+Usage::
+
+    python bench_remote_workers.py [--daemons 2] [--slots 2] [--jobs 16]
+                                   [--duration 60] [--drop-after 1]
+"""
+
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, List, Optional, Set, Tuple
+
+from synthetic_audio import generate_audio
+
+from conversion_engine import ConversionScheduler, engine_loop
+from conversion_strategies import default_strategies
+from remote_workers import WorkerPool, WorkerServer
+
+
+class DroppableServer(WorkerServer):
+    """Worker daemon whose connections can be cut to simulate a crash."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.listening: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            await super()._handle(reader, writer)
+        finally:
+            self._writers.discard(writer)
+
+    def drop(self) -> None:
+        """Stop listening and abort every client connection."""
+        if self.listening is not None:
+            self.listening.close()
+        for writer in list(self._writers):
+            writer.transport.abort()
+
+
+class CountingPool(WorkerPool):
+    """Worker pool counting the jobs put back after a disconnect."""
+
+    requeued = 0
+
+    def _requeue(self, job: Any, address: str) -> None:
+        if not job.future.done() and job.attempts < self.max_attempts:
+            self.requeued += 1
+        super()._requeue(job, address)
+
+
+async def run(args: argparse.Namespace, source: str,
+              outputs: List[str]) -> Tuple[int, int, int]:
+    """
+    Run the batch on the engine loop; return the slots used and the jobs
+    that failed and that were re‑queued.
+    """
+    servers = []
+    addresses = []
+    for _ in range(args.daemons):
+        server = DroppableServer(ConversionScheduler(max_workers=args.slots))
+        server.listening = await server.serve("127.0.0.1:0")
+        port = server.listening.sockets[0].getsockname()[1]
+        servers.append(server)
+        addresses.append(f"127.0.0.1:{port}")
+
+    pool = CountingPool(addresses, reconnect_interval=0.5)
+    slots = await pool.start()
+    scheduler = ConversionScheduler(max_workers=slots)
+    strategy = default_strategies()[args.format]
+    failed = 0
+
+    async def work(output: str) -> None:
+        returncode, stderr = await pool.run_ffmpeg_async(
+            scheduler, strategy.convert(source, output, args.quality),
+            duration=args.duration)
+        if returncode:
+            raise RuntimeError(stderr)
+
+    def on_result(output: str, _: Any,
+                  error: Optional[BaseException]) -> None:
+        nonlocal failed
+        if error is not None:
+            failed += 1
+            print(f"failed: {os.path.basename(output)}: {error}")
+
+    if args.drop_after > 0:
+        asyncio.get_running_loop().call_later(args.drop_after,
+                                              servers[0].drop)
+    try:
+        await scheduler.run_batch_async(outputs, work, on_result)
+    finally:
+        await pool.close()
+        for server in servers:
+            server.drop()
+    return slots, failed, pool.requeued
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--daemons", type=int, default=2)
+    parser.add_argument("--slots", type=int, default=2,
+                        help="concurrent jobs per daemon")
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="length of the synthetic input in seconds")
+    parser.add_argument("--format", default="mp3")
+    parser.add_argument("--quality", default="High")
+    parser.add_argument("--drop-after", type=float, default=1.0,
+                        help="seconds before the first daemon disconnects"
+                             " (0: never)")
+    args = parser.parse_args()
+    if args.drop_after > 0 and args.daemons < 2:
+        parser.error("dropping a daemon needs --daemons 2 or more")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = generate_audio(os.path.join(work_dir, "source.flac"),
+                                args.duration)
+        outputs = [os.path.join(work_dir, f"out_{index}.{args.format}")
+                   for index in range(args.jobs)]
+        started = time.perf_counter()
+        slots, failed, requeued = engine_loop().submit(
+            run(args, source, outputs)).result()
+        seconds = time.perf_counter() - started
+        missing = sum(1 for output in outputs
+                      if not os.path.isfile(output)
+                      or not os.path.getsize(output))
+
+    print(f"jobs:       {args.jobs} x {args.duration:.0f} s, "
+          f"{args.format} @ {args.quality}")
+    print(f"slots:      {slots} on {args.daemons} daemon(s)")
+    print(f"requeued:   {requeued}")
+    print(f"wall time:  {seconds:8.2f} s")
+    print(f"throughput: {args.jobs * args.duration / seconds:8.1f}x "
+          "real time")
+    if failed or missing:
+        raise SystemExit(f"{failed} job(s) failed, {missing} output(s) "
+                         "missing or empty")
+    if args.drop_after > 0 and not requeued:
+        raise SystemExit("no job was re‑queued; raise --jobs or lower "
+                         "--drop-after so the dropped daemon is busy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+#
+# Benchmark: segment-parallel encoding versus a single FFmpeg process
+
+"""Segment encoding benchmark
+
+Encodes one long synthetic recording both with a single FFmpeg process and
+with :class:`segment_encoder.SegmentEncoder`, then prints the wall‑clock
+times and the speedup.
+
+Usage::
+
+    python bench_segment_encoding.py [--duration 7200] [--format mp3]
+"""
+
+
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic_audio import generate_audio
+
+from conversion_engine import (ConversionScheduler, default_worker_count,
+                               engine_loop)
+from conversion_strategies import default_strategies
+from segment_encoder import (DEFAULT_SEGMENT_SECONDS, SEGMENTABLE_FORMATS,
+                             SegmentEncoder)
+
+STRATEGIES = {fmt: strategy for fmt, strategy in default_strategies().items()
+              if fmt in SEGMENTABLE_FORMATS}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=7200.0,
+                        help="length of the synthetic input in seconds")
+    parser.add_argument("--format", choices=sorted(STRATEGIES),
+                        default="mp3")
+    parser.add_argument("--quality", default="High")
+    parser.add_argument("--workers", type=int, default=default_worker_count())
+    parser.add_argument("--segment-seconds", type=float,
+                        default=DEFAULT_SEGMENT_SECONDS)
+    args = parser.parse_args()
+
+    strategy = STRATEGIES[args.format]
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = generate_audio(os.path.join(work_dir, "source.flac"),
+                                args.duration)
+        single_out = os.path.join(work_dir, f"single.{args.format}")
+        segmented_out = os.path.join(work_dir, f"segmented.{args.format}")
+
+        scheduler = ConversionScheduler(max_workers=args.workers)
+
+        started = time.perf_counter()
+        returncode, stderr = engine_loop().submit(scheduler.run_ffmpeg_async(
+            strategy.convert(source, single_out, args.quality))).result()
+        if returncode:
+            raise SystemExit(stderr)
+        single_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        encoder = SegmentEncoder(scheduler,
+                                 segment_seconds=args.segment_seconds)
+        if not engine_loop().submit(encoder.encode_async(
+                source, [(strategy, segmented_out)], args.quality,
+                args.duration)).result():
+            raise SystemExit("no worker to lend to the segments; "
+                             "pass --workers 2 or more")
+        segmented_seconds = time.perf_counter() - started
+
+    print(f"input:      {args.duration:.0f} s, {args.format} @ {args.quality}")
+    print(f"workers:    {args.workers}")
+    print(f"single:     {single_seconds:8.2f} s")
+    print(f"segmented:  {segmented_seconds:8.2f} s")
+    print(f"speedup:    {single_seconds / segmented_seconds:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
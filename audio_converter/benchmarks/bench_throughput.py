@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+#
+# Benchmark: conversion throughput per strategy, preset and worker count
+
+"""Throughput benchmark
+
+Converts a synthetic corpus (every combination of the requested durations
+and sample rates) with every strategy, quality preset and worker count,
+then writes the results to JSON and prints a comparison table.  Pass a
+previous JSON file as ``--baseline`` to see the change per configuration.
+
+Usage::
+
+    python bench_throughput.py [--durations 30,120] [--workers 1,4]
+                               [--output throughput.json]
+                               [--baseline previous.json]
+"""
+
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from synthetic_audio import generate_audio
+
+from batch_converter import BatchConverter
+from conversion_engine import (ConversionScheduler, default_worker_count,
+                               engine_loop)
+from conversion_strategies import QUALITY_PRESETS, default_strategies
+
+#: Container of the generated inputs; lossless so every target transcodes.
+SOURCE_FORMAT = "flac"
+
+
+def parse_list(value: str, kind: type) -> List[Any]:
+    """Parse a comma‑separated command‑line list."""
+    return [kind(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def ffmpeg_version() -> str:
+    """Return the first line of ``ffmpeg -version``."""
+    result = subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE,
+                            universal_newlines=True, check=False)
+    return result.stdout.splitlines()[0] if result.stdout else "unknown"
+
+
+def build_corpus(directory: str, durations: List[float],
+                 sample_rates: List[int],
+                 copies: int) -> List[Tuple[str, float, int]]:
+    """Generate the inputs and return ``(path, duration, sample_rate)``."""
+    corpus = []
+    for duration in durations:
+        for sample_rate in sample_rates:
+            for copy in range(copies):
+                name = f"{duration:g}s_{sample_rate}hz_{copy}.{SOURCE_FORMAT}"
+                path = generate_audio(os.path.join(directory, name),
+                                      duration, sample_rate)
+                corpus.append((path, duration, sample_rate))
+    return corpus
+
+
+def run_configuration(corpus: List[Tuple[str, float, int]], fmt: str,
+                      quality: str, workers: int,
+                      output_directory: str) -> Dict[str, Any]:
+    """Convert the whole corpus once and return the measured throughput."""
+    scheduler = ConversionScheduler(max_workers=workers)
+    converter = BatchConverter(scheduler, output_directory, [fmt], quality,
+                               skip_unchanged=False, stream_copy=False)
+    failures: List[str] = []
+
+    def on_result(source: str, _converted: Optional[bool],
+                  error: Optional[BaseException]) -> None:
+        if error is not None:
+            failures.append(f"{os.path.basename(source)}: {error}")
+
+    started = time.perf_counter()
+    engine_loop().submit(scheduler.run_batch_async(
+        [path for path, _, _ in corpus], converter.convert_file_async,
+        on_result)).result()
+    seconds = time.perf_counter() - started
+
+    audio_seconds = sum(duration for _, duration, _ in corpus)
+    return {
+        "format": fmt,
+        "quality": quality,
+        "workers": workers,
+        "files": len(corpus),
+        "seconds": round(seconds, 4),
+        "files_per_second": round(len(corpus) / seconds, 3),
+        "realtime_factor": round(audio_seconds / seconds, 2),
+        "failures": failures,
+    }
+
+
+def result_key(result: Dict[str, Any]) -> Tuple[str, str, int]:
+    """Return the configuration a result was measured with."""
+    return result["format"], result["quality"], result["workers"]
+
+
+def print_table(results: List[Dict[str, Any]],
+                baseline: Optional[Dict[Tuple[str, str, int], Any]]) -> None:
+    """Print one row per configuration, with the change versus *baseline*."""
+    header = (f"{'format':<7}{'quality':<10}{'workers':>8}{'files/s':>10}"
+              f"{'realtime':>11}{'seconds':>10}")
+    if baseline is not None:
+        header += f"{'vs base':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        line = (f"{result['format']:<7}{result['quality']:<10}"
+                f"{result['workers']:>8}{result['files_per_second']:>10.2f}"
+                f"{result['realtime_factor']:>10.1f}x"
+                f"{result['seconds']:>10.2f}")
+        if baseline is not None:
+            previous = baseline.get(result_key(result))
+            if previous:
+                change = (result["realtime_factor"]
+                          / previous["realtime_factor"] - 1) * 100
+                line += f"{change:>+9.1f}%"
+            else:
+                line += f"{'new':>10}"
+        if result["failures"]:
+            line += f"  ({len(result['failures'])} failed)"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--durations", default="30,120",
+                        help="input lengths in seconds, comma‑separated")
+    parser.add_argument("--sample-rates", default="22050,44100,48000",
+                        help="input sample rates, comma‑separated")
+    parser.add_argument("--copies", type=int, default=2,
+                        help="files per duration/sample‑rate combination")
+    parser.add_argument("--formats", default=",".join(default_strategies()),
+                        help="target formats, comma‑separated")
+    parser.add_argument("--qualities", default=",".join(QUALITY_PRESETS),
+                        help="quality presets, comma‑separated")
+    parser.add_argument("--workers",
+                        default=f"1,{default_worker_count()}",
+                        help="worker counts, comma‑separated")
+    parser.add_argument("--corpus-dir",
+                        help="keep generated inputs here between runs")
+    parser.add_argument("--output", default="throughput.json",
+                        help="JSON results file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare")
+    args = parser.parse_args()
+
+    strategies = default_strategies()
+    formats = parse_list(args.formats, str)
+    unknown = [fmt for fmt in formats if fmt not in strategies]
+    if unknown:
+        parser.error(f"unsupported format(s): {', '.join(unknown)}")
+    qualities = parse_list(args.qualities, str)
+    unknown = [quality for quality in qualities
+               if quality not in QUALITY_PRESETS]
+    if unknown:
+        parser.error(f"unknown quality preset(s): {', '.join(unknown)}")
+    durations = parse_list(args.durations, float)
+    sample_rates = parse_list(args.sample_rates, int)
+    worker_counts = sorted(set(parse_list(args.workers, int)))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = {result_key(result): result
+                        for result in json.load(fh)["results"]}
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = args.corpus_dir or work_dir
+        os.makedirs(corpus_dir, exist_ok=True)
+        corpus = build_corpus(corpus_dir, durations, sample_rates,
+                              args.copies)
+        for fmt in formats:
+            for quality in qualities:
+                for workers in worker_counts:
+                    output_directory = tempfile.mkdtemp(dir=work_dir)
+                    results.append(run_configuration(
+                        corpus, fmt, quality, workers, output_directory))
+
+    report = {
+        "environment": {
+            "ffmpeg": ffmpeg_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "corpus": {
+            "durations": durations,
+            "sample_rates": sample_rates,
+            "copies": args.copies,
+            "source_format": SOURCE_FORMAT,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+
+    print_table(results, baseline)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
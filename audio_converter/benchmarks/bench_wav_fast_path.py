@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+# Benchmark: in-process WAV conversion versus FFmpeg on short clips
+
+"""WAV fast path benchmark
+
+Converts a corpus of short synthetic WAV clips to WAV twice, once with the
+in‑process fast path (:mod:`wav_fast_path`) and once forcing an FFmpeg
+process per clip, then prints the throughput of both and the speedup.
+Clips are generated per requested source sample format, so both a plain
+re‑save (16‑bit) and a bit‑depth change (e.g. 8‑bit) are measured.
+
+Usage::
+
+    python bench_wav_fast_path.py [--clips 200] [--duration 0.5]
+                                  [--codecs pcm_s16le,pcm_u8] [--workers 4]
+"""
+
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from typing import List, Optional
+
+from synthetic_audio import generate_audio
+
+from batch_converter import BatchConverter
+from conversion_engine import (ConversionScheduler, default_worker_count,
+                               engine_loop)
+from wav_fast_path import available
+
+
+def build_clips(directory: str, count: int, duration: float,
+                codec: str) -> List[str]:
+    """Return *count* clips in *codec*, copied from one generated clip."""
+    template = generate_audio(os.path.join(directory, "template.flac"),
+                              duration)
+    first = os.path.join(directory, f"{codec}_0000.wav")
+    if not os.path.exists(first):
+        subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", template,
+                        "-c:a", codec, first], check=True)
+    with open(first, "rb") as fh:
+        data = fh.read()
+    clips = [first]
+    for index in range(1, count):
+        path = os.path.join(directory, f"{codec}_{index:04d}.wav")
+        if not os.path.exists(path):
+            with open(path, "wb") as fh:
+                fh.write(data)
+        clips.append(path)
+    return clips
+
+
+def run(clips: List[str], in_process: bool, workers: int,
+        output_directory: str) -> float:
+    """Convert *clips* once and return the wall‑clock seconds."""
+    scheduler = ConversionScheduler(max_workers=workers)
+    # No stream copy: its probing would only be charged to the FFmpeg path
+    converter = BatchConverter(scheduler, output_directory, ["wav"], "High",
+                               skip_unchanged=False, stream_copy=False,
+                               in_process=in_process)
+    failures: List[str] = []
+
+    def on_result(source: str, _converted: Optional[bool],
+                  error: Optional[BaseException]) -> None:
+        if error is not None:
+            failures.append(f"{os.path.basename(source)}: {error}")
+
+    started = time.perf_counter()
+    engine_loop().submit(scheduler.run_batch_async(
+        clips, converter.convert_file_async, on_result)).result()
+    seconds = time.perf_counter() - started
+    if failures:
+        raise SystemExit(f"{len(failures)} conversions failed, e.g. "
+                         f"{failures[0]}")
+    return seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=200,
+                        help="clips per source sample format")
+    parser.add_argument("--duration", type=float, default=0.5,
+                        help="clip length in seconds")
+    parser.add_argument("--codecs", default="pcm_s16le,pcm_u8",
+                        help="source sample formats, comma‑separated")
+    parser.add_argument("--workers", type=int, default=default_worker_count())
+    args = parser.parse_args()
+
+    if not available():
+        raise SystemExit("NumPy is required for the WAV fast path.")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"{'source':<11}{'path':<12}{'files/s':>10}{'seconds':>10}")
+        for codec in [c.strip() for c in args.codecs.split(",") if c.strip()]:
+            clips = build_clips(work_dir, args.clips, args.duration, codec)
+            timings = {}
+            for label, in_process in (("ffmpeg", False),
+                                      ("in-process", True)):
+                seconds = run(clips, in_process, args.workers,
+                              tempfile.mkdtemp(dir=work_dir))
+                timings[label] = seconds
+                print(f"{codec:<11}{label:<12}"
+                      f"{len(clips) / seconds:>10.1f}{seconds:>10.2f}")
+            print(f"{codec:<11}{'speedup':<12}"
+                  f"{timings['ffmpeg'] / timings['in-process']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+#
+# Synthetic test audio for the audio converter benchmarks
+
+"""Synthetic audio
+
+Generates reproducible test inputs locally with FFmpeg's built‑in
+``lavfi`` signal sources, so benchmarks need no external media.
+"""
+
+
+import os
+import subprocess
+import sys
+
+# Make the converter modules importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def generate_audio(path: str, duration: float, sample_rate: int = 44100,
+                   channels: int = 2) -> str:
+    """
+    Write *duration* seconds of tone plus pink noise to *path*.
+
+    The container/codec follows the extension of *path*.  Existing files
+    are reused so repeated benchmark runs skip generation.
+    """
+    if os.path.exists(path):
+        return path
+    layout = "stereo" if channels == 2 else "mono"
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y",
+         "-f", "lavfi", "-i",
+         f"sine=frequency=440:sample_rate={sample_rate}:duration={duration}",
+         "-f", "lavfi", "-i",
+         f"anoisesrc=color=pink:amplitude=0.1:sample_rate={sample_rate}"
+         f":duration={duration}",
+         "-filter_complex",
+         f"amix=inputs=2:duration=shortest,aformat=channel_layouts={layout}",
+         path],
+        check=True,
+    )
+    return path
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#
+# Adaptive FFmpeg concurrency for the audio converter
+
+"""Concurrency governor
+
+Adjusts how many FFmpeg processes a :class:`ConversionScheduler` runs at
+once while a batch is in progress, instead of trusting a fixed worker
+count.
+
+Every few seconds the governor samples the system load average, the CPU
+time consumed by the converter's FFmpeg children and the bytes they read
+and write.  It then hill‑climbs on throughput (media seconds encoded per
+second):
+
+* if the run queue is longer than the CPUs can serve (whether the extra
+  work is ours or another user's on a shared box), it backs off;
+* if the last step did not pay off, it is reverted and the governor holds
+  for a while;
+* if CPUs are left idle (typically because the children wait on slow or
+  network storage), it tries one more process.
+
+Child CPU time, I/O and system CPU use are read from ``/proc`` where
+available; elsewhere the governor falls back to reaped children's CPU time
+and the load average, or to throughput alone.
+"""
+
+
+import asyncio
+import os
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+from conversion_engine import ConversionScheduler, default_worker_count
+
+#: Seconds between two samples (and possible adjustments).
+DEFAULT_INTERVAL = 5.0
+
+#: One‑minute load per CPU above which other work is crowding us out.
+OVERLOAD = 1.25
+
+#: System CPU use (fraction of all CPUs) counted as saturated.
+CPU_SATURATED = 0.9
+
+#: Relative throughput change treated as noise.
+TOLERANCE = 0.05
+
+#: Intervals to wait after reverting a step before trying again.
+HOLD_INTERVALS = 3
+
+_CLOCK_TICKS = (os.sysconf("SC_CLK_TCK")
+                if hasattr(os, "sysconf") else 100)
+
+
+def _proc_cpu_seconds(pid: int) -> float:
+    """Return user+system CPU seconds of the live process *pid*, or 0."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as stat:
+            # The command name may contain spaces; fields follow its ")"
+            fields = stat.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+
+def _system_cpu_times() -> Optional[Tuple[int, int]]:
+    """Return ``(busy, total)`` system CPU ticks from ``/proc/stat``."""
+    try:
+        with open("/proc/stat", encoding="ascii") as stat:
+            fields = [int(value) for value in stat.readline().split()[1:9]]
+    except (OSError, ValueError):
+        return None
+    total = sum(fields)
+    idle = fields[3] + fields[4]  # idle + iowait
+    return total - idle, total
+
+
+def _proc_io_bytes(pid: str) -> int:
+    """Return bytes read plus written by *pid* (``self`` allowed), or 0."""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/io", encoding="ascii") as io_stats:
+            for line in io_stats:
+                key, _, value = line.partition(":")
+                if key in ("rchar", "wchar"):
+                    total += int(value)
+    except (OSError, ValueError):
+        return 0
+    return total
+
+
+class LoadSample:
+    """System and children's load measured over one interval."""
+
+    def __init__(self, load_per_cpu: Optional[float],
+                 cpu_busy: Optional[float], child_cpu: float,
+                 io_rate: float, throughput: float) -> None:
+        #: One‑minute load average divided by the CPU count (``None`` if
+        #: the platform has no load average).
+        self.load_per_cpu = load_per_cpu
+        #: Busy fraction of all CPUs, any process (``None`` if unknown).
+        self.cpu_busy = cpu_busy
+        #: CPU used by our FFmpeg children, as a fraction of all CPUs.
+        self.child_cpu = child_cpu
+        #: Bytes per second read and written by the converter's processes.
+        self.io_rate = io_rate
+        #: Media seconds encoded per wall‑clock second.
+        self.throughput = throughput
+
+
+class LoadSampler:
+    """Turn cumulative counters into per‑interval :class:`LoadSample` s."""
+
+    def __init__(self, scheduler: ConversionScheduler) -> None:
+        self.scheduler = scheduler
+        self.cpu_count = default_worker_count()
+        self._last: Optional[Tuple[float, float, int, float]] = None
+        self._last_system: Optional[Tuple[int, int]] = None
+
+    def _counters(self) -> Tuple[float, float, int, float]:
+        """Return ``(time, child CPU s, I/O bytes, encoded s)`` right now."""
+        pids: Iterable[int] = self.scheduler.child_pids()
+        times = os.times()
+        # Reaped children are in os.times(), live ones only in /proc
+        cpu = (times.children_user + times.children_system
+               + sum(_proc_cpu_seconds(pid) for pid in pids))
+        # /proc/self/io already includes reaped children
+        io_bytes = (_proc_io_bytes("self")
+                    + sum(_proc_io_bytes(str(pid)) for pid in pids))
+        return (time.monotonic(), cpu, io_bytes,
+                self.scheduler.encoded_seconds)
+
+    def sample(self) -> Optional[LoadSample]:
+        """Return the load since the previous call (``None`` the first time)."""
+        now = self._counters()
+        last, self._last = self._last, now
+        system = _system_cpu_times()
+        last_system, self._last_system = self._last_system, system
+        if last is None:
+            return None
+        cpu_busy = None
+        if system is not None and last_system is not None:
+            ticks = system[1] - last_system[1]
+            if ticks > 0:
+                cpu_busy = (system[0] - last_system[0]) / ticks
+        elapsed = max(now[0] - last[0], 1e-6)
+        try:
+            load_per_cpu: Optional[float] = (os.getloadavg()[0]
+                                             / self.cpu_count)
+        except (AttributeError, OSError):
+            load_per_cpu = None
+        return LoadSample(
+            load_per_cpu=load_per_cpu,
+            cpu_busy=cpu_busy,
+            child_cpu=(now[1] - last[1]) / elapsed / self.cpu_count,
+            io_rate=max(0, now[2] - last[2]) / elapsed,
+            throughput=(now[3] - last[3]) / elapsed,
+        )
+
+
+class ConcurrencyGovernor:
+    """Hill‑climb a scheduler's concurrency towards maximum throughput."""
+
+    def __init__(
+        self,
+        scheduler: ConversionScheduler,
+        min_jobs: int = 1,
+        max_jobs: Optional[int] = None,
+        interval: float = DEFAULT_INTERVAL,
+        on_sample: Optional[Callable[[int, LoadSample], None]] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        scheduler:
+            Scheduler whose :attr:`~ConversionScheduler.concurrency` is
+            adjusted; its current value is the starting point.
+        min_jobs, max_jobs:
+            Bounds of the concurrency.  *max_jobs* defaults to four
+            processes per CPU, leaving room for I/O‑bound batches.
+        interval:
+            Seconds between two samples.
+        on_sample:
+            Called on the engine loop after every sample with the
+            (possibly new) concurrency and the sample.
+        """
+        self.scheduler = scheduler
+        self.min_jobs = max(1, min_jobs)
+        self.max_jobs = max(self.min_jobs,
+                            max_jobs or 4 * default_worker_count())
+        self.interval = interval
+        self.on_sample = on_sample
+        self.sampler = LoadSampler(scheduler)
+        self._exploring = False
+        self._last_throughput: Optional[float] = None
+        self._hold = 0
+
+    async def run(self) -> None:
+        """Sample and adjust every *interval* until the task is canceled."""
+        self.sampler.sample()
+        while not self.scheduler.cancelled:
+            await asyncio.sleep(self.interval)
+            sample = self.sampler.sample()
+            if sample is None:
+                continue
+            jobs = self.adjust(sample)
+            if self.on_sample is not None:
+                self.on_sample(jobs, sample)
+
+    def adjust(self, sample: LoadSample) -> int:
+        """Apply one governing step for *sample*; return the concurrency."""
+        jobs = self.scheduler.concurrency
+        step = self._decide(jobs, sample)
+        self._last_throughput = sample.throughput
+        if step:
+            jobs = min(self.max_jobs, max(self.min_jobs, jobs + step))
+            self.scheduler.set_concurrency(jobs)
+        return jobs
+
+    def _decide(self, jobs: int, sample: LoadSample) -> int:
+        """Return the change of concurrency (-1, 0 or +1) for *sample*."""
+        saturated = (sample.cpu_busy >= CPU_SATURATED
+                     if sample.cpu_busy is not None
+                     else sample.child_cpu >= CPU_SATURATED)
+        # Processes blocked on I/O count towards the load average too, so
+        # only a long run queue on busy CPUs means oversubscription
+        if (sample.load_per_cpu is not None
+                and sample.load_per_cpu > OVERLOAD and saturated):
+            self._exploring = False
+            return -1 if jobs > self.min_jobs else 0
+
+        previous = self._last_throughput
+        if self._exploring:
+            self._exploring = False
+            gain = ((sample.throughput - previous) / previous
+                    if previous else 0.0)
+            if gain < TOLERANCE:
+                # The extra process did not pay off: undo it and stay put
+                self._hold = HOLD_INTERVALS
+                return -1
+        if self._hold:
+            self._hold -= 1
+            return 0
+
+        if not saturated and jobs < self.max_jobs:
+            self._exploring = True
+            return 1
+        return 0
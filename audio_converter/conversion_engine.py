@@ -0,0 +1,575 @@
+#!/usr/bin/env python
+#
+# Parallel conversion engine for the audio converter
+
+"""Conversion engine
+
+Runs FFmpeg conversion jobs concurrently.  Every FFmpeg child is driven by
+one shared asyncio event loop running on a background thread (see
+:func:`engine_loop`): stdout and stderr are read concurrently by
+coroutines, so hundreds of processes can be in flight without a thread
+each.  Jobs are coroutines scheduled on that loop by
+:meth:`ConversionScheduler.run_batch_async`.
+
+Every child process started through a scheduler is tracked so that a
+single :meth:`ConversionScheduler.cancel` call stops the whole batch.
+When tracing (:mod:`trace_events`) is on, every job runs on a worker lane
+and every child's lifetime is recorded as a span.
+
+The module is deliberately free of any Tk import so it can be driven from
+both the GUI and headless tools.
+"""
+
+
+import asyncio
+import os
+import sys
+import threading
+from contextvars import ContextVar
+from concurrent.futures import Future
+from inspect import CORO_CREATED, getcoroutinestate
+from typing import (Any, AsyncIterable, AsyncIterator, Awaitable, Callable,
+                    Iterable, List, Optional, Set, Tuple, TypeVar, Union)
+
+from ffmpeg_progress import (FFmpegProgressParser, ProgressState,
+                             with_progress_output)
+from trace_events import span, worker_lane
+
+T = TypeVar("T")
+
+#: Seconds to wait for FFmpeg to exit after *SIGTERM* before killing it.
+TERMINATE_GRACE_PERIOD = 3.0
+
+#: Longest line read from a child's output (FFmpeg's are far shorter).
+STREAM_LINE_LIMIT = 1024 * 1024
+
+#: Scheduler, slot releaser and slot reclaimer of the job running in the
+#: current task.
+_job_slot: ContextVar[Optional[Tuple[
+    "ConversionScheduler", Callable[[], bool],
+    Callable[[], Awaitable[None]]]]] = ContextVar("_job_slot", default=None)
+
+
+def default_worker_count() -> int:
+    """Return the default number of concurrent jobs (one per CPU)."""
+    return os.cpu_count() or 1
+
+
+class ConversionCancelled(Exception):
+    """Raised inside a job when the batch has been canceled."""
+
+
+class ConversionTimeout(Exception):
+    """Raised when an FFmpeg run exceeds the scheduler's job timeout."""
+
+
+async def _iterate(jobs: Union[Iterable[T], AsyncIterable[T]]
+                   ) -> AsyncIterator[T]:
+    """Iterate over plain and asynchronous iterables alike."""
+    if isinstance(jobs, AsyncIterable):
+        async for job in jobs:
+            yield job
+    else:
+        for job in jobs:
+            yield job
+
+
+def _install_child_watcher(loop: asyncio.AbstractEventLoop) -> None:
+    """Watch children through pidfds (no thread per child) where possible."""
+    # Python 3.12+ already picks pidfds on its own
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return  # kernel older than 5.3
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+
+class EventLoopThread:
+    """An asyncio event loop running forever on a daemon thread."""
+
+    def __init__(self, name: str = "conversion-loop") -> None:
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,),
+                                        name=name, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        _install_child_watcher(self.loop)
+        self.loop.call_soon(ready.set)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: Awaitable[T]) -> "Future[T]":
+        """Schedule *coroutine* on the loop and return its future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, callback: Callable[..., Any], *args: Any) -> None:
+        """Run *callback* with *args* on the loop thread."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    @property
+    def in_loop_thread(self) -> bool:
+        """``True`` when called from the loop's own thread."""
+        return threading.current_thread() is self._thread
+
+
+_engine_loop: Optional[EventLoopThread] = None
+_engine_loop_lock = threading.Lock()
+
+
+def engine_loop() -> EventLoopThread:
+    """Return the process‑wide loop that owns every FFmpeg child."""
+    global _engine_loop
+    with _engine_loop_lock:
+        if _engine_loop is None:
+            _engine_loop = EventLoopThread()
+        return _engine_loop
+
+
+class ConversionScheduler:
+    """Run conversion jobs concurrently and track their FFmpeg children."""
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 timeout: Optional[float] = None) -> None:
+        """
+        Parameters
+        ----------
+        max_workers:
+            Maximum number of jobs running at once.  Defaults to the number
+            of CPUs available.
+        timeout:
+            Seconds after which a single FFmpeg run is stopped and fails
+            with :class:`ConversionTimeout`.  ``None`` means no limit.
+        """
+        self.max_workers: int = max(1, max_workers or default_worker_count())
+        self.timeout = timeout
+        self._concurrency = self.max_workers
+        self._slot_freed: Optional[asyncio.Event] = None
+        #: Jobs holding a worker, and extra workers lent to running jobs.
+        self._active = 0
+        self._borrowed = 0
+        #: Media seconds encoded so far by every FFmpeg run (all jobs).
+        self.encoded_seconds = 0.0
+        self._processes: Set[asyncio.subprocess.Process] = set()
+        self._sleepers: Set["asyncio.Future[None]"] = set()
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+
+    # --------------------------------------------------------------------- #
+    # Batch execution
+    # --------------------------------------------------------------------- #
+
+    @property
+    def cancelled(self) -> bool:
+        """``True`` once :meth:`cancel` has been called."""
+        return self._cancel_event.is_set()
+
+    async def run_batch_async(
+        self,
+        jobs: Union[Iterable[T], AsyncIterable[T]],
+        work: Callable[[T], Awaitable[Any]],
+        on_result: Callable[[T, Any, Optional[BaseException]], None],
+    ) -> None:
+        """
+        Await the coroutine *work* for every item of *jobs*.
+
+        To be awaited on :func:`engine_loop`.  At most :attr:`concurrency`
+        jobs run at once (the limit may change while the batch runs).
+        *on_result* is invoked once per job, on the loop thread, with the
+        job, the value *work* returned and the exception it raised
+        (``None`` on success).  *jobs* may be an asynchronous
+        iterable, such as :meth:`folder_watcher.FolderWatcher.watch`, that
+        produces jobs while earlier ones run.
+
+        The next job is only taken from *jobs* once a worker is free, so an
+        ordering queue such as :class:`job_queue.JobQueue` picks it as late
+        as possible.  A job may hand its worker back before it ends with
+        :meth:`release_slot` (and take one again with
+        :meth:`reclaim_slot`), and workers lent out by
+        :meth:`borrow_workers` count against the limit.
+        """
+        slot_freed = self._slot_freed = asyncio.Event()
+        tasks: Set["asyncio.Task[None]"] = set()
+        released = 0
+
+        async def run_one(job: T) -> None:
+            nonlocal released
+            holding = True
+
+            def release() -> bool:
+                nonlocal released, holding
+                if holding:
+                    # Bound the jobs finishing without a slot as well
+                    if released >= self._concurrency:
+                        return False
+                    holding = False
+                    with self._lock:
+                        self._active -= 1
+                    released += 1
+                    slot_freed.set()
+                return True
+
+            async def reclaim() -> None:
+                nonlocal released, holding
+                if holding:
+                    return
+                while not self._take_worker(force=self.cancelled):
+                    slot_freed.clear()
+                    await slot_freed.wait()
+                holding = True
+                released -= 1
+
+            token = _job_slot.set((self, release, reclaim))
+            try:
+                if self.cancelled:
+                    raise ConversionCancelled()
+                with worker_lane():
+                    result, error = await work(job), None
+            except Exception as exc:
+                result, error = None, exc
+            finally:
+                _job_slot.reset(token)
+                if holding:
+                    with self._lock:
+                        self._active -= 1
+                    slot_freed.set()
+                else:
+                    released -= 1
+            on_result(job, result, error)
+
+        pending = _iterate(jobs)
+        try:
+            while True:
+                # A cancelled batch starts its jobs at once; they just fail
+                while not self._take_worker(force=self.cancelled):
+                    slot_freed.clear()
+                    await slot_freed.wait()
+                fetched = False
+                try:
+                    job = await pending.__anext__()
+                    fetched = True
+                except StopAsyncIteration:
+                    break
+                finally:
+                    # The batch is over or failed: free the reserved worker
+                    if not fetched:
+                        with self._lock:
+                            self._active -= 1
+                task = asyncio.ensure_future(run_one(job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            self.cancel()
+            for task in list(tasks):
+                if getcoroutinestate(task.get_coro()) == CORO_CREATED:
+                    # Cancelled before it ran: it will never free its worker
+                    with self._lock:
+                        self._active -= 1
+                task.cancel()
+            raise
+        finally:
+            self._slot_freed = None
+
+    def release_slot(self) -> bool:
+        """
+        Let :meth:`run_batch_async` start the next job while the calling one
+        finishes work that needs no worker, such as copying its outputs to
+        slow storage or waiting to retry.  The job's result is still reported when it ends.
+
+        Must be called on the loop from within a job of this batch.
+        Returns ``False``, keeping the slot, outside such a job or when as
+        many jobs as :attr:`concurrency` have already released theirs.
+        """
+        current = _job_slot.get()
+        if current is None or current[0] is not self:
+            return False
+        return current[1]()
+
+    async def reclaim_slot(self) -> None:
+        """
+        Wait for a free worker and take it again after :meth:`release_slot`,
+        e.g. to encode once more after a retry back‑off.
+
+        Does nothing if the calling job holds its worker or is not a job of
+        this batch.
+        """
+        current = _job_slot.get()
+        if current is not None and current[0] is self:
+            await current[2]()
+
+    def _take_worker(self, force: bool = False) -> bool:
+        """Reserve a worker for the next job if one is free (or *force*)."""
+        with self._lock:
+            if (not force and self._active + self._borrowed
+                    >= self._concurrency):
+                return False
+            self._active += 1
+            return True
+
+    def borrow_workers(self, wanted: int) -> int:
+        """
+        Lend up to *wanted* idle workers to a running job, e.g. to encode
+        segments of one input in parallel, and return how many were lent.
+
+        Lent workers count against :attr:`concurrency` together with the
+        running jobs, so no more jobs start until they are handed back
+        with :meth:`return_workers`.  Thread‑safe.
+        """
+        with self._lock:
+            spare = self._concurrency - self._active - self._borrowed
+            lent = max(0, min(wanted, spare))
+            self._borrowed += lent
+        return lent
+
+    def return_workers(self, count: int) -> None:
+        """Hand back *count* workers lent by :meth:`borrow_workers`."""
+        if count <= 0:
+            return
+        with self._lock:
+            self._borrowed -= count
+        engine_loop().call(self._wake_dispatcher)
+
+    @property
+    def concurrency(self) -> int:
+        """Jobs :meth:`run_batch_async` runs at once (``max_workers`` first)."""
+        return self._concurrency
+
+    def set_concurrency(self, jobs: int) -> None:
+        """Change how many jobs run at once, effective immediately."""
+        self._concurrency = max(1, jobs)
+        engine_loop().call(self._wake_dispatcher)
+
+    def _wake_dispatcher(self) -> None:
+        if self._slot_freed is not None:
+            self._slot_freed.set()
+
+    def child_pids(self) -> List[int]:
+        """Return the process ids of the running FFmpeg children."""
+        with self._lock:
+            return [proc.pid for proc in self._processes]
+
+    async def sleep_async(self, seconds: float) -> None:
+        """
+        Wait *seconds* (e.g. a retry back‑off) unless canceled meanwhile.
+
+        Raises
+        ------
+        ConversionCancelled
+            If the batch is canceled before the delay elapsed.
+        """
+        if self.cancelled:
+            raise ConversionCancelled()
+        waiter = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._sleepers.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, max(0.0, seconds))
+        except asyncio.TimeoutError:
+            return
+        finally:
+            with self._lock:
+                self._sleepers.discard(waiter)
+        raise ConversionCancelled()
+
+    async def until_cancelled(self) -> None:
+        """Wait until :meth:`cancel` is called, then return."""
+        try:
+            while True:
+                await self.sleep_async(3600.0)
+        except ConversionCancelled:
+            return
+
+    # --------------------------------------------------------------------- #
+    # Child processes
+    # --------------------------------------------------------------------- #
+
+    async def run_command_async(self, cmd: List[str]) -> Tuple[int, str]:
+        """
+        Run *cmd* to completion and return ``(returncode, stderr)``.
+
+        Raises
+        ------
+        ConversionCancelled
+            If the batch was canceled before or while the command ran.
+        ConversionTimeout
+            If the command exceeded :attr:`timeout`.
+        FileNotFoundError
+            If the executable does not exist.
+        """
+        stderr: List[str] = []
+
+        async def discard(stream: asyncio.StreamReader) -> None:
+            await stream.read()
+
+        async def collect(stream: asyncio.StreamReader) -> None:
+            stderr.append((await stream.read()).decode("utf-8", "replace"))
+
+        returncode = await self._communicate(cmd, discard, collect)
+        return returncode, "".join(stderr)
+
+    async def run_ffmpeg_async(
+        self,
+        cmd: List[str],
+        on_progress: Optional[Callable[[ProgressState], None]] = None,
+        duration: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        """
+        Run the FFmpeg command *cmd*, streaming its progress as it encodes.
+
+        The ``-progress`` stream on stdout and the diagnostics on stderr are
+        read concurrently; *on_progress* is called on the loop after every
+        progress block FFmpeg emits.  Only the tail of stderr is kept, so
+        the returned diagnostic text is bounded regardless of encode
+        length.
+
+        Raises
+        ------
+        ConversionCancelled
+            If the batch was canceled before or while FFmpeg ran.
+        ConversionTimeout
+            If FFmpeg ran longer than :attr:`timeout`.
+        FileNotFoundError
+            If FFmpeg is not installed.
+        """
+        parser = FFmpegProgressParser(duration=duration)
+
+        async def read_progress(stream: asyncio.StreamReader) -> None:
+            reported = 0.0
+            async for line in stream:
+                state = parser.feed_progress_line(
+                    line.decode("utf-8", "replace"))
+                if state is None:
+                    continue
+                self.encoded_seconds += max(0.0, state.out_time - reported)
+                reported = max(reported, state.out_time)
+                if on_progress is not None:
+                    on_progress(state)
+
+        async def read_stderr(stream: asyncio.StreamReader) -> None:
+            async for line in stream:
+                parser.feed_stderr_line(line.decode("utf-8", "replace"))
+
+        returncode = await self._communicate(with_progress_output(cmd),
+                                             read_progress, read_stderr)
+        return returncode, parser.stderr
+
+    async def _communicate(
+        self,
+        cmd: List[str],
+        read_stdout: Callable[[asyncio.StreamReader], Awaitable[None]],
+        read_stderr: Callable[[asyncio.StreamReader], Awaitable[None]],
+    ) -> int:
+        """Run *cmd*, feeding both pipes to their readers; return its status."""
+        with span("subprocess", "process",
+                  program=os.path.basename(cmd[0])) as fields:
+            proc = await self.start_process(cmd)
+            fields["pid"] = proc.pid
+            try:
+                return await self._wait(proc, read_stdout, read_stderr)
+            finally:
+                fields["returncode"] = proc.returncode
+
+    async def _wait(
+        self,
+        proc: asyncio.subprocess.Process,
+        read_stdout: Callable[[asyncio.StreamReader], Awaitable[None]],
+        read_stderr: Callable[[asyncio.StreamReader], Awaitable[None]],
+    ) -> int:
+        """Feed *proc*'s pipes to their readers until it exits."""
+        try:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(read_stdout(proc.stdout),
+                                   read_stderr(proc.stderr),
+                                   proc.wait()),
+                    self.timeout)
+            except asyncio.TimeoutError:
+                raise ConversionTimeout(
+                    f"FFmpeg did not finish within {self.timeout:g} s"
+                ) from None
+        finally:
+            if proc.returncode is None:
+                await self._stop(proc)
+            self.release_process(proc)
+
+        if self.cancelled:
+            raise ConversionCancelled()
+        return proc.returncode
+
+    async def start_process(self, cmd: List[str]
+                            ) -> asyncio.subprocess.Process:
+        """Start *cmd* with piped output and register it for :meth:`cancel`."""
+        if self.cancelled:
+            raise ConversionCancelled()
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=STREAM_LINE_LIMIT,
+        )
+        with self._lock:
+            self._processes.add(proc)
+        # cancel() may have run between the check above and registration
+        if self.cancelled:
+            self._terminate(proc)
+        return proc
+
+    def release_process(self, proc: asyncio.subprocess.Process) -> None:
+        """Stop tracking *proc* once it has exited."""
+        with self._lock:
+            self._processes.discard(proc)
+
+    def cancel(self) -> None:
+        """Cancel pending jobs and stop every running FFmpeg child."""
+        self._cancel_event.set()
+        engine_loop().call(self._cancel_on_loop)
+
+    def _cancel_on_loop(self) -> None:
+        with self._lock:
+            processes = list(self._processes)
+            sleepers = list(self._sleepers)
+        for waiter in sleepers:
+            if not waiter.done():
+                waiter.set_result(None)
+        for proc in processes:
+            self._terminate(proc)
+
+    @staticmethod
+    def _terminate(proc: asyncio.subprocess.Process) -> None:
+        """Terminate *proc* (on the loop), killing it if it ignores *SIGTERM*."""
+        if proc.returncode is not None:
+            return
+        try:
+            proc.terminate()
+        except ProcessLookupError:
+            return
+
+        def kill() -> None:
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+
+        asyncio.get_running_loop().call_later(TERMINATE_GRACE_PERIOD, kill)
+
+    @staticmethod
+    async def _stop(proc: asyncio.subprocess.Process) -> None:
+        """Terminate *proc* and wait until it has exited."""
+        try:
+            proc.terminate()
+            await asyncio.wait_for(proc.wait(), TERMINATE_GRACE_PERIOD)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+# Incremental-conversion manifest for the audio converter
+
+"""Conversion manifest
+
+Keeps a JSON manifest in the output directory describing how every output
+file was produced: source path, size, modification time, an optional
+SHA‑256 content hash, the strategy used and the quality preset.  A re‑run
+consults it to skip outputs whose inputs and settings have not changed.
+"""
+
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+MANIFEST_NAME = ".audio_converter_manifest.json"
+MANIFEST_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA‑256 digest of the file at *path*."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    Record of converted outputs, keyed by their path relative to the
+    output directory.
+    """
+
+    def __init__(self, output_directory: str, use_hash: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        output_directory:
+            Directory holding both the converted files and the manifest.
+        use_hash:
+            Store a content hash of every source.  A source whose
+            modification time changed but whose content did not is then
+            still considered up to date.
+        """
+        self.output_directory = output_directory
+        self.use_hash = use_hash
+        self.path = os.path.join(output_directory, MANIFEST_NAME)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, output_directory: str,
+             use_hash: bool = False) -> "ConversionManifest":
+        """Read the manifest of *output_directory* (empty if unreadable)."""
+        manifest = cls(output_directory, use_hash=use_hash)
+        try:
+            with open(manifest.path, encoding="utf-8") as stream:
+                data = json.load(stream)
+        except (OSError, ValueError):
+            return manifest
+        if (isinstance(data, dict)
+                and data.get("version") == MANIFEST_VERSION):
+            manifest._entries = dict(data.get("outputs", {}))
+        return manifest
+
+    def save(self) -> None:
+        """Atomically write the manifest if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": MANIFEST_VERSION, "outputs": self._entries}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as stream:
+                json.dump(data, stream, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def _key(self, output_file: str) -> str:
+        """Return the entry key of *output_file*."""
+        relative = os.path.relpath(os.path.abspath(output_file),
+                                   os.path.abspath(self.output_directory))
+        return relative.replace(os.sep, "/")
+
+    # --------------------------------------------------------------------- #
+    # Queries & updates
+    # --------------------------------------------------------------------- #
+
+    def is_up_to_date(self, source_file: str, output_file: str,
+                      strategy_name: str, quality: str) -> bool:
+        """Return ``True`` if *output_file* need not be converted again."""
+        with self._lock:
+            entry = self._entries.get(self._key(output_file))
+        if entry is None:
+            return False
+        if (entry.get("source") != os.path.abspath(source_file)
+                or entry.get("strategy") != strategy_name
+                or entry.get("quality") != quality):
+            return False
+
+        try:
+            source_stat = os.stat(source_file)
+            output_stat = os.stat(output_file)
+        except OSError:
+            return False
+        if (output_stat.st_size != entry.get("output_size")
+                or output_stat.st_mtime_ns != entry.get("output_mtime_ns")):
+            return False
+        if source_stat.st_size != entry.get("size"):
+            return False
+        if source_stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+
+        # Touched but possibly unchanged: fall back to the content hash
+        if not self.use_hash or not entry.get("sha256"):
+            return False
+        if file_sha256(source_file) != entry["sha256"]:
+            return False
+        with self._lock:
+            entry["mtime_ns"] = source_stat.st_mtime_ns
+            self._dirty = True
+        return True
+
+    def record(self, source_file: str, output_file: str,
+               strategy_name: str, quality: str) -> None:
+        """Remember that *output_file* was just produced from *source_file*."""
+        source_stat = os.stat(source_file)
+        output_stat = os.stat(output_file)
+        entry: Dict[str, Any] = {
+            "source": os.path.abspath(source_file),
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+            "strategy": strategy_name,
+            "quality": quality,
+            "output_size": output_stat.st_size,
+            "output_mtime_ns": output_stat.st_mtime_ns,
+        }
+        if self.use_hash:
+            entry["sha256"] = file_sha256(source_file)
+        with self._lock:
+            self._entries[self._key(output_file)] = entry
+            self._dirty = True
+
+    def forget(self, output_file: str) -> Optional[Dict[str, Any]]:
+        """Drop the entry for *output_file*, returning it if present."""
+        with self._lock:
+            entry = self._entries.pop(self._key(output_file), None)
+            if entry is not None:
+                self._dirty = True
+            return entry
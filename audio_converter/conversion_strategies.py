@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+#
+# FFmpeg conversion strategies for the audio converter
+
+"""Conversion strategies
+
+One strategy per target format, each contributing the FFmpeg encoder
+options for its quality presets.  Kept free of any Tk import so headless
+tools can share them with the GUI.
+
+A strategy may also accept sources whose audio is already encoded with a
+codec its container can carry; those are remuxed with stream copy instead
+of being decoded and re‑encoded.  Some can even convert simple sources
+in process, without starting FFmpeg at all (see
+:meth:`AudioConversionStrategy.convert_in_process`).  For estimates before
+a batch, every strategy also states the bitrate its presets produce.
+
+Each strategy lists the FFmpeg encoders that accept its preset options;
+:mod:`ffmpeg_capabilities` sets :attr:`AudioConversionStrategy.encoder`
+to the fastest one the installed FFmpeg has.  Left unset, FFmpeg picks the
+default encoder of the output container.
+"""
+
+
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from media_probe import MediaInfo
+from wav_fast_path import PCM_CODECS, UnsupportedWav, convert_wav
+
+#: Formats the converter reads and writes, in display order.
+SUPPORTED_FORMATS = ("mp3", "wav", "ogg", "flac", "aac", "m4a")
+
+#: Quality presets understood by every strategy, lowest first.
+QUALITY_PRESETS = ("Low", "Medium", "High", "Lossless")
+
+#: Assumed source format when the probe does not tell.
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_CHANNELS = 2
+
+
+def pcm_bitrate(info: Optional[MediaInfo], bits: int = 16) -> int:
+    """Return the bitrate (b/s) of *info*'s audio as PCM of *bits* bits."""
+    sample_rate = (info.sample_rate if info is not None
+                   and info.sample_rate else DEFAULT_SAMPLE_RATE)
+    channels = (info.channels if info is not None
+                and info.channels else DEFAULT_CHANNELS)
+    return sample_rate * channels * bits
+
+
+class AudioConversionStrategy(ABC):
+    """Abstract base class for concrete conversion strategies."""
+
+    #: Source codecs (ffprobe names) this format can hold as they are.
+    copy_codecs: Tuple[str, ...] = ()
+
+    #: Source codecs :meth:`convert_in_process` may handle (``.wav`` only).
+    in_process_codecs: Tuple[str, ...] = ()
+
+    #: FFmpeg encoders accepting :meth:`output_args`, preferred first.
+    encoders: Tuple[str, ...] = ()
+
+    #: Encoder passed with ``-c:a``; ``None`` leaves the choice to FFmpeg.
+    encoder: Optional[str] = None
+
+    @abstractmethod
+    def output_args(self, quality: str) -> List[str]:
+        """Return the FFmpeg options applied to this strategy's output."""
+
+    def codec_args(self) -> List[str]:
+        """Return the FFmpeg options selecting :attr:`encoder`, if set."""
+        return ["-c:a", self.encoder] if self.encoder else []
+
+    def can_copy(self, info: Optional[MediaInfo], quality: str) -> bool:
+        """Return ``True`` if a source described by *info* can be remuxed."""
+        return info is not None and info.codec in self.copy_codecs
+
+    def estimated_bitrate(self, info: Optional[MediaInfo],
+                          quality: str) -> Optional[float]:
+        """
+        Return the expected output bitrate (b/s) for a source described by
+        *info*, or ``None`` if the strategy cannot tell.
+        """
+        return None
+
+    def convert_in_process(self, source_file: str, output_file: str,
+                           quality: str) -> bool:
+        """
+        Write *output_file* without FFmpeg if this strategy can.
+
+        Returns ``False``, without touching *output_file*, when the source
+        needs FFmpeg after all.
+        """
+        return False
+
+    def convert(self, source_file: str, output_file: str,
+                quality: str) -> List[str]:
+        """Return a fully‑formed FFmpeg command line."""
+        return compose_conversion(source_file, [(self, output_file)], quality)
+
+
+def compose_conversion(
+    source_file: str,
+    targets: List[Tuple[AudioConversionStrategy, str]],
+    quality: str,
+    input_args: Optional[List[str]] = None,
+    audio_filter: Optional[str] = None,
+) -> List[str]:
+    """
+    Return one FFmpeg command writing every ``(strategy, output)`` target.
+
+    The source is demuxed and decoded once; each strategy only contributes
+    the encoder options placed in front of its own output file.
+    *input_args* (e.g. ``-ss``/``-t``) are applied to the source and
+    *audio_filter* (e.g. loudness normalization) to every output.
+    """
+    cmd = ["ffmpeg", "-y", *(input_args or []), "-i", source_file]
+    for strategy, output_file in targets:
+        if audio_filter:
+            cmd.extend(["-af", audio_filter])
+        cmd.extend(strategy.codec_args())
+        cmd.extend(strategy.output_args(quality))
+        cmd.append(output_file)
+    return cmd
+
+
+class StreamCopyStrategy(AudioConversionStrategy):
+    """Remux the source audio stream into the output container as it is."""
+
+    def output_args(self, quality: str) -> List[str]:  # noqa: D401
+        return ["-c:a", "copy"]
+
+    def estimated_bitrate(self, info: Optional[MediaInfo],
+                          quality: str) -> Optional[float]:
+        """A remux keeps the source bitrate."""
+        return info.bitrate if info is not None else None
+
+
+class BitrateConversionStrategy(AudioConversionStrategy):
+    """Strategy for lossy encoders driven by a per‑preset bitrate (kb/s)."""
+
+    bitrates: Dict[str, int] = {}
+
+    def output_args(self, quality: str) -> List[str]:
+        return ["-b:a", f"{self.bitrates[quality]}k"]
+
+    def estimated_bitrate(self, info: Optional[MediaInfo],
+                          quality: str) -> Optional[float]:
+        return self.bitrates[quality] * 1000
+
+    def can_copy(self, info: Optional[MediaInfo], quality: str) -> bool:
+        """Remux only when the preset would not make the file smaller."""
+        return (super().can_copy(info, quality)
+                and (info.bitrate is None
+                     or info.bitrate <= self.bitrates[quality] * 1000))
+
+
+class Mp3ConversionStrategy(BitrateConversionStrategy):
+    """Convert audio to *MP3* using the **libmp3lame** encoder."""
+
+    copy_codecs = ("mp3",)
+    encoders = ("libmp3lame", "mp3_mf")
+    bitrates = {"Low": 96, "Medium": 192, "High": 320, "Lossless": 320}
+
+
+class OggConversionStrategy(AudioConversionStrategy):
+    """Convert audio to *OGG Vorbis*."""
+
+    copy_codecs = ("vorbis",)
+    # FFmpeg's native encoder is experimental and ignores -q:a
+    encoders = ("libvorbis",)
+    #: Typical libvorbis bitrates (kb/s) of the presets' ``-q:a`` values
+    #: for stereo 44.1 kHz sources.
+    nominal_bitrates = {"Low": 112, "Medium": 192, "High": 320,
+                        "Lossless": 500}
+
+    def output_args(self, quality: str) -> List[str]:
+        return {
+            "Low": ["-q:a", "3"],
+            "Medium": ["-q:a", "6"],
+            "High": ["-q:a", "9"],
+            "Lossless": ["-q:a", "10"],
+        }[quality]
+
+    def estimated_bitrate(self, info: Optional[MediaInfo],
+                          quality: str) -> Optional[float]:
+        return self.nominal_bitrates[quality] * 1000
+
+
+class FlacConversionStrategy(AudioConversionStrategy):
+    """Convert audio to *FLAC*."""
+
+    copy_codecs = ("flac",)
+    encoders = ("flac",)
+    #: Typical FLAC output size relative to 16‑bit PCM, per preset.
+    compression_ratios = {"Low": 0.65, "Medium": 0.6, "High": 0.59,
+                          "Lossless": 0.58}
+
+    def output_args(self, quality: str) -> List[str]:
+        return {
+            "Low": ["-compression_level", "1"],
+            "Medium": ["-compression_level", "5"],
+            "High": ["-compression_level", "8"],
+            "Lossless": ["-compression_level", "12"],
+        }[quality]
+
+    def estimated_bitrate(self, info: Optional[MediaInfo],
+                          quality: str) -> Optional[float]:
+        return pcm_bitrate(info) * self.compression_ratios[quality]
+
+
+class AacM4aConversionStrategy(BitrateConversionStrategy):
+    """Convert audio to *AAC/M4A*."""
+
+    copy_codecs = ("aac",)
+    #: Platform (AudioToolbox, Media Foundation) and Fraunhofer encoders
+    #: are tried before FFmpeg's own.
+    encoders = ("aac_at", "libfdk_aac", "aac_mf", "aac")
+    bitrates = {"Low": 128, "Medium": 192, "High": 256, "Lossless": 320}
+
+
+class WavConversionStrategy(AudioConversionStrategy):
+    """Convert audio to uncompressed *WAV*."""
+
+    copy_codecs = ("pcm_s16le",)
+    encoders = ("pcm_s16le",)
+    in_process_codecs = tuple(PCM_CODECS.values())
+
+    def output_args(self, quality: str) -> List[str]:  # noqa: D401
+        return []
+
+    def estimated_bitrate(self, info: Optional[MediaInfo],
+                          quality: str) -> Optional[float]:
+        return pcm_bitrate(info)
+
+    def convert_in_process(self, source_file: str, output_file: str,
+                           quality: str) -> bool:
+        """Resave PCM WAV sources as 16‑bit WAV with :mod:`wav_fast_path`."""
+        if os.path.splitext(source_file)[1].lower() != ".wav":
+            return False
+        try:
+            convert_wav(source_file, output_file, sample_width=2)  # s16le
+        except UnsupportedWav:
+            return False
+        return True
+
+
+def default_strategies() -> Dict[str, AudioConversionStrategy]:
+    """Return the strategy registry keyed by target format/extension."""
+    return {
+        "mp3": Mp3ConversionStrategy(),
+        "ogg": OggConversionStrategy(),
+        "flac": FlacConversionStrategy(),
+        "wav": WavConversionStrategy(),
+        "aac": AacM4aConversionStrategy(),
+        "m4a": AacM4aConversionStrategy(),
+    }
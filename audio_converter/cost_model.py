@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+#
+# Conversion cost model and pre-flight time/size estimator
+
+"""Cost model
+
+Predicts, before a batch starts, how large its outputs will be and how long
+it will take, per file and for the whole batch:
+
+* output size comes from the probed duration and the bitrate each strategy
+  states for the chosen preset (see
+  :meth:`AudioConversionStrategy.estimated_bitrate`), corrected by a
+  per‑recipe size factor;
+* encoding time is a fixed per‑job overhead plus the duration divided by
+  the speed (× real time) of every output the job writes.
+
+Speeds, overheads and size factors start from conservative defaults and
+are recalibrated from every completed job (:meth:`CostModel.observe`), so
+the model converges to the throughput of *this* machine.  The calibration
+is kept in a small JSON file in the user cache directory.
+
+While a batch runs, :class:`BatchForecast` turns the estimate into a
+remaining‑time figure corrected by the batch's own progress so far.
+"""
+
+
+import json
+import os
+import threading
+import time
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Sequence, Set, Tuple)
+
+from app_paths import user_cache_dir
+from conversion_strategies import AudioConversionStrategy, StreamCopyStrategy
+from media_probe import MediaInfo
+
+COST_MODEL_NAME = "cost_model.json"
+COST_MODEL_VERSION = 1
+
+#: Job kinds: one FFmpeg process, or a conversion without FFmpeg.
+FFMPEG = "ffmpeg"
+IN_PROCESS = "in-process"
+
+#: Starting speeds (seconds of audio per second, one job at a time) by
+#: strategy class; recalibrated per recipe once jobs complete.
+DEFAULT_SPEEDS = {
+    "Mp3ConversionStrategy": 60.0,
+    "OggConversionStrategy": 40.0,
+    "FlacConversionStrategy": 150.0,
+    "AacM4aConversionStrategy": 50.0,
+    "WavConversionStrategy": 300.0,
+    "StreamCopyStrategy": 1000.0,
+    "loudnorm": 30.0,
+}
+
+#: Speed of recipes with no default (e.g. third‑party strategies).
+FALLBACK_SPEED = 50.0
+
+#: Starting cost (seconds) of a job besides the audio itself, by job kind.
+DEFAULT_OVERHEADS = {FFMPEG: 0.08, IN_PROCESS: 0.005}
+
+#: Weight of a new observation in the calibration (0 < x ≤ 1).
+SMOOTHING = 0.3
+
+#: Observations off by more than this factor are clamped before use.
+MAX_CORRECTION = 10.0
+
+#: One unit of work of a job: ``(recipe key, expected bitrate or None)``.
+Step = Tuple[str, Optional[float]]
+
+
+def recipe_key(strategy: AudioConversionStrategy, quality: str,
+               kind: str = FFMPEG) -> str:
+    """Return the name the model calibrates *strategy* under."""
+    name = type(strategy).__name__
+    if kind == IN_PROCESS:
+        return f"{IN_PROCESS}:{name}"
+    if isinstance(strategy, StreamCopyStrategy):
+        return name  # a remux costs the same whatever the preset
+    return f"{name}:{quality}"
+
+
+def _default_speed(key: str) -> float:
+    if key.startswith(IN_PROCESS):
+        return 20 * DEFAULT_SPEEDS.get(key.partition(":")[2], FALLBACK_SPEED)
+    return DEFAULT_SPEEDS.get(key.partition(":")[0], FALLBACK_SPEED)
+
+
+def _clamp(ratio: float) -> float:
+    return min(MAX_CORRECTION, max(1 / MAX_CORRECTION, ratio))
+
+
+class FileEstimate:
+    """Predicted cost of converting one source."""
+
+    def __init__(self, source_file: str, duration: Optional[float],
+                 seconds: float, size: float) -> None:
+        self.source_file = source_file
+        #: Probed duration; ``None`` when the source could not be probed.
+        self.duration = duration
+        #: Predicted time of the job, or ``0`` without a duration.
+        self.seconds = seconds
+        #: Predicted bytes written (all outputs), or ``0``.
+        self.size = size
+
+    @property
+    def known(self) -> bool:
+        """``True`` if the estimate rests on a probed duration."""
+        return self.duration is not None
+
+
+class BatchEstimate:
+    """Predicted cost of a whole batch."""
+
+    def __init__(self, files: List[FileEstimate], workers: int) -> None:
+        self.files = files
+        self.workers = max(1, workers)
+        known = [estimate for estimate in files if estimate.known]
+        #: Sources without a duration; counted at the mean of the others.
+        self.unknown = len(files) - len(known)
+        mean_seconds = mean_size = 0.0
+        if known:
+            mean_seconds = sum(e.seconds for e in known) / len(known)
+            mean_size = sum(e.size for e in known) / len(known)
+        #: Predicted job time summed over all files.
+        self.work_seconds = (sum(e.seconds for e in known)
+                             + self.unknown * mean_seconds)
+        #: Predicted bytes written by the batch.
+        self.size = sum(e.size for e in known) + self.unknown * mean_size
+        longest = max((e.seconds for e in known), default=0.0)
+        #: Predicted wall‑clock time with *workers* jobs at a time.
+        self.seconds = max(self.work_seconds / self.workers, longest)
+
+    def __iter__(self) -> Iterator[FileEstimate]:
+        return iter(self.files)
+
+
+class CostModel:
+    """Calibrated per‑recipe speeds and output sizes."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(user_cache_dir(), COST_MODEL_NAME)
+        self._speeds: Dict[str, float] = {}
+        self._size_factors: Dict[str, float] = {}
+        self._overheads: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "CostModel":
+        """Read the saved calibration (defaults if missing/corrupt)."""
+        model = cls(path)
+        try:
+            with open(model.path, encoding="utf-8") as stream:
+                data = json.load(stream)
+        except (OSError, ValueError):
+            return model
+        if (isinstance(data, dict)
+                and data.get("version") == COST_MODEL_VERSION):
+            model._speeds = dict(data.get("speeds", {}))
+            model._size_factors = dict(data.get("size_factors", {}))
+            model._overheads = dict(data.get("overheads", {}))
+        return model
+
+    def save(self) -> None:
+        """Atomically write the calibration if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": COST_MODEL_VERSION, "speeds": self._speeds,
+                    "size_factors": self._size_factors,
+                    "overheads": self._overheads}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as stream:
+                json.dump(data, stream, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    # --------------------------------------------------------------------- #
+    # Planning
+    # --------------------------------------------------------------------- #
+
+    @staticmethod
+    def steps(targets: Sequence[Tuple[AudioConversionStrategy, bool]],
+              info: Optional[MediaInfo], quality: str,
+              in_process: bool = False,
+              normalize: bool = False) -> Tuple[str, List[Step]]:
+        """
+        Return the job kind and steps of one conversion.
+
+        *targets* are ``(strategy, remuxed)`` pairs, one per output.
+        """
+        if in_process:
+            return IN_PROCESS, [
+                (recipe_key(strategy, quality, IN_PROCESS),
+                 strategy.estimated_bitrate(info, quality))
+                for strategy, _ in targets]
+        remux = StreamCopyStrategy()
+        steps: List[Step] = []
+        for strategy, remuxed in targets:
+            used = remux if remuxed else strategy
+            steps.append((recipe_key(used, quality),
+                          used.estimated_bitrate(info, quality)
+                          or strategy.estimated_bitrate(info, quality)))
+        if normalize:
+            steps.append(("loudnorm", None))
+        return FFMPEG, steps
+
+    @classmethod
+    def plan(cls, source_file: str, info: Optional[MediaInfo],
+             strategies: Sequence[AudioConversionStrategy], quality: str,
+             stream_copy: bool = True, in_process: bool = True,
+             normalize: bool = False) -> Tuple[str, List[Step]]:
+        """
+        Return the job kind and steps :class:`BatchConverter` is expected
+        to choose for *source_file*.
+        """
+        fast: List[AudioConversionStrategy] = []
+        if (in_process and not normalize and info is not None
+                and os.path.splitext(source_file)[1].lower() == ".wav"):
+            fast = [strategy for strategy in strategies
+                    if info.codec in strategy.in_process_codecs]
+        if len(fast) == len(strategies):
+            return cls.steps([(strategy, False) for strategy in strategies],
+                             info, quality, in_process=True)
+        # FFmpeg only writes the outputs that cannot be written in process
+        copy = stream_copy and not normalize
+        return cls.steps(
+            [(strategy, copy and strategy.can_copy(info, quality))
+             for strategy in strategies if strategy not in fast],
+            info, quality, normalize=normalize)
+
+    # --------------------------------------------------------------------- #
+    # Estimates
+    # --------------------------------------------------------------------- #
+
+    def _speed(self, key: str) -> float:
+        return self._speeds.get(key) or _default_speed(key)
+
+    def _overhead(self, kind: str) -> float:
+        return self._overheads.get(kind, DEFAULT_OVERHEADS.get(kind, 0.0))
+
+    def _predict(self, kind: str, steps: List[Step],
+                 duration: float) -> Tuple[float, float]:
+        """Return the predicted ``(seconds, bytes)`` of a job."""
+        seconds = self._overhead(kind) + sum(
+            duration / self._speed(key) for key, _ in steps)
+        size = sum(bitrate * duration / 8 * self._size_factors.get(key, 1.0)
+                   for key, bitrate in steps if bitrate)
+        return seconds, size
+
+    def estimate_file(self, source_file: str, info: Optional[MediaInfo],
+                      strategies: Sequence[AudioConversionStrategy],
+                      quality: str, stream_copy: bool = True,
+                      in_process: bool = True,
+                      normalize: bool = False) -> FileEstimate:
+        """Predict the time and output size of converting *source_file*."""
+        duration = info.duration if info is not None else None
+        if duration is None:
+            return FileEstimate(source_file, None, 0.0, 0.0)
+        kind, steps = self.plan(source_file, info, strategies, quality,
+                                stream_copy, in_process, normalize)
+        with self._lock:
+            seconds, size = self._predict(kind, steps, duration)
+        return FileEstimate(source_file, duration, seconds, size)
+
+    def estimate_batch(self, sources: Iterable[str],
+                       info_of: Callable[[str], Optional[MediaInfo]],
+                       strategies: Sequence[AudioConversionStrategy],
+                       quality: str, workers: int = 1,
+                       stream_copy: bool = True, in_process: bool = True,
+                       normalize: bool = False) -> BatchEstimate:
+        """
+        Predict every source of a batch.
+
+        *info_of* returns the probed info of a source, or ``None``.
+        """
+        return BatchEstimate(
+            [self.estimate_file(source, info_of(source), strategies,
+                                quality, stream_copy, in_process, normalize)
+             for source in sources], workers)
+
+    # --------------------------------------------------------------------- #
+    # Calibration
+    # --------------------------------------------------------------------- #
+
+    def observe(self, kind: str, steps: List[Step], duration: float,
+                seconds: float, sizes: Sequence[Optional[int]] = ()) -> None:
+        """
+        Recalibrate from a completed job.
+
+        Parameters
+        ----------
+        kind, steps:
+            The job as returned by :meth:`steps`.
+        duration:
+            Duration of the source in seconds.
+        seconds:
+            Measured time of the job.
+        sizes:
+            Bytes actually written, aligned with *steps* (``None`` where
+            unknown).
+        """
+        if duration <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            predicted, _ = self._predict(kind, steps, duration)
+            # Scale the whole job's cost towards the measurement
+            adjust = _clamp(seconds / predicted) ** SMOOTHING
+            self._overheads[kind] = self._overhead(kind) * adjust
+            for key in {key for key, _ in steps}:
+                self._speeds[key] = self._speed(key) / adjust
+            for (key, bitrate), size in zip(steps, sizes):
+                if not bitrate or not size:
+                    continue
+                factor = self._size_factors.get(key, 1.0)
+                expected = bitrate * duration / 8 * factor
+                self._size_factors[key] = (
+                    factor * _clamp(size / expected) ** SMOOTHING)
+            self._dirty = True
+
+
+class BatchForecast:
+    """
+    Remaining time of a running batch.
+
+    Before any job completes this is the estimate itself; afterwards the
+    predicted work still to do is scaled by how fast the batch actually
+    got through the predicted work done so far, which takes the real
+    concurrency and machine load into account.
+    """
+
+    def __init__(self, estimate: BatchEstimate) -> None:
+        self.estimate = estimate
+        self._mean = (estimate.work_seconds / len(estimate.files)
+                      if estimate.files else 0.0)
+        self._seconds = {e.source_file: e.seconds if e.known else self._mean
+                         for e in estimate.files}
+        self._total = sum(self._seconds.values())
+        #: Predicted wall‑clock seconds per second of predicted work.
+        self._scale = (estimate.seconds / self._total if self._total
+                       else 1.0 / estimate.workers)
+        self._completed: Set[str] = set()
+        self._done = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, estimate: FileEstimate) -> None:
+        """
+        Account for a source added while the batch runs (ignored if it
+        already finished before its estimate was ready).
+        """
+        seconds = estimate.seconds if estimate.known else self._mean
+        with self._lock:
+            if estimate.source_file in self._completed:
+                return
+            self._total -= self._seconds.pop(estimate.source_file, 0.0)
+            self._seconds[estimate.source_file] = seconds
+            self._total += seconds
+
+    def complete(self, source_file: str) -> None:
+        """Mark *source_file* as finished (converted, skipped or failed)."""
+        with self._lock:
+            self._completed.add(source_file)
+            self._done += self._seconds.pop(source_file, 0.0)
+
+    def remaining(self) -> float:
+        """Return the predicted seconds until the batch is done."""
+        with self._lock:
+            left = max(0.0, self._total - self._done)
+            if self._done <= 0:
+                return left * self._scale
+            elapsed = time.monotonic() - self._started
+            return left * elapsed / self._done
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+#
+# Cached discovery of what the installed FFmpeg can do
+
+"""FFmpeg capabilities
+
+Asks the installed **ffmpeg** once for its version, encoders, muxers and
+hardware acceleration methods, so that missing support shows up before a
+batch starts rather than as failed jobs, and so that every strategy can
+use the fastest suitable encoder the build offers (see
+:func:`select_encoders`).
+
+The answer is cached as JSON in the user cache directory together with
+the binary's path and modification time; a different or updated FFmpeg
+is queried again, any other start‑up just reads the file.  When a format
+can be written by several encoders, each one is timed on a short
+synthetic clip, also once per binary.
+"""
+
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app_paths import user_cache_dir
+from conversion_strategies import AudioConversionStrategy
+
+CAPABILITIES_NAME = "ffmpeg_capabilities.json"
+CAPABILITIES_VERSION = 1
+
+#: Seconds after which an unresponsive FFmpeg query is abandoned.
+QUERY_TIMEOUT = 30.0
+
+#: Synthetic input encoded to time competing encoders.
+BENCHMARK_INPUT = ["-f", "lavfi", "-i",
+                   "sine=frequency=440:sample_rate=44100:duration=20",
+                   "-ac", "2"]
+
+#: Muxer FFmpeg chooses for each output extension.
+FORMAT_MUXERS = {"mp3": "mp3", "wav": "wav", "ogg": "ogg", "flac": "flac",
+                 "aac": "adts", "m4a": "ipod"}
+
+_ENCODER_LINE = re.compile(r"^\s*A(\S{5})\s+(\S+)\s+(.*)$")
+_CODEC_NOTE = re.compile(r"\(codec (\S+)\)")
+
+
+def parse_version(text: str) -> Optional[str]:
+    """Return the version from ``ffmpeg -version`` output."""
+    match = re.search(r"ffmpeg version (\S+)", text)
+    return match.group(1) if match else None
+
+
+def parse_encoders(text: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Return ``({encoder: codec}, experimental encoders)`` for the audio
+    encoders listed by ``ffmpeg -encoders``.
+    """
+    encoders: Dict[str, str] = {}
+    experimental = []
+    listing = text.partition(" ------")[2]
+    for line in listing.splitlines():
+        match = _ENCODER_LINE.match(line)
+        if match is None:
+            continue
+        flags, name, description = match.groups()
+        codec = _CODEC_NOTE.search(description)
+        encoders[name] = codec.group(1) if codec else name
+        if "X" in flags:
+            experimental.append(name)
+    return encoders, experimental
+
+
+def parse_muxers(text: str) -> List[str]:
+    """Return the muxers listed by ``ffmpeg -muxers``."""
+    muxers = []
+    for line in text.partition(" --")[2].splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and "E" in fields[0]:
+            muxers.extend(fields[1].split(","))
+    return muxers
+
+
+def parse_hwaccels(text: str) -> List[str]:
+    """Return the methods listed by ``ffmpeg -hwaccels``."""
+    listing = text.partition("Hardware acceleration methods:")[2]
+    return [line.strip() for line in listing.splitlines() if line.strip()]
+
+
+def _run(binary: str, *args: str) -> str:
+    """Return the output of ``ffmpeg -hide_banner *args*``."""
+    result = subprocess.run(
+        [binary, "-hide_banner", *args], stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True, timeout=QUERY_TIMEOUT, check=False)
+    return result.stdout
+
+
+class FFmpegCapabilities:
+    """What one FFmpeg binary supports."""
+
+    def __init__(self, binary: str, mtime_ns: int,
+                 version: Optional[str] = None,
+                 encoders: Optional[Dict[str, str]] = None,
+                 experimental: Optional[List[str]] = None,
+                 muxers: Optional[List[str]] = None,
+                 hwaccels: Optional[List[str]] = None,
+                 encode_seconds: Optional[Dict[str, Optional[float]]] = None,
+                 path: Optional[str] = None) -> None:
+        self.binary = binary
+        self.mtime_ns = mtime_ns
+        self.version = version
+        #: Audio encoders and the codec each one produces.
+        self.encoders = encoders or {}
+        self.experimental = experimental or []
+        self.muxers = muxers or []
+        self.hwaccels = hwaccels or []
+        #: Benchmark time per encoder; ``None`` if it failed to encode.
+        self.encode_seconds = encode_seconds or {}
+        self.path = path or os.path.join(user_cache_dir(), CAPABILITIES_NAME)
+        self._dirty = False
+
+    def has_encoder(self, name: str) -> bool:
+        """Return ``True`` if *name* is a usable, non‑experimental encoder."""
+        return name in self.encoders and name not in self.experimental
+
+    def has_muxer(self, name: str) -> bool:
+        """Return ``True`` if FFmpeg can write the container *name*."""
+        return name in self.muxers
+
+    def benchmark(self, encoder: str) -> Optional[float]:
+        """
+        Return the seconds *encoder* takes for the benchmark clip, timing
+        it on first use; ``None`` if it cannot encode at all (e.g. a
+        platform encoder without the platform).
+        """
+        if encoder not in self.encode_seconds:
+            started = time.perf_counter()
+            try:
+                returncode = subprocess.run(
+                    [self.binary, "-hide_banner", "-loglevel", "error",
+                     *BENCHMARK_INPUT, "-c:a", encoder, "-f", "null", "-"],
+                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL, timeout=QUERY_TIMEOUT,
+                    check=False).returncode
+            except (OSError, subprocess.TimeoutExpired):
+                returncode = -1
+            self.encode_seconds[encoder] = (
+                None if returncode else time.perf_counter() - started)
+            self._dirty = True
+        return self.encode_seconds[encoder]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the capabilities as a JSON‑serialisable dictionary."""
+        return {"version": CAPABILITIES_VERSION, "binary": self.binary,
+                "mtime_ns": self.mtime_ns, "ffmpeg_version": self.version,
+                "encoders": self.encoders,
+                "experimental": self.experimental, "muxers": self.muxers,
+                "hwaccels": self.hwaccels,
+                "encode_seconds": self.encode_seconds}
+
+    @classmethod
+    def query(cls, binary: str, path: Optional[str] = None
+              ) -> "FFmpegCapabilities":
+        """
+        Ask *binary* for its capabilities.
+
+        Raises
+        ------
+        OSError
+            If the binary cannot be run.
+        subprocess.TimeoutExpired
+            If it does not answer within :data:`QUERY_TIMEOUT`.
+        """
+        encoders, experimental = parse_encoders(_run(binary, "-encoders"))
+        capabilities = cls(
+            binary, os.stat(binary).st_mtime_ns,
+            version=parse_version(_run(binary, "-version")),
+            encoders=encoders, experimental=experimental,
+            muxers=parse_muxers(_run(binary, "-muxers")),
+            hwaccels=parse_hwaccels(_run(binary, "-hwaccels")), path=path)
+        capabilities._dirty = True
+        return capabilities
+
+    @classmethod
+    def load(cls, path: Optional[str] = None,
+             binary: Optional[str] = None) -> Optional["FFmpegCapabilities"]:
+        """
+        Return the capabilities of *binary* (default: ``ffmpeg`` on the
+        ``PATH``), from the cache while the binary is unchanged.
+
+        Returns ``None`` if FFmpeg is not installed or cannot be run.  A
+        fresh answer is saved right away; cache write errors are ignored.
+        """
+        binary = binary or shutil.which("ffmpeg")
+        if binary is None:
+            return None
+        binary = os.path.abspath(binary)
+        try:
+            mtime_ns = os.stat(binary).st_mtime_ns
+        except OSError:
+            return None
+        path = path or os.path.join(user_cache_dir(), CAPABILITIES_NAME)
+        try:
+            with open(path, encoding="utf-8") as stream:
+                data = json.load(stream)
+        except (OSError, ValueError):
+            data = {}
+        if (isinstance(data, dict)
+                and data.get("version") == CAPABILITIES_VERSION
+                and data.get("binary") == binary
+                and data.get("mtime_ns") == mtime_ns):
+            return cls(binary, mtime_ns, data.get("ffmpeg_version"),
+                       dict(data.get("encoders", {})),
+                       list(data.get("experimental", [])),
+                       list(data.get("muxers", [])),
+                       list(data.get("hwaccels", [])),
+                       dict(data.get("encode_seconds", {})), path)
+        try:
+            capabilities = cls.query(binary, path)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        try:
+            capabilities.save()
+        except OSError:
+            pass  # queried again next time
+        return capabilities
+
+    def save(self) -> None:
+        """Atomically write the capabilities if anything changed."""
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as stream:
+            json.dump(self.to_dict(), stream, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def select_encoders(strategies: Dict[str, AudioConversionStrategy],
+                    capabilities: FFmpegCapabilities) -> Dict[str, str]:
+    """
+    Point every strategy at the fastest of its encoders *capabilities*
+    offers and return ``{format: problem}`` for the formats this FFmpeg
+    cannot write.
+
+    Encoders are only timed when a format has more than one; those that
+    fail to encode are skipped and the preference order of
+    :attr:`AudioConversionStrategy.encoders` breaks ties.  New timings are
+    saved (best effort).
+    """
+    problems: Dict[str, str] = {}
+    for fmt, strategy in strategies.items():
+        muxer = FORMAT_MUXERS.get(fmt)
+        if muxer is not None and not capabilities.has_muxer(muxer):
+            problems[fmt] = f"FFmpeg cannot write {muxer} files"
+            continue
+        candidates = [encoder for encoder in strategy.encoders
+                      if capabilities.has_encoder(encoder)]
+        if len(candidates) > 1:
+            timed = sorted(
+                (seconds, rank, encoder)
+                for rank, encoder in enumerate(candidates)
+                for seconds in [capabilities.benchmark(encoder)]
+                if seconds is not None)
+            # Keep the preference order if nothing could be timed at all
+            # (e.g. a build without the lavfi test source)
+            candidates = [encoder for _, _, encoder in timed] or candidates
+        if candidates:
+            strategy.encoder = candidates[0]
+        elif strategy.encoders:
+            problems[fmt] = ("FFmpeg has no encoder for it (needs "
+                             f"{' or '.join(strategy.encoders)})")
+    try:
+        capabilities.save()
+    except OSError:
+        pass
+    return problems
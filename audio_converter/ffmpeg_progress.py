@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+#
+# Streaming parser for FFmpeg's machine-readable progress output
+
+"""FFmpeg progress
+
+Parses the ``key=value`` blocks FFmpeg writes with ``-progress pipe:1``
+while it encodes, and aggregates per-file progress into batch totals.
+
+Only the last :data:`STDERR_TAIL_LINES` lines of FFmpeg's diagnostic output
+are retained, so memory stays bounded however long an encode runs.
+"""
+
+
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional
+
+#: Number of trailing stderr lines kept for error reports.
+STDERR_TAIL_LINES = 50
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+
+def with_progress_output(cmd: List[str]) -> List[str]:
+    """Return *cmd* with FFmpeg progress reporting sent to *stdout*."""
+    return cmd[:1] + ["-nostats", "-progress", "pipe:1"] + cmd[1:]
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """Turn FFmpeg's ``speed=35.2x`` value into a float (``None`` if N/A)."""
+    try:
+        return float(value.strip().rstrip("x"))
+    except ValueError:
+        return None
+
+
+class ProgressState:
+    """Snapshot of a single FFmpeg encode."""
+
+    def __init__(self, duration: Optional[float] = None,
+                 out_time: float = 0.0, speed: Optional[float] = None,
+                 finished: bool = False) -> None:
+        self.duration = duration
+        self.out_time = out_time
+        self.speed = speed
+        self.finished = finished
+
+    @property
+    def fraction(self) -> float:
+        """Completed fraction in ``[0, 1]`` (``0`` while duration unknown)."""
+        if self.finished:
+            return 1.0
+        if not self.duration:
+            return 0.0
+        return min(1.0, max(0.0, self.out_time / self.duration))
+
+
+class FFmpegProgressParser:
+    """Incrementally parse the stdout and stderr streams of one FFmpeg run."""
+
+    def __init__(self, duration: Optional[float] = None) -> None:
+        """
+        Parameters
+        ----------
+        duration:
+            Known input duration in seconds.  When omitted it is read from
+            the ``Duration:`` line FFmpeg prints for its first input.
+        """
+        self.state = ProgressState(duration=duration)
+        self.stderr_tail: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+
+    def feed_progress_line(self, line: str) -> Optional[ProgressState]:
+        """
+        Consume one line of ``-progress`` output.
+
+        Returns the updated :class:`ProgressState` at the end of every
+        progress block, ``None`` otherwise.
+        """
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        if key == "out_time_us":
+            try:
+                self.state.out_time = int(value) / 1_000_000
+            except ValueError:
+                pass
+        elif key == "speed":
+            self.state.speed = parse_speed(value)
+        elif key == "progress":
+            self.state.finished = value == "end"
+            return self.state
+        return None
+
+    def feed_stderr_line(self, line: str) -> None:
+        """Consume one line of FFmpeg's diagnostic output."""
+        self.stderr_tail.append(line.rstrip("\n"))
+        if self.state.duration is None:
+            match = _DURATION_RE.search(line)
+            if match:
+                hours, minutes, seconds = match.groups()
+                self.state.duration = (int(hours) * 3600 + int(minutes) * 60
+                                       + float(seconds))
+
+    @property
+    def stderr(self) -> str:
+        """Return the retained tail of FFmpeg's diagnostic output."""
+        return "\n".join(self.stderr_tail)
+
+
+class BatchProgress:
+    """Thread‑safe aggregation of per‑job progress into batch totals."""
+
+    def __init__(self, total_jobs: int) -> None:
+        self.total_jobs = max(1, total_jobs)
+        self._fractions: Dict[Hashable, float] = {}
+        self._speeds: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def update(self, job: Hashable, state: ProgressState) -> None:
+        """Record the latest *state* reported for *job*."""
+        with self._lock:
+            self._fractions[job] = state.fraction
+            if state.speed is not None and not state.finished:
+                self._speeds[job] = state.speed
+            else:
+                self._speeds.pop(job, None)
+
+    def complete(self, job: Hashable) -> None:
+        """Mark *job* as done, whether it succeeded or failed."""
+        with self._lock:
+            self._fractions[job] = 1.0
+            self._speeds.pop(job, None)
+
+    @property
+    def fraction(self) -> float:
+        """Overall completed fraction of the batch."""
+        with self._lock:
+            return sum(self._fractions.values()) / self.total_jobs
+
+    @property
+    def speed(self) -> float:
+        """Combined realtime factor of all jobs currently encoding."""
+        with self._lock:
+            return sum(self._speeds.values())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#
+# Background discovery of audio files for the audio converter
+
+"""Folder scanner
+
+Walks directory trees with :func:`os.scandir` on a background thread and
+hands ``(path, size)`` pairs to a callback in batches, so adding tens of
+thousands of files never blocks the Tk main loop.  The size comes from
+the directory entry's cached ``stat`` result, so each file costs at most
+one system call.
+"""
+
+
+import os
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+#: Number of files handed to the callback at once.
+DEFAULT_BATCH_SIZE = 500
+
+ScannedFile = Tuple[str, int]
+
+
+def _has_format(name: str, formats: Iterable[str]) -> bool:
+    """Return ``True`` if *name* ends with one of *formats*' extensions."""
+    extension = os.path.splitext(name)[1][1:].lower()
+    return extension in formats
+
+
+def scan_directory(root_dir: str, formats: Iterable[str],
+                   recursive: bool = True,
+                   cancel_event: Optional[threading.Event] = None
+                   ) -> Iterator[ScannedFile]:
+    """
+    Yield visible audio files below *root_dir* with their size in bytes.
+
+    Hidden files and directories are skipped, symlinked directories are
+    not followed, and unreadable directories are silently ignored.
+    """
+    formats = frozenset(fmt.lower() for fmt in formats)
+    pending = [root_dir]
+    while pending:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirs = []
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif (_has_format(entry.name, formats)
+                              and entry.is_file()):
+                            yield entry.path, entry.stat().st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        if recursive:
+            # Reverse so directories are visited in listing order
+            pending.extend(reversed(sorted(subdirs)))
+
+
+def stat_files(paths: Iterable[str]) -> Iterator[ScannedFile]:
+    """Yield ``(path, size)`` for every readable file of *paths*."""
+    for path in paths:
+        try:
+            yield path, os.path.getsize(path)
+        except OSError:
+            continue
+
+
+class BackgroundScanner:
+    """Consume a file iterator on a worker thread, reporting in batches."""
+
+    def __init__(self, files: Iterable[ScannedFile],
+                 on_batch: Callable[[List[ScannedFile]], None],
+                 on_done: Callable[[], None],
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 cancel_event: Optional[threading.Event] = None) -> None:
+        """
+        Parameters
+        ----------
+        files:
+            Iterable producing ``(path, size)`` pairs, typically from
+            :func:`scan_directory` or :func:`stat_files`.  It is consumed on
+            the worker thread only.
+        on_batch:
+            Called from the worker thread with each batch of files.
+        on_done:
+            Called from the worker thread once scanning stops.
+        batch_size:
+            Maximum number of files per batch.
+        cancel_event:
+            Event set by :meth:`cancel`; share it with the iterator (see
+            :func:`scan_directory`) so it can stop walking early.
+        """
+        self.files = files
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.batch_size = batch_size
+        self.cancel_event = cancel_event or threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "BackgroundScanner":
+        """Start scanning and return ``self``."""
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Stop scanning after the current file."""
+        self.cancel_event.set()
+
+    def _run(self) -> None:
+        batch: List[ScannedFile] = []
+        try:
+            for item in self.files:
+                if self.cancel_event.is_set():
+                    return
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self.on_batch(batch)
+                    batch = []
+            if batch and not self.cancel_event.is_set():
+                self.on_batch(batch)
+        finally:
+            self.on_done()
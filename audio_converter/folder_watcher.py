@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#
+# Polling watch folder for continuous ingestion
+
+"""Folder watcher
+
+Detects audio files appearing in (or changing within) watched directories
+so a long‑running converter can pick them up without anyone pressing
+*Convert*.
+
+Detection is plain polling, which works the same on local disks, network
+shares and containers, and is kept cheap for large trees:
+
+* every poll only ``stat`` s the watched *directories*; a directory is
+  listed again only when its mtime changed, i.e. an entry was added,
+  removed or renamed;
+* files still being written are re‑``stat`` ed on every poll until their
+  size and mtime have not changed for *settle_time* seconds, so a copy in
+  progress is never handed to FFmpeg; empty files (placeholders a copy
+  will fill) stay in that state until they grow;
+* a full rescan every *rescan_interval* seconds catches files rewritten in
+  place, which leaves their directory's mtime untouched.
+
+An idle tree of 100 000 files in a few directories thus costs a handful of
+``stat`` calls per poll plus one listing per rescan.
+"""
+
+
+import asyncio
+import os
+import time
+from typing import (AsyncIterator, Callable, Dict, Iterable, List, Set,
+                    Tuple)
+
+from conversion_engine import ConversionCancelled, ConversionScheduler
+
+#: Seconds between two polls.
+DEFAULT_POLL_INTERVAL = 1.0
+
+#: Seconds a file's size and mtime must stay unchanged before it is ready.
+DEFAULT_SETTLE_TIME = 2.0
+
+#: Seconds between two full rescans (``0`` disables them).
+DEFAULT_RESCAN_INTERVAL = 300.0
+
+#: ``(size, mtime_ns)`` of a file.
+Signature = Tuple[int, int]
+
+
+class FolderWatcher:
+    """Report files that appeared or changed under some directories."""
+
+    def __init__(
+        self,
+        roots: Iterable[str],
+        accept: Callable[[str], bool],
+        recursive: bool = True,
+        exclude: Iterable[str] = (),
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        settle_time: float = DEFAULT_SETTLE_TIME,
+        rescan_interval: float = DEFAULT_RESCAN_INTERVAL,
+        report_existing: bool = True,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        roots:
+            Directories to watch.
+        accept:
+            Called with a file path; only files it accepts are reported.
+        recursive:
+            Also watch sub‑directories (hidden ones are skipped).
+        exclude:
+            Directories never entered, typically the output directory.
+        poll_interval, settle_time, rescan_interval:
+            See :data:`DEFAULT_POLL_INTERVAL`,
+            :data:`DEFAULT_SETTLE_TIME` and
+            :data:`DEFAULT_RESCAN_INTERVAL`.
+        report_existing:
+            Report the files already present at the first poll as well;
+            otherwise they only count as the baseline.
+        """
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.accept = accept
+        self.recursive = recursive
+        self.exclude = {os.path.abspath(path) for path in exclude}
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.rescan_interval = rescan_interval
+        self.report_existing = report_existing
+        #: Directory → mtime_ns when it was last listed.
+        self._dir_mtimes: Dict[str, int] = {}
+        #: Directory → {name: signature} of its settled files.
+        self._settled: Dict[str, Dict[str, Signature]] = {}
+        #: Path → (signature, monotonic time it was first seen so).
+        self._pending: Dict[str, Tuple[Signature, float]] = {}
+        self._next_rescan = 0.0
+        self._started = False
+
+    @property
+    def pending_count(self) -> int:
+        """Number of files seen but not settled yet."""
+        return len(self._pending)
+
+    def poll(self) -> List[str]:
+        """
+        Look for changes once and return the files that became ready.
+
+        Blocks on file‑system calls; :meth:`watch` runs it in an executor.
+        """
+        now = time.monotonic()
+        baseline = not self._started and not self.report_existing
+        full = not self._started or bool(self.rescan_interval
+                                         and now >= self._next_rescan)
+        self._started = True
+        listed: Set[str] = set()
+        if full:
+            self._next_rescan = now + self.rescan_interval
+            for root in self.roots:
+                self._list(root, now, baseline, listed, full=True)
+            for directory in set(self._dir_mtimes) - listed:
+                self._forget(directory)
+        else:
+            for directory in self._changed_directories():
+                self._list(directory, now, baseline, listed, full=False)
+        return self._settle(now)
+
+    async def watch(self, scheduler: ConversionScheduler
+                    ) -> AsyncIterator[str]:
+        """
+        Yield ready files, polling every *poll_interval* seconds.
+
+        Intended as the job source of
+        :meth:`ConversionScheduler.run_batch_async`; ends quietly once
+        *scheduler* is canceled.
+        """
+        loop = asyncio.get_running_loop()
+        while not scheduler.cancelled:
+            for path in await loop.run_in_executor(None, self.poll):
+                yield path
+            try:
+                await scheduler.sleep_async(self.poll_interval)
+            except ConversionCancelled:
+                return
+
+    # --------------------------------------------------------------------- #
+    # Scanning
+    # --------------------------------------------------------------------- #
+
+    def _changed_directories(self) -> List[str]:
+        """Return the known directories whose mtime moved since listing."""
+        changed = []
+        for directory, mtime in list(self._dir_mtimes.items()):
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    changed.append(directory)
+            except OSError:
+                self._forget(directory)
+        return changed
+
+    def _list(self, directory: str, now: float, baseline: bool,
+              listed: Set[str], full: bool) -> None:
+        """
+        List *directory*, queueing new or changed files as pending.
+
+        Sub‑directories are descended into on a *full* scan, otherwise only
+        when they are new.
+        """
+        listed.add(directory)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as iterator:
+                entries = list(iterator)
+        except OSError:
+            self._forget(directory)
+            return
+        self._dir_mtimes[directory] = mtime
+
+        settled = self._settled.setdefault(directory, {})
+        present = set()
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if (self.recursive and entry.path not in self.exclude
+                            and entry.path not in listed
+                            and (full or entry.path not in self._dir_mtimes)):
+                        self._list(entry.path, now, baseline, listed, full)
+                    continue
+                if not entry.is_file() or not self.accept(entry.path):
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            present.add(entry.name)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if settled.get(entry.name) == signature:
+                continue
+            if baseline and stat.st_size:
+                settled[entry.name] = signature
+            elif entry.path not in self._pending:
+                self._pending[entry.path] = (signature, now)
+
+        for name in set(settled) - present:
+            del settled[name]
+
+    def _settle(self, now: float) -> List[str]:
+        """Re‑check pending files and return those that stopped changing."""
+        ready = []
+        for path, (signature, since) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._pending[path]  # deleted or renamed away
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle_time and current[0]:
+                del self._pending[path]
+                directory, name = os.path.split(path)
+                self._settled.setdefault(directory, {})[name] = current
+                ready.append(path)
+            # An empty placeholder stays pending until it is filled, which
+            # leaves its directory's mtime alone
+        return sorted(ready)
+
+    def _forget(self, directory: str) -> None:
+        """Drop a vanished *directory* and everything below it."""
+        prefix = directory + os.sep
+        for known in [known for known in self._dir_mtimes
+                      if known == directory or known.startswith(prefix)]:
+            del self._dir_mtimes[known]
+            self._settled.pop(known, None)
+        for path in [path for path in self._pending
+                     if path.startswith(prefix)]:
+            del self._pending[path]
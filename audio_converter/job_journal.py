@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+#
+# Persistent, resumable conversion job journal
+
+"""Job journal
+
+Records every conversion batch and its jobs in a small SQLite database so
+an interrupted batch (crash, reboot, canceled app) can be resumed later.
+
+Each job carries a status (``pending``, ``running``, ``done`` or
+``failed``), its attempt count and the last error.  Jobs found ``running``
+when a batch is resumed were interrupted and are treated as pending.
+"""
+
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app_paths import user_data_dir
+
+JOURNAL_NAME = "jobs.sqlite3"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+#: Attempts (including the first one) before a job is given up on.
+DEFAULT_MAX_ATTEMPTS = 3
+
+#: First retry delay in seconds; doubled after every further failure.
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at  REAL NOT NULL,
+    settings    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id        INTEGER NOT NULL REFERENCES batches(id),
+    position        INTEGER NOT NULL,
+    source          TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    error           TEXT,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_batch ON jobs(batch_id, status);
+"""
+
+
+def retry_delay(attempts: int) -> float:
+    """Return the back‑off before retrying a job that failed *attempts* times."""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(0, attempts - 1))
+
+
+class Job:
+    """One row of the journal."""
+
+    def __init__(self, job_id: int, source: str, status: str,
+                 attempts: int, error: Optional[str],
+                 next_attempt_at: float) -> None:
+        self.id = job_id
+        self.source = source
+        self.status = status
+        self.attempts = attempts
+        self.error = error
+        self.next_attempt_at = next_attempt_at
+
+
+class JobJournal:
+    """SQLite‑backed journal shared by the GUI thread and worker threads."""
+
+    def __init__(self, path: Optional[str] = None,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        """
+        Parameters
+        ----------
+        path:
+            Database file.  Defaults to ``jobs.sqlite3`` in the user data
+            directory.
+        max_attempts:
+            Attempts after which a failed job is no longer retried.
+        """
+        self.path = path or os.path.join(user_data_dir(), JOURNAL_NAME)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql: str, params: Tuple[Any, ...] = ()) -> None:
+        with self._lock:
+            self._db.execute(sql, params)
+
+    def _query(self, sql: str, params: Tuple[Any, ...] = ()
+               ) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # --------------------------------------------------------------------- #
+    # Batches
+    # --------------------------------------------------------------------- #
+
+    def create_batch(self, settings: Dict[str, Any],
+                     sources: List[str]) -> Tuple[int, Dict[str, int]]:
+        """
+        Journal a new batch and return ``(batch_id, {source: job_id})``.
+
+        Any unfinished earlier batch is superseded and will no longer be
+        offered for resumption.
+        """
+        now = time.time()
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, attempts = MAX(attempts, ?), "
+                    "error = COALESCE(error, 'superseded'), updated_at = ? "
+                    "WHERE status IN (?, ?, ?)",
+                    (FAILED, self.max_attempts, now,
+                     PENDING, RUNNING, FAILED))
+                cursor = self._db.execute(
+                    "INSERT INTO batches (created_at, settings) VALUES (?, ?)",
+                    (now, json.dumps(settings)))
+                batch_id = cursor.lastrowid
+                self._db.executemany(
+                    "INSERT INTO jobs (batch_id, position, source, status, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(batch_id, position, source, PENDING, now)
+                     for position, source in enumerate(sources)])
+                rows = self._db.execute(
+                    "SELECT source, id FROM jobs WHERE batch_id = ?",
+                    (batch_id,)).fetchall()
+        return batch_id, dict(rows)
+
+    def add_jobs(self, batch_id: int,
+                 sources: List[str]) -> Dict[str, int]:
+        """
+        Append *sources* to the running batch *batch_id* and return
+        ``{source: job_id}`` of the new jobs.
+        """
+        now = time.time()
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                (start,) = self._db.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM jobs "
+                    "WHERE batch_id = ?", (batch_id,)).fetchone()
+                self._db.executemany(
+                    "INSERT INTO jobs (batch_id, position, source, status, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(batch_id, start + offset, source, PENDING, now)
+                     for offset, source in enumerate(sources)])
+                rows = self._db.execute(
+                    "SELECT source, id FROM jobs WHERE batch_id = ? AND "
+                    "position >= ?", (batch_id, start)).fetchall()
+        return dict(rows)
+
+    def remove_jobs(self, job_ids: List[int]) -> None:
+        """Delete the jobs *job_ids*, e.g. added to a batch that just ended."""
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany("DELETE FROM jobs WHERE id = ?",
+                                     [(job_id,) for job_id in job_ids])
+
+    def unfinished_batch(self) -> Optional[Tuple[int, Dict[str, Any], int]]:
+        """
+        Return ``(batch_id, settings, job_count)`` of the latest batch with
+        jobs left to do, or ``None``.
+        """
+        rows = self._query(
+            "SELECT b.id, b.settings, COUNT(j.id) FROM batches b "
+            "JOIN jobs j ON j.batch_id = b.id "
+            "WHERE j.status IN (?, ?) OR (j.status = ? AND j.attempts < ?) "
+            "GROUP BY b.id ORDER BY b.id DESC LIMIT 1",
+            (PENDING, RUNNING, FAILED, self.max_attempts))
+        if not rows:
+            return None
+        batch_id, settings, count = rows[0]
+        return batch_id, json.loads(settings), count
+
+    def resumable_jobs(self, batch_id: int) -> List[Job]:
+        """Return the unfinished jobs of *batch_id* in their original order."""
+        rows = self._query(
+            "SELECT id, source, status, attempts, error, next_attempt_at "
+            "FROM jobs WHERE batch_id = ? AND (status IN (?, ?) "
+            "OR (status = ? AND attempts < ?)) ORDER BY position",
+            (batch_id, PENDING, RUNNING, FAILED, self.max_attempts))
+        return [Job(*row) for row in rows]
+
+    def discard_batch(self, batch_id: int) -> None:
+        """Give up on every unfinished job of *batch_id*."""
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = ?, updated_at = ? "
+            "WHERE batch_id = ? AND status != ?",
+            (FAILED, self.max_attempts, time.time(), batch_id, DONE))
+
+    # --------------------------------------------------------------------- #
+    # Job state transitions
+    # --------------------------------------------------------------------- #
+
+    def mark_running(self, job_id: int) -> int:
+        """Record the start of an attempt and return the attempt number."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (RUNNING, time.time(), job_id))
+            return self._db.execute("SELECT attempts FROM jobs WHERE id = ?",
+                                    (job_id,)).fetchone()[0]
+
+    def mark_done(self, job_id: int) -> None:
+        """Record a successful conversion."""
+        self._execute(
+            "UPDATE jobs SET status = ?, error = NULL, updated_at = ? "
+            "WHERE id = ?", (DONE, time.time(), job_id))
+
+    def mark_failed(self, job_id: int, attempts: int, error: str,
+                    retry: bool = True) -> float:
+        """
+        Record a failed attempt.  A failure that would recur (*retry*
+        false) uses up all the job's attempts at once.
+
+        Returns the back‑off delay before the next attempt, or ``-1`` if
+        the job is given up on.
+        """
+        now = time.time()
+        if not retry:
+            attempts = self.max_attempts
+        delay = retry_delay(attempts) if attempts < self.max_attempts else -1
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts, ?), "
+            "error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+            (FAILED, attempts, error, now + max(delay, 0), now, job_id))
+        return delay
+
+    def mark_pending(self, job_id: int) -> None:
+        """Put an interrupted job back in the queue (e.g. on cancel)."""
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), "
+            "updated_at = ? WHERE id = ? AND status = ?",
+            (PENDING, time.time(), job_id, RUNNING))
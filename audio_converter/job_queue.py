@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+#
+# Priority and longest-first ordering of conversion jobs
+
+"""Job queue
+
+Orders the jobs of a batch instead of running them as submitted.  A batch
+mixing hundreds of songs with a few multi‑hour recordings finishes
+soonest when the long files start first (*longest processing time*
+scheduling): started last, they would keep one worker busy long after the
+others ran dry.
+
+:class:`JobQueue` therefore hands out
+
+1. the job of the highest *priority* (set by the user), then
+2. the longest one, by probed duration (see :func:`estimated_duration`),
+3. in submission order among equals.
+
+Jobs may be added while the batch runs.  So that a steady stream of new,
+longer or more urgent files cannot starve earlier ones, waiting counts as
+priority: a job queued one aging period (:data:`DEFAULT_AGING_PERIOD`)
+after another ranks one priority level below it.
+
+The queue is a plain iterable, safe to fill from any thread, that ends
+once it runs dry; it is meant to be consumed by
+:meth:`conversion_engine.ConversionScheduler.run_batch_async`, which only
+takes the next job when a worker is free.
+"""
+
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import (Callable, Dict, Generic, Hashable, Iterable, Iterator,
+                    List, Optional, Tuple, TypeVar, Union)
+
+from media_probe import MediaInfo
+
+T = TypeVar("T", bound=Hashable)
+
+#: User‑assignable priorities.
+HIGH, NORMAL, LOW = 1, 0, -1
+
+#: Display names of the priorities.
+PRIORITY_NAMES = {HIGH: "High", NORMAL: "Normal", LOW: "Low"}
+
+#: Seconds of waiting worth one priority level.
+DEFAULT_AGING_PERIOD = 300.0
+
+#: Byte rate assumed for sources without a probed duration (128 kb/s).
+#: Overestimating suits longest‑first ordering better than the reverse.
+FALLBACK_BYTE_RATE = 16000
+
+_Key = Tuple[int, float, int]
+
+
+def estimated_duration(source_file: str,
+                       info: Optional[MediaInfo]) -> float:
+    """
+    Return the duration of *source_file* in seconds, estimated from its
+    size when *info* has none.
+    """
+    if info is not None and info.duration:
+        return info.duration
+    try:
+        return os.path.getsize(source_file) / FALLBACK_BYTE_RATE
+    except OSError:
+        return 0.0
+
+
+class JobQueue(Generic[T]):
+    """Thread‑safe queue handing out the most urgent, longest job first."""
+
+    def __init__(self, cost: Callable[[T], float],
+                 aging_period: float = DEFAULT_AGING_PERIOD,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Parameters
+        ----------
+        cost:
+            Returns the expected work of a job, e.g. its duration; larger
+            jobs run first.
+        aging_period:
+            Seconds of waiting that make up for one priority level.
+        clock:
+            Monotonic time source (replaceable for benchmarks).
+        """
+        self.cost = cost
+        self.aging_period = aging_period
+        self.clock = clock
+        self._origin = clock()
+        self._heap: List[Tuple[_Key, T]] = []
+        self._keys: Dict[T, _Key] = {}
+        self._jobs: Dict[T, Tuple[int, float, int]] = {}  # epoch, cost, seq
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._exhausted = False
+
+    def _key(self, job: T, priority: int) -> _Key:
+        # Jobs queued an aging period later rank a priority level lower
+        epoch, cost, sequence = self._jobs[job]
+        return epoch - priority, -cost, sequence
+
+    def add(self, jobs: Iterable[T],
+            priority: Union[int, Callable[[T], int]] = NORMAL) -> bool:
+        """
+        Queue *jobs* with *priority* (a level or a function of the job).
+
+        Jobs already queued are left alone.  Returns ``False``, queuing
+        nothing, once the queue has run dry: its batch is then finishing
+        and new jobs belong to the next one.
+        """
+        priority_of = priority if callable(priority) else (
+            lambda _job: priority)
+        # Costs may need I/O; compute them outside the lock
+        pending = [(job, self.cost(job), priority_of(job)) for job in jobs]
+        with self._lock:
+            if self._exhausted:
+                return False
+            epoch = int((self.clock() - self._origin) // self.aging_period)
+            for job, cost, level in pending:
+                if job in self._keys:
+                    continue
+                self._jobs[job] = (epoch, cost, next(self._sequence))
+                key = self._keys[job] = self._key(job, level)
+                heapq.heappush(self._heap, (key, job))
+        return True
+
+    def set_priority(self, job: T, priority: int) -> bool:
+        """
+        Change the priority of the queued *job*, keeping the credit it
+        earned by waiting.  Returns ``False`` if *job* is not queued.
+        """
+        with self._lock:
+            if job not in self._keys:
+                return False
+            key = self._keys[job] = self._key(job, priority)
+            # The old heap entry is skipped when it surfaces
+            heapq.heappush(self._heap, (key, job))
+        return True
+
+    def pop(self) -> Optional[T]:
+        """Remove and return the next job, or ``None`` if none is queued."""
+        with self._lock:
+            while self._heap:
+                key, job = heapq.heappop(self._heap)
+                if self._keys.get(job) != key:
+                    continue  # re-keyed by set_priority() meanwhile
+                del self._keys[job], self._jobs[job]
+                return job
+            self._exhausted = True
+            return None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+    def __iter__(self) -> Iterator[T]:
+        """Hand out jobs until the queue runs dry."""
+        while True:
+            job = self.pop()
+            if job is None:
+                return
+            yield job
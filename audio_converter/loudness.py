@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+#
+# EBU R128 loudness normalization for the audio converter
+
+"""Loudness normalization
+
+Two‑pass EBU R128 normalization with FFmpeg's ``loudnorm`` filter:
+
+1. an analysis pass decodes the source once and measures its integrated
+   loudness, true peak, loudness range and gating threshold;
+2. the encode pass feeds those measurements back to ``loudnorm`` so it can
+   apply a single, linear gain instead of guessing as it goes.
+
+The analysis is the expensive half, and its result depends only on the
+source and the loudness target, so it is kept in a persistent SQLite cache
+keyed by the source identity (path, size, mtime).  Converting the same
+source again, to another format or quality, skips it entirely.
+"""
+
+
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app_paths import user_cache_dir
+from conversion_engine import ConversionScheduler
+from media_probe import MediaInfo, file_identity
+
+LOUDNESS_CACHE_NAME = "loudness_cache.sqlite3"
+
+#: EBU R128 programme loudness (LUFS).
+DEFAULT_INTEGRATED = -23.0
+
+#: Maximum true peak (dBTP).
+DEFAULT_TRUE_PEAK = -1.0
+
+#: Target loudness range (LU).
+DEFAULT_LOUDNESS_RANGE = 7.0
+
+#: Output sample rate when the source rate is unknown; ``loudnorm``
+#: itself always outputs 192 kHz.
+FALLBACK_SAMPLE_RATE = 48000
+
+
+class LoudnessTarget:
+    """The loudness an output should be normalized to."""
+
+    def __init__(self, integrated: float = DEFAULT_INTEGRATED,
+                 true_peak: float = DEFAULT_TRUE_PEAK,
+                 loudness_range: float = DEFAULT_LOUDNESS_RANGE) -> None:
+        self.integrated = integrated
+        self.true_peak = true_peak
+        self.loudness_range = loudness_range
+
+    def options(self) -> str:
+        """Return the target as ``loudnorm`` options."""
+        return (f"I={self.integrated:g}:TP={self.true_peak:g}"
+                f":LRA={self.loudness_range:g}")
+
+    def __str__(self) -> str:
+        return self.options()
+
+
+class LoudnessMeasurement:
+    """Result of the ``loudnorm`` analysis pass."""
+
+    FIELDS = ("input_i", "input_tp", "input_lra", "input_thresh",
+              "target_offset")
+
+    def __init__(self, input_i: float, input_tp: float, input_lra: float,
+                 input_thresh: float, target_offset: float) -> None:
+        self.input_i = input_i
+        self.input_tp = input_tp
+        self.input_lra = input_lra
+        self.input_thresh = input_thresh
+        self.target_offset = target_offset
+
+    @property
+    def is_silent(self) -> bool:
+        """``True`` when there is nothing to normalize (e.g. silence)."""
+        return not all(math.isfinite(getattr(self, field))
+                       for field in self.FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a JSON‑serialisable dictionary."""
+        # JSON has no infinities; loudnorm prints them as strings too
+        return {field: str(getattr(self, field)) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LoudnessMeasurement":
+        """Inverse of :meth:`to_dict`; also reads ``loudnorm``'s output."""
+        return cls(**{field: float(data[field]) for field in cls.FIELDS})
+
+
+def analysis_command(source_file: str, target: LoudnessTarget) -> List[str]:
+    """Return the FFmpeg command measuring *source_file*'s loudness."""
+    return ["ffmpeg", "-hide_banner", "-nostats", "-i", source_file,
+            "-map", "0:a:0", "-af",
+            f"loudnorm={target.options()}:print_format=json",
+            "-f", "null", "-"]
+
+
+def parse_analysis(stderr: str) -> Optional[LoudnessMeasurement]:
+    """Return the measurement ``loudnorm`` printed at the end of *stderr*."""
+    start, end = stderr.rfind("{"), stderr.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        return LoudnessMeasurement.from_dict(
+            json.loads(stderr[start:end + 1]))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def normalization_filter(target: LoudnessTarget,
+                         measurement: LoudnessMeasurement,
+                         info: Optional[MediaInfo] = None) -> str:
+    """
+    Return the ``-af`` filter chain of the encode pass.
+
+    The output is resampled back to the source rate (from *info*), since
+    ``loudnorm`` upsamples to 192 kHz internally.
+    """
+    sample_rate = (info.sample_rate if info is not None
+                   and info.sample_rate else FALLBACK_SAMPLE_RATE)
+    return (f"loudnorm={target.options()}"
+            f":measured_I={measurement.input_i:g}"
+            f":measured_TP={measurement.input_tp:g}"
+            f":measured_LRA={measurement.input_lra:g}"
+            f":measured_thresh={measurement.input_thresh:g}"
+            f":offset={measurement.target_offset:g}"
+            f":linear=true,aresample={sample_rate}")
+
+
+class LoudnessCache:
+    """SQLite cache of :class:`LoudnessMeasurement` keyed by source identity."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(user_cache_dir(),
+                                         LOUDNESS_CACHE_NAME)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS loudness ("
+            " path TEXT NOT NULL, target TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " measurement TEXT NOT NULL, PRIMARY KEY (path, target))")
+
+    def get(self, identity: Tuple[str, int, int], target: LoudnessTarget
+            ) -> Optional[LoudnessMeasurement]:
+        """Return the cached analysis of *identity* if it is still current."""
+        path, size, mtime_ns = identity
+        with self._lock:
+            row = self._db.execute(
+                "SELECT measurement FROM loudness WHERE path = ? AND "
+                "target = ? AND size = ? AND mtime_ns = ?",
+                (path, str(target), size, mtime_ns)).fetchone()
+        if row is None:
+            return None
+        return LoudnessMeasurement.from_dict(json.loads(row[0]))
+
+    def put(self, identity: Tuple[str, int, int], target: LoudnessTarget,
+            measurement: LoudnessMeasurement) -> None:
+        """Store *measurement* for *identity*, replacing stale entries."""
+        path, size, mtime_ns = identity
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO loudness VALUES (?, ?, ?, ?, ?)",
+                (path, str(target), size, mtime_ns,
+                 json.dumps(measurement.to_dict())))
+
+
+class LoudnessNormalizer:
+    """Measure sources once (cached) and build their normalization filter."""
+
+    def __init__(self, target: Optional[LoudnessTarget] = None,
+                 cache: Optional[LoudnessCache] = None) -> None:
+        self.target = target or LoudnessTarget()
+        self.cache = cache
+
+    def _cached(self, source_file: str
+                ) -> Optional[LoudnessMeasurement]:
+        identity = file_identity(source_file)
+        if identity is None or self.cache is None:
+            return None
+        return self.cache.get(identity, self.target)
+
+    def _store(self, source_file: str,
+               measurement: LoudnessMeasurement) -> None:
+        identity = file_identity(source_file)
+        if identity is not None and self.cache is not None:
+            self.cache.put(identity, self.target, measurement)
+
+    @staticmethod
+    def _result(returncode: int, stderr: str) -> LoudnessMeasurement:
+        measurement = parse_analysis(stderr) if not returncode else None
+        if measurement is None:
+            raise Exception(f"Loudness analysis failed: {stderr[-500:]}")
+        return measurement
+
+    async def measure_async(self, scheduler: ConversionScheduler,
+                            source_file: str) -> LoudnessMeasurement:
+        """
+        Return *source_file*'s loudness, running the analysis pass only
+        when the cache has no current result.
+
+        Raises
+        ------
+        Exception
+            If the analysis pass fails.
+        """
+        loop = asyncio.get_running_loop()
+        measurement = await loop.run_in_executor(None, self._cached,
+                                                 source_file)
+        if measurement is not None:
+            return measurement
+        measurement = self._result(*await scheduler.run_command_async(
+            analysis_command(source_file, self.target)))
+        await loop.run_in_executor(None, self._store, source_file,
+                                   measurement)
+        return measurement
+
+    def filter(self, measurement: LoudnessMeasurement,
+               info: Optional[MediaInfo] = None) -> Optional[str]:
+        """Return the encode‑pass filter, or ``None`` for silent sources."""
+        if measurement.is_silent:
+            return None
+        return normalization_filter(self.target, measurement, info)
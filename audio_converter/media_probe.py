@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+#
+# ffprobe helpers for the audio converter
+
+"""Media probe
+
+Thin wrappers around **ffprobe** used to inspect source files before they
+are converted, plus a persistent cache so each file is probed only once
+for as long as its size and modification time stay the same.
+"""
+
+
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app_paths import user_cache_dir
+
+PROBE_CACHE_NAME = "probe_cache.sqlite3"
+
+#: Concurrent ffprobe processes used by :class:`MetadataProber`.
+DEFAULT_PROBE_WORKERS = 4
+
+
+class MediaInfo:
+    """Container and first audio stream properties of a file."""
+
+    FIELDS = ("duration", "codec", "bitrate", "sample_rate", "channels",
+              "container")
+
+    def __init__(self, duration: Optional[float] = None,
+                 codec: Optional[str] = None,
+                 bitrate: Optional[int] = None,
+                 sample_rate: Optional[int] = None,
+                 channels: Optional[int] = None,
+                 container: Optional[str] = None) -> None:
+        self.duration = duration
+        self.codec = codec
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.container = container
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a JSON‑serialisable dictionary."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MediaInfo":
+        """Inverse of :meth:`to_dict`."""
+        return cls(**{field: data.get(field) for field in cls.FIELDS})
+
+
+def _number(value: Any, kind: Callable[[Any], Any]) -> Optional[Any]:
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_media(source_file: str) -> Optional[MediaInfo]:
+    """Return the :class:`MediaInfo` of *source_file*, or ``None``."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error",
+             "-select_streams", "a:0",
+             "-show_entries",
+             "format=duration,bit_rate,format_name:"
+             "stream=codec_name,bit_rate,sample_rate,channels",
+             "-of", "json",
+             source_file],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=False,
+        )
+    except FileNotFoundError:
+        return None
+    try:
+        data = json.loads(result.stdout or "{}")
+    except ValueError:
+        return None
+
+    fmt = data.get("format", {})
+    streams = data.get("streams") or [{}]
+    stream = streams[0]
+    if not fmt and not stream:
+        return None
+    return MediaInfo(
+        duration=_number(fmt.get("duration"), float),
+        codec=stream.get("codec_name"),
+        bitrate=(_number(stream.get("bit_rate"), int)
+                 or _number(fmt.get("bit_rate"), int)),
+        sample_rate=_number(stream.get("sample_rate"), int),
+        channels=_number(stream.get("channels"), int),
+        container=fmt.get("format_name"),
+    )
+
+
+def probe_duration(source_file: str) -> Optional[float]:
+    """Return the duration of *source_file* in seconds, or ``None``."""
+    info = probe_media(source_file)
+    return info.duration if info is not None else None
+
+
+# --------------------------------------------------------------------- #
+# Persistent cache
+# --------------------------------------------------------------------- #
+
+def file_identity(path: str) -> Optional[Tuple[str, int, int]]:
+    """Return ``(abspath, size, mtime_ns)`` of *path*, or ``None``."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+class ProbeCache:
+    """SQLite cache of :class:`MediaInfo` keyed by (path, size, mtime)."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(user_cache_dir(), PROBE_CACHE_NAME)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL, info TEXT NOT NULL)")
+
+    def get(self, identity: Tuple[str, int, int]) -> Optional[MediaInfo]:
+        """Return the cached info of *identity* if it is still current."""
+        path, size, mtime_ns = identity
+        with self._lock:
+            row = self._db.execute(
+                "SELECT info FROM probes WHERE path = ? AND size = ? "
+                "AND mtime_ns = ?", (path, size, mtime_ns)).fetchone()
+        return MediaInfo.from_dict(json.loads(row[0])) if row else None
+
+    def put(self, identity: Tuple[str, int, int], info: MediaInfo) -> None:
+        """Store *info* for *identity*, replacing stale entries."""
+        path, size, mtime_ns = identity
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?)",
+                (path, size, mtime_ns, json.dumps(info.to_dict())))
+
+
+class MetadataProber:
+    """Probe files concurrently on a bounded pool, consulting the cache."""
+
+    def __init__(self, cache: Optional[ProbeCache] = None,
+                 max_workers: int = DEFAULT_PROBE_WORKERS) -> None:
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="probe")
+
+    def probe(self, source_file: str) -> Optional[MediaInfo]:
+        """Return the metadata of *source_file*, probing it if not cached."""
+        identity = file_identity(source_file)
+        if identity is None:
+            return None
+        if self.cache is not None:
+            info = self.cache.get(identity)
+            if info is not None:
+                return info
+        info = probe_media(source_file)
+        if info is not None and self.cache is not None:
+            self.cache.put(identity, info)
+        return info
+
+    def probe_many(self, paths: Iterable[str],
+                   on_result: Callable[[str, Optional[MediaInfo]], None]
+                   ) -> None:
+        """
+        Queue *paths* for probing without blocking.
+
+        *on_result(path, info)* is called from a pool thread per file.
+        """
+        for path in paths:
+            self._pool.submit(self._probe_and_report, path, on_result)
+
+    def _probe_and_report(self, path: str,
+                          on_result: Callable[[str, Optional[MediaInfo]],
+                                              None]) -> None:
+        on_result(path, self.probe(path))
+
+    def shutdown(self) -> None:
+        """Drop queued probes and release the pool."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
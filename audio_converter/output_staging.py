@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+#
+# Scratch-directory staging of conversion outputs
+
+"""Output staging
+
+Lets FFmpeg write every output to a fast local scratch directory (a tmpfs
+such as ``/dev/shm`` when available) instead of the destination.  Once a
+job has finished, each staged file is verified and then moved into place:
+
+* on the same filesystem with a single atomic :func:`os.replace`;
+* otherwise by copying to a hidden temporary name next to the destination
+  and renaming that, so the final path never holds a partial file.
+
+Copy‑out runs on its own small thread pool, so slow destination storage
+never stalls the encoders and only a bounded number of copies compete for
+it.
+"""
+
+
+import asyncio
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from media_probe import probe_media
+
+#: Preferred scratch locations, fastest first.
+SCRATCH_CANDIDATES = ("/dev/shm",)
+
+#: Concurrent copy‑outs to the destination filesystem.
+DEFAULT_IO_WORKERS = 2
+
+#: Output duration may differ from the source by this much (seconds) or
+#: this fraction, whichever is larger, before it counts as truncated.
+DURATION_TOLERANCE = 1.0
+DURATION_TOLERANCE_RATIO = 0.01
+
+
+class StagingError(Exception):
+    """Raised when a staged output fails verification."""
+
+
+def default_scratch_dir() -> str:
+    """Return a writable tmpfs if there is one, else the temp directory."""
+    for candidate in SCRATCH_CANDIDATES:
+        if os.path.isdir(candidate) and os.access(candidate, os.W_OK):
+            return candidate
+    return tempfile.gettempdir()
+
+
+def verify_output(path: str, expected_duration: Optional[float]) -> None:
+    """
+    Check that *path* looks like a complete encode.
+
+    The file must be non‑empty; when *expected_duration* is known and
+    ffprobe can read the file, its duration must match.
+
+    Raises
+    ------
+    StagingError
+        If the output is missing, empty or truncated.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError as exc:
+        raise StagingError(f"Output missing: {path}") from exc
+    if not size:
+        raise StagingError(f"Output is empty: {path}")
+    if expected_duration is None:
+        return
+    info = probe_media(path)
+    if info is None or info.duration is None:
+        return
+    tolerance = max(DURATION_TOLERANCE,
+                    expected_duration * DURATION_TOLERANCE_RATIO)
+    if abs(info.duration - expected_duration) > tolerance:
+        raise StagingError(
+            f"Output is {info.duration:.1f} s long, expected "
+            f"{expected_duration:.1f} s: {os.path.basename(path)}")
+
+
+def move_into_place(staged: str, destination: str) -> None:
+    """Move *staged* to *destination* so it appears there atomically."""
+    try:
+        os.replace(staged, destination)
+        return
+    except OSError:
+        pass  # most likely a different filesystem
+
+    directory, name = os.path.split(os.path.abspath(destination))
+    fd, partial = tempfile.mkstemp(prefix=f".{name}.", suffix=".part",
+                                   dir=directory)
+    os.close(fd)
+    try:
+        shutil.copyfile(staged, partial)
+        shutil.copymode(staged, partial)  # mkstemp creates it 0600
+        os.replace(partial, destination)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    os.remove(staged)
+
+
+class StagedJob:
+    """The scratch paths of one job's outputs."""
+
+    def __init__(self, work_dir: str, outputs: List[str]) -> None:
+        self.work_dir = work_dir
+        #: Final output path → staged path.
+        self.paths: Dict[str, str] = {}
+        for index, output in enumerate(outputs):
+            # Keep the extension: FFmpeg picks the muxer from it
+            self.paths[output] = os.path.join(
+                work_dir, f"{index}_{os.path.basename(output)}")
+
+    def discard(self) -> None:
+        """Delete whatever is left in the scratch directory."""
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class OutputStager:
+    """Stage outputs in a scratch directory and copy them out in a pool."""
+
+    def __init__(self, scratch_dir: Optional[str] = None,
+                 io_workers: int = DEFAULT_IO_WORKERS) -> None:
+        """
+        Parameters
+        ----------
+        scratch_dir:
+            Directory receiving the staged files.  Defaults to
+            :func:`default_scratch_dir`.
+        io_workers:
+            Maximum number of outputs copied out at the same time.
+        """
+        self.scratch_dir = scratch_dir or default_scratch_dir()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, io_workers),
+                                        thread_name_prefix="copy-out")
+
+    def stage(self, outputs: List[str]) -> StagedJob:
+        """Reserve scratch paths for *outputs*."""
+        work_dir = tempfile.mkdtemp(prefix=".stage-", dir=self.scratch_dir)
+        return StagedJob(work_dir, outputs)
+
+    def _finish(self, job: StagedJob,
+                expected_duration: Optional[float]) -> None:
+        """Verify and move every staged output of *job* (I/O pool)."""
+        try:
+            for staged in job.paths.values():
+                verify_output(staged, expected_duration)
+            for output, staged in job.paths.items():
+                move_into_place(staged, output)
+        finally:
+            job.discard()
+
+    async def finish_async(self, job: StagedJob,
+                           expected_duration: Optional[float] = None
+                           ) -> None:
+        """
+        Verify *job*'s outputs and move them into place.
+
+        Raises
+        ------
+        StagingError
+            If an output fails verification; nothing is moved then.
+        OSError
+            If copying to the destination fails.
+        """
+        await asyncio.get_running_loop().run_in_executor(
+            self._pool, self._finish, job, expected_duration)
+
+    def shutdown(self) -> None:
+        """Wait for pending copy‑outs and release the pool."""
+        self._pool.shutdown(wait=True)
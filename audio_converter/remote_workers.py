@@ -0,0 +1,498 @@
+#!/usr/bin/env python
+#
+# Conversion worker daemon and client pool over local sockets
+
+"""Remote workers
+
+Spreads the FFmpeg runs of a batch over several worker daemons, on this
+machine or on others sharing the same file paths (e.g. an NFS mount of the
+archive and the output directory).
+
+Start one daemon per machine (or several on one, to simulate a cluster)::
+
+    python remote_workers.py --listen 127.0.0.1:7878 --slots 4
+    python remote_workers.py --listen unix:/tmp/converter.sock
+
+and give their addresses to the GUI or to ``audio_converter_cli.py
+--remote``.  The commands sent are the ones the strategies build for
+local runs; a daemon only accepts ``ffmpeg`` commands and runs its own
+FFmpeg binary with their arguments, whatever program path the client
+names.  There is no authentication, so TCP daemons should only listen on
+trusted interfaces.
+
+The protocol is one JSON object per line.  On connect the daemon sends
+``{"type": "hello", "slots": N}``; the client then sends ``job`` messages
+(``id``, ``cmd``, ``duration``) and ``cancel`` messages (``id``), and the
+daemon answers with ``progress`` (``id``, ``out_time``, ``speed``) and
+finally ``done`` (``id``, ``returncode``, ``stderr``) per job.
+
+:class:`WorkerPool` dispatches by pulling: every free slot of a connected
+daemon takes the next job from one shared queue, so fast or idle workers
+automatically take work the others have not started.  Jobs in flight on a
+daemon that disconnects are put back at the head of the queue for the
+remaining workers, up to :data:`MAX_ATTEMPTS` times, and lost daemons are
+reconnected in the background.
+"""
+
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import signal
+import socket
+import stat
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from conversion_engine import (STREAM_LINE_LIMIT, ConversionCancelled,
+                               ConversionScheduler, ConversionTimeout,
+                               default_worker_count, engine_loop)
+from ffmpeg_progress import ProgressState
+
+PROTOCOL_VERSION = 1
+
+#: Port used when an address gives none.
+DEFAULT_PORT = 7878
+DEFAULT_ADDRESS = f"127.0.0.1:{DEFAULT_PORT}"
+
+#: Seconds between two attempts to reach a lost worker.
+RECONNECT_INTERVAL = 5.0
+
+#: Seconds to wait for a worker's greeting.
+CONNECT_TIMEOUT = 5.0
+
+#: Times a job is sent out before a disconnect counts as its failure.
+MAX_ATTEMPTS = 3
+
+#: Programs a client may name; the worker runs its own binary instead.
+ALLOWED_PROGRAMS = ("ffmpeg",)
+
+
+class WorkerLost(Exception):
+    """Raised when the workers running a job kept disconnecting."""
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """
+    Return ``("unix", path)`` or ``("tcp", (host, port))`` for *address*.
+
+    Addresses are ``unix:/path/to/socket``, ``host:port``, ``host`` or
+    ``:port``.
+
+    Raises
+    ------
+    ValueError
+        If the port is not a number.
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host and not _:
+        host, port = address, ""
+    return "tcp", (host or "127.0.0.1", int(port) if port else DEFAULT_PORT)
+
+
+def _write(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    """Queue *message* as one line (writes never block)."""
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+
+
+# ------------------------------------------------------------------------- #
+# Daemon
+# ------------------------------------------------------------------------- #
+
+class WorkerServer:
+    """Run jobs received over a socket on a local scheduler."""
+
+    def __init__(self, scheduler: ConversionScheduler,
+                 slots: Optional[int] = None,
+                 ffmpeg: Optional[str] = None) -> None:
+        """
+        Parameters
+        ----------
+        scheduler:
+            Scheduler starting the FFmpeg children (its timeout applies).
+        slots:
+            Jobs run at once, offered to every client.  Defaults to the
+            scheduler's *max_workers*.
+        ffmpeg:
+            FFmpeg binary every job runs.  Defaults to ``ffmpeg`` on the
+            daemon's ``PATH``, resolved once.
+        """
+        self.scheduler = scheduler
+        self.slots = max(1, slots or scheduler.max_workers)
+        found = ffmpeg or shutil.which("ffmpeg")
+        self.ffmpeg = os.path.abspath(found) if found else "ffmpeg"
+        self._slots = asyncio.Semaphore(self.slots)
+
+    async def serve(self, address: str) -> asyncio.AbstractServer:
+        """Start listening on *address* and return the server."""
+        kind, where = parse_address(address)
+        if kind == "unix":
+            try:
+                if stat.S_ISSOCK(os.stat(where).st_mode):
+                    os.remove(where)  # left over by a previous daemon
+            except OSError:
+                pass
+            return await asyncio.start_unix_server(
+                self._handle, where, limit=STREAM_LINE_LIMIT)
+        host, port = where
+        return await asyncio.start_server(self._handle, host, port,
+                                          limit=STREAM_LINE_LIMIT)
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        """Serve one client until it disconnects."""
+        running: Dict[int, "asyncio.Task[None]"] = {}
+        _write(writer, {"type": "hello", "version": PROTOCOL_VERSION,
+                        "slots": self.slots,
+                        "name": f"{socket.gethostname()}:{os.getpid()}"})
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    job_id = int(message["id"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if message.get("type") == "job":
+                    task = asyncio.ensure_future(self._run(message, writer))
+                    running[job_id] = task
+                    task.add_done_callback(
+                        lambda _, job_id=job_id: running.pop(job_id, None))
+                elif message.get("type") == "cancel" and job_id in running:
+                    running[job_id].cancel()
+        except (OSError, ValueError):
+            pass  # connection lost, or an oversized line
+        finally:
+            # The client re-queues whatever was running here
+            for task in list(running.values()):
+                task.cancel()
+            writer.close()
+
+    async def _run(self, message: Dict[str, Any],
+                   writer: asyncio.StreamWriter) -> None:
+        """Run one job and report its progress and result."""
+        job_id = message["id"]
+        cmd = message.get("cmd")
+        if (not isinstance(cmd, list) or not cmd
+                or not all(isinstance(arg, str) for arg in cmd)
+                or os.path.basename(cmd[0]) not in ALLOWED_PROGRAMS):
+            _write(writer, {"type": "done", "id": job_id, "returncode": -1,
+                            "stderr": "Refused: not an FFmpeg command"})
+            return
+
+        def on_progress(state: ProgressState) -> None:
+            _write(writer, {"type": "progress", "id": job_id,
+                            "out_time": state.out_time,
+                            "speed": state.speed})
+
+        # Never the client's program path, only its arguments
+        cmd = [self.ffmpeg, *cmd[1:]]
+        async with self._slots:
+            try:
+                returncode, stderr = await self.scheduler.run_ffmpeg_async(
+                    cmd, on_progress, message.get("duration"))
+            except FileNotFoundError:
+                returncode, stderr = 127, "FFmpeg not found on the worker"
+            except (ConversionTimeout, ConversionCancelled) as exc:
+                returncode, stderr = -1, str(exc) or "Canceled on the worker"
+        _write(writer, {"type": "done", "id": job_id,
+                        "returncode": returncode, "stderr": stderr})
+
+
+# ------------------------------------------------------------------------- #
+# Client
+# ------------------------------------------------------------------------- #
+
+class _Job:
+    """One FFmpeg command waiting for, or running on, a worker."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, cmd: List[str], duration: Optional[float],
+                 on_progress: Optional[Callable[[ProgressState], None]]
+                 ) -> None:
+        self.id = next(self._ids)
+        self.cmd = cmd
+        self.duration = duration
+        self.on_progress = on_progress
+        self.attempts = 0
+        self.future: "asyncio.Future[Tuple[int, str]]" = (
+            asyncio.get_running_loop().create_future())
+
+
+class WorkerPool:
+    """Dispatch FFmpeg commands to a pool of :class:`WorkerServer` s."""
+
+    def __init__(self, addresses: Iterable[str],
+                 reconnect_interval: float = RECONNECT_INTERVAL,
+                 max_attempts: int = MAX_ATTEMPTS) -> None:
+        self.addresses = list(addresses)
+        self.reconnect_interval = reconnect_interval
+        self.max_attempts = max_attempts
+        #: ``(priority, sequence, job)``; re-queued jobs go first.
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        #: Connected worker address → its slot count.
+        self._slots: Dict[str, int] = {}
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._closed = False
+
+    @property
+    def total_slots(self) -> int:
+        """Jobs the connected workers can run at once."""
+        return sum(self._slots.values())
+
+    async def start(self) -> int:
+        """
+        Connect to every worker and return their total slot count.
+
+        Must be awaited on :func:`conversion_engine.engine_loop`.
+        Unreachable workers keep being retried in the background.
+
+        Raises
+        ------
+        ConnectionError
+            If no worker could be reached.
+        """
+        self._queue = asyncio.PriorityQueue()
+        connections = await asyncio.gather(
+            *(self._connect(address) for address in self.addresses),
+            return_exceptions=True)
+        slots = 0
+        for address, connection in zip(self.addresses, connections):
+            if isinstance(connection, BaseException):
+                connection = None
+            else:
+                slots += connection[2]
+            self._tasks.append(asyncio.ensure_future(
+                self._maintain(address, connection)))
+        if not slots:
+            await self.close()
+            raise ConnectionError("No conversion worker could be reached "
+                                  f"at {', '.join(self.addresses)}")
+        return slots
+
+    async def close(self) -> None:
+        """Disconnect from every worker."""
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def run_ffmpeg_async(
+        self,
+        scheduler: ConversionScheduler,
+        cmd: List[str],
+        on_progress: Optional[Callable[[ProgressState], None]] = None,
+        duration: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        """
+        Run *cmd* on the next free worker; return ``(returncode, stderr)``.
+
+        Counterpart of :meth:`ConversionScheduler.run_ffmpeg_async`;
+        *scheduler* is the batch's, whose :meth:`cancel` stops the job on
+        its worker.
+
+        Raises
+        ------
+        ConversionCancelled
+            If the batch was canceled before or while the job ran.
+        WorkerLost
+            If the job's workers disconnected :attr:`max_attempts` times.
+        """
+        if scheduler.cancelled:
+            raise ConversionCancelled()
+        assert self._queue is not None, "start() the pool first"
+        reported = 0.0
+
+        def progress(state: ProgressState) -> None:
+            nonlocal reported
+            scheduler.encoded_seconds += max(0.0, state.out_time - reported)
+            reported = max(reported, state.out_time)
+            if on_progress is not None:
+                on_progress(state)
+
+        job = _Job(cmd, duration, progress)
+        self._queue.put_nowait((1, next(self._sequence), job))
+        cancelled = asyncio.ensure_future(scheduler.until_cancelled())
+        try:
+            await asyncio.wait({job.future, cancelled},
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancelled.cancel()
+            if not job.future.done():
+                job.future.cancel()  # its worker is told to stop
+        if job.future.cancelled():
+            raise ConversionCancelled()
+        return job.future.result()
+
+    # --------------------------------------------------------------------- #
+    # Connections
+    # --------------------------------------------------------------------- #
+
+    @staticmethod
+    async def _connect(address: str) -> Tuple[asyncio.StreamReader,
+                                              asyncio.StreamWriter, int]:
+        """Open a connection and return it with the worker's slot count."""
+        kind, where = parse_address(address)
+        if kind == "unix":
+            opening = asyncio.open_unix_connection(where,
+                                                   limit=STREAM_LINE_LIMIT)
+        else:
+            opening = asyncio.open_connection(*where,
+                                              limit=STREAM_LINE_LIMIT)
+        reader, writer = await asyncio.wait_for(opening, CONNECT_TIMEOUT)
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(),
+                                                      CONNECT_TIMEOUT))
+            if (hello.get("type") != "hello"
+                    or hello.get("version") != PROTOCOL_VERSION):
+                raise ConnectionError(f"{address} is not a compatible "
+                                      "conversion worker")
+            return reader, writer, max(1, int(hello["slots"]))
+        except BaseException:
+            writer.close()
+            raise
+
+    async def _maintain(
+        self, address: str,
+        connection: Optional[Tuple[asyncio.StreamReader,
+                                   asyncio.StreamWriter, int]],
+    ) -> None:
+        """Serve *address* for as long as the pool is open, reconnecting."""
+        while not self._closed:
+            if connection is None:
+                try:
+                    connection = await self._connect(address)
+                except (OSError, ValueError, KeyError, TypeError,
+                        asyncio.TimeoutError):
+                    await asyncio.sleep(self.reconnect_interval)
+                    continue
+            await self._serve(address, *connection)
+            connection = None
+            if not self._closed:
+                await asyncio.sleep(self.reconnect_interval)
+
+    async def _serve(self, address: str, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter, slots: int) -> None:
+        """Feed one worker until its connection is lost."""
+        assert self._queue is not None
+        queue = self._queue
+        in_flight: Dict[int, _Job] = {}
+
+        async def feed_slot() -> None:
+            while True:
+                _, _, job = await queue.get()
+                if job.future.done():
+                    continue  # canceled while queued
+                job.attempts += 1
+                in_flight[job.id] = job
+                _write(writer, {"type": "job", "id": job.id,
+                                "cmd": job.cmd, "duration": job.duration})
+                await asyncio.wait({job.future})
+                if job.future.cancelled():
+                    in_flight.pop(job.id, None)
+                    _write(writer, {"type": "cancel", "id": job.id})
+
+        self._slots[address] = slots
+        feeders = [asyncio.ensure_future(feed_slot()) for _ in range(slots)]
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    job = in_flight.get(message["id"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if job is None or job.future.done():
+                    continue
+                if message.get("type") == "progress":
+                    job.on_progress(ProgressState(
+                        job.duration, float(message.get("out_time") or 0),
+                        message.get("speed")))
+                elif message.get("type") == "done":
+                    del in_flight[job.id]
+                    job.future.set_result((int(message["returncode"]),
+                                           str(message.get("stderr", ""))))
+        except (OSError, ValueError):
+            pass  # the worker went away
+        finally:
+            del self._slots[address]
+            for feeder in feeders:
+                feeder.cancel()
+            writer.close()
+            for job in in_flight.values():
+                self._requeue(job, address)
+
+    def _requeue(self, job: _Job, address: str) -> None:
+        """Give a job whose worker disconnected to the other workers."""
+        if job.future.done():
+            return
+        if job.attempts >= self.max_attempts:
+            job.future.set_exception(WorkerLost(
+                f"Worker {address} disconnected while converting "
+                f"({job.attempts} attempts)"))
+        else:
+            assert self._queue is not None
+            self._queue.put_nowait((0, next(self._sequence), job))
+
+
+# ------------------------------------------------------------------------- #
+# Daemon entry point
+# ------------------------------------------------------------------------- #
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a worker daemon until interrupted."""
+    parser = argparse.ArgumentParser(
+        description="Serve audio conversion jobs over a socket.")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS,
+                        metavar="ADDRESS",
+                        help="host:port or unix:/path "
+                             f"(default: {DEFAULT_ADDRESS})")
+    parser.add_argument("-j", "--slots", type=int,
+                        default=default_worker_count(),
+                        help="concurrent conversions (default: CPU count)")
+    parser.add_argument("--timeout", type=float,
+                        help="give up on a job after this many seconds")
+    parser.add_argument("--ffmpeg", metavar="PATH",
+                        help="FFmpeg binary to run (default: ffmpeg on the "
+                             "PATH)")
+    args = parser.parse_args(argv)
+    if args.slots < 1:
+        parser.error("--slots must be at least 1")
+    try:
+        parse_address(args.listen)
+    except ValueError:
+        parser.error(f"invalid address: {args.listen}")
+
+    scheduler = ConversionScheduler(max_workers=args.slots,
+                                    timeout=args.timeout)
+    server = WorkerServer(scheduler, args.slots, args.ffmpeg)
+
+    async def serve() -> None:
+        listening = await server.serve(args.listen)
+        print(f"Conversion worker listening on {args.listen} with "
+              f"{server.slots} slot(s)", file=sys.stderr)
+        async with listening:
+            await listening.serve_forever()
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    serving = engine_loop().submit(serve())
+    try:
+        serving.result()
+    except KeyboardInterrupt:
+        scheduler.cancel()
+        serving.cancel()
+        return 130
+    except OSError as exc:
+        print(f"Could not listen on {args.listen}: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+#
+# Segment-parallel encoding of long audio files
+
+"""Segment encoder
+
+Splits one long input into consecutive time segments, encodes the segments
+concurrently with the regular conversion strategies and joins the encoded
+pieces with FFmpeg's *concat* demuxer using stream copy, so the final
+output is never re‑encoded.
+
+Joins are sample‑exact for PCM.  Lossy codecs add their usual encoder
+delay and padding at every segment boundary, which is why the mode is
+opt‑in and only worthwhile for very long recordings.  FLAC is not
+segmented at all: a stream‑copied FLAC file keeps the STREAMINFO header of
+its first segment and would decode as that segment only.
+"""
+
+
+import asyncio
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from conversion_engine import ConversionScheduler
+from conversion_strategies import AudioConversionStrategy, compose_conversion
+from ffmpeg_progress import ProgressState
+
+#: Default length of one segment in seconds.
+DEFAULT_SEGMENT_SECONDS = 600.0
+
+#: Inputs shorter than this are converted in a single process.
+DEFAULT_MIN_DURATION = 1800.0
+
+#: Output extensions whose encoded segments can be joined by stream copy.
+SEGMENTABLE_FORMATS = frozenset({"mp3", "ogg", "wav", "aac", "m4a"})
+
+
+def can_segment(output_files: Iterable[str]) -> bool:
+    """Return ``True`` if every file of *output_files* may be segmented."""
+    return all(os.path.splitext(path)[1][1:].lower() in SEGMENTABLE_FORMATS
+               for path in output_files)
+
+
+def plan_segments(duration: float,
+                  segment_seconds: float) -> List[Tuple[float, float]]:
+    """Return ``(start, length)`` pairs covering *duration* seconds."""
+    segments = []
+    start = 0.0
+    while start < duration:
+        length = min(segment_seconds, duration - start)
+        segments.append((start, length))
+        start += segment_seconds
+    return segments
+
+
+def _segment_path(work_dir: str, target: int, segment: int,
+                  output_file: str) -> str:
+    """Return the scratch file of *segment* for target number *target*."""
+    extension = os.path.splitext(output_file)[1]
+    return os.path.join(work_dir, f"{target}_{segment:05d}{extension}")
+
+
+class SegmentEncoder:
+    """Encode a single long source as concurrently converted segments."""
+
+    def __init__(self, scheduler: ConversionScheduler,
+                 segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+                 max_parallel: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        scheduler:
+            Scheduler used to start (and cancel) every FFmpeg child.
+        segment_seconds:
+            Length of each segment in seconds.
+        max_parallel:
+            Most segments encoded at once.  Defaults to the worker count
+            of *scheduler*.  The calling job encodes one segment at a time
+            itself; every further one runs on a worker *scheduler* lends
+            (see :meth:`ConversionScheduler.borrow_workers`), so long
+            inputs of concurrent jobs share the batch's workers, and an
+            input is only segmented if at least one worker is lent.
+        """
+        self.scheduler = scheduler
+        self.segment_seconds = segment_seconds
+        self.max_parallel = max_parallel or scheduler.max_workers
+
+    async def encode_async(
+        self,
+        source_file: str,
+        targets: List[Tuple[AudioConversionStrategy, str]],
+        quality: str,
+        duration: float,
+        on_progress: Optional[Callable[[ProgressState], None]] = None,
+    ) -> bool:
+        """
+        Convert *source_file* into every ``(strategy, output)`` target.
+
+        Must be awaited on :func:`conversion_engine.engine_loop`;
+        *on_progress* is called there.
+
+        Returns ``False``, having written nothing, when the scheduler has
+        no worker to lend (e.g. every one runs a job of the batch): the
+        segments would then be encoded one after the other and splitting
+        and joining them would only add work.
+
+        Raises
+        ------
+        Exception
+            If encoding a segment or joining the segments fails.
+        """
+        segments = plan_segments(duration, self.segment_seconds)
+        # Absolute, because concat lists resolve paths relative to themselves
+        first_output = os.path.abspath(targets[0][1])
+        work_dir = tempfile.mkdtemp(prefix=".segments-",
+                                    dir=os.path.dirname(first_output))
+        try:
+            wanted = min(self.max_parallel, len(segments)) - 1
+            lent = self.scheduler.borrow_workers(wanted)
+            if not lent:
+                return False
+            try:
+                pieces = await self._encode_segments(
+                    source_file, targets, quality, segments, work_dir,
+                    duration, 1 + lent, on_progress)
+            finally:
+                self.scheduler.return_workers(lent)
+            for index, (_, output_file) in enumerate(targets):
+                await self._concatenate(pieces[index], output_file, work_dir,
+                                        index)
+        finally:
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: shutil.rmtree(work_dir, ignore_errors=True))
+        return True
+
+    async def _encode_segments(
+        self,
+        source_file: str,
+        targets: List[Tuple[AudioConversionStrategy, str]],
+        quality: str,
+        segments: List[Tuple[float, float]],
+        work_dir: str,
+        duration: float,
+        parallel: int,
+        on_progress: Optional[Callable[[ProgressState], None]],
+    ) -> Dict[int, List[str]]:
+        """
+        Encode every segment, *parallel* at a time; return the segment
+        files per target index.
+        """
+        states: Dict[int, ProgressState] = {}
+
+        def report(segment: int, state: ProgressState) -> None:
+            states[segment] = state
+            if on_progress is not None:
+                on_progress(ProgressState(
+                    duration=duration,
+                    out_time=sum(s.fraction * segments[i][1]
+                                 for i, s in states.items()),
+                    speed=sum(s.speed or 0.0 for s in states.values()
+                              if not s.finished),
+                ))
+
+        async def encode_segment(segment: int) -> None:
+            start, length = segments[segment]
+            segment_targets = [
+                (strategy, _segment_path(work_dir, index, segment, output))
+                for index, (strategy, output) in enumerate(targets)
+            ]
+            cmd = compose_conversion(
+                source_file, segment_targets, quality,
+                input_args=["-ss", f"{start:.6f}", "-t", f"{length:.6f}"],
+            )
+            async with slots:
+                returncode, stderr = await self.scheduler.run_ffmpeg_async(
+                    cmd,
+                    on_progress=lambda state: report(segment, state),
+                    duration=length,
+                )
+            if returncode:
+                raise Exception(f"FFmpeg error in segment {segment}: "
+                                f"{stderr}")
+
+        slots = asyncio.Semaphore(parallel)
+        tasks = [asyncio.ensure_future(encode_segment(segment))
+                 for segment in range(len(segments))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other segments before the work directory goes away
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return {
+            index: [_segment_path(work_dir, index, segment, output_file)
+                    for segment in range(len(segments))]
+            for index, (_, output_file) in enumerate(targets)
+        }
+
+    async def _concatenate(self, pieces: List[str], output_file: str,
+                           work_dir: str, index: int) -> None:
+        """Join *pieces* into *output_file* without re‑encoding."""
+        list_file = os.path.join(work_dir, f"{index}_concat.txt")
+        with open(list_file, "w", encoding="utf-8") as stream:
+            for piece in pieces:
+                escaped = piece.replace("'", "'\\''")
+                stream.write(f"file '{escaped}'\n")
+
+        returncode, stderr = await self.scheduler.run_command_async([
+            "ffmpeg", "-y", "-f", "concat", "-safe", "0",
+            "-i", list_file, "-c", "copy", output_file,
+        ])
+        if returncode:
+            raise Exception(f"FFmpeg concat error: {stderr}")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+#
+# Content-hash deduplication of conversion sources
+
+"""Source deduplication
+
+Libraries often hold byte‑identical copies of a recording under different
+names.  :func:`find_duplicates` groups them before a batch starts so each
+distinct content is encoded only once; the outputs of the first copy (the
+*primary*) are then hard‑linked, or copied where links are not possible,
+to the output names of the others.
+
+Only files sharing their size with another source are hashed at all, in
+large chunks on a bounded thread pool (:mod:`hashlib` releases the GIL
+while digesting, so the pool really reads and hashes in parallel).
+"""
+
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+#: Bytes read per call while hashing.
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+#: Files hashed at the same time.
+DEFAULT_HASH_WORKERS = 4
+
+
+def content_digest(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Return the BLAKE2b digest of the file at *path*."""
+    digest = hashlib.blake2b()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as stream:
+        while True:
+            count = stream.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+
+class DuplicateGroups:
+    """Sources grouped by content, in their original order."""
+
+    def __init__(self, primaries: List[str],
+                 duplicates: Dict[str, List[str]],
+                 sizes: Dict[str, int]) -> None:
+        #: One source per distinct content; these are the ones to encode.
+        self.primaries = primaries
+        self._duplicates = duplicates
+        self._sizes = sizes
+
+    def duplicates_of(self, primary: str) -> List[str]:
+        """Return the other sources with the same content as *primary*."""
+        return self._duplicates.get(primary, [])
+
+    @property
+    def duplicate_count(self) -> int:
+        """Number of sources that need no encoding of their own."""
+        return sum(len(group) for group in self._duplicates.values())
+
+    def size(self, source_file: str) -> int:
+        """Return the size of *source_file* when it was grouped."""
+        return self._sizes.get(source_file, 0)
+
+
+def find_duplicates(paths: Iterable[str],
+                    max_workers: int = DEFAULT_HASH_WORKERS,
+                    chunk_size: int = HASH_CHUNK_SIZE) -> DuplicateGroups:
+    """
+    Group *paths* by content.
+
+    Sources that cannot be read are kept as primaries of their own so the
+    conversion reports the error.
+    """
+    paths = list(paths)
+    sizes: Dict[str, int] = {}
+    by_size: Dict[int, List[str]] = {}
+    for path in paths:
+        try:
+            sizes[path] = os.path.getsize(path)
+        except OSError:
+            continue
+        by_size.setdefault(sizes[path], []).append(path)
+
+    candidates = [path for size, group in by_size.items()
+                  if size and len(group) > 1 for path in group]
+    digests: Dict[str, Optional[str]] = {}
+    if candidates:
+        def digest_or_none(path: str) -> Optional[str]:
+            try:
+                return content_digest(path, chunk_size)
+            except OSError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                thread_name_prefix="hash") as pool:
+            digests = dict(zip(candidates,
+                               pool.map(digest_or_none, candidates)))
+
+    primaries: List[str] = []
+    duplicates: Dict[str, List[str]] = {}
+    first_of: Dict[Tuple[int, str], str] = {}
+    for path in paths:
+        digest = digests.get(path)
+        if digest is None:
+            primaries.append(path)
+            continue
+        key = (sizes[path], digest)
+        primary = first_of.setdefault(key, path)
+        if primary == path:
+            primaries.append(path)
+        else:
+            duplicates.setdefault(primary, []).append(path)
+    return DuplicateGroups(primaries, duplicates, sizes)
+
+
+def link_or_copy(source: str, destination: str) -> bool:
+    """
+    Make *destination* a copy of *source*, replacing it atomically.
+
+    Returns ``True`` for a hard link, ``False`` when the file had to be
+    copied (different filesystem, or no hard‑link support).
+    """
+    directory, name = os.path.split(os.path.abspath(destination))
+    fd, partial = tempfile.mkstemp(prefix=f".{name}.", suffix=".part",
+                                   dir=directory)
+    os.close(fd)
+    os.remove(partial)  # os.link needs a free name
+    try:
+        try:
+            os.link(source, partial)
+            linked = True
+        except OSError:
+            shutil.copy2(source, partial)
+            linked = False
+        os.replace(partial, destination)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    return linked
+
+
+class DedupSavings:
+    """Work avoided by reusing outputs, added up across a batch."""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.linked = 0
+        #: Source bytes that did not have to be decoded and encoded.
+        self.bytes = 0
+        #: Encoding time of the primaries, counted once per duplicate.
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, source_bytes: int, seconds: float, linked: bool) -> None:
+        """Count one duplicate whose outputs were reused."""
+        with self._lock:
+            self.files += 1
+            self.linked += linked
+            self.bytes += source_bytes
+            self.seconds += seconds
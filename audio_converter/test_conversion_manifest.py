@@ -0,0 +1,92 @@
+"""Tests for :mod:`conversion_manifest`."""
+
+
+import os
+
+from conversion_manifest import MANIFEST_NAME, ConversionManifest
+
+
+def convert(tmp_path, name="song"):
+    """Create a source and its "converted" output; return both paths."""
+    source = tmp_path / f"{name}.wav"
+    source.write_bytes(b"RIFF source")
+    output_directory = tmp_path / "out"
+    output_directory.mkdir(exist_ok=True)
+    output = output_directory / f"{name}.mp3"
+    output.write_bytes(b"ID3 output")
+    return str(source), str(output)
+
+
+def touch(path, offset_ns=1_000_000_000):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+
+def test_round_trip(tmp_path):
+    source, output = convert(tmp_path)
+    manifest = ConversionManifest(str(tmp_path / "out"))
+    manifest.record(source, output, "mp3", "High")
+    manifest.save()
+    assert os.path.exists(tmp_path / "out" / MANIFEST_NAME)
+
+    loaded = ConversionManifest.load(str(tmp_path / "out"))
+    assert loaded.is_up_to_date(source, output, "mp3", "High")
+    assert not loaded.is_up_to_date(source, output, "mp3", "Low")
+    assert not loaded.is_up_to_date(source, output, "ogg", "High")
+
+
+def test_missing_or_corrupt_manifest_is_empty(tmp_path):
+    source, output = convert(tmp_path)
+    assert not ConversionManifest.load(str(tmp_path / "out")).is_up_to_date(
+        source, output, "mp3", "High")
+    for corrupt in ("{not json", "[]"):
+        (tmp_path / "out" / MANIFEST_NAME).write_text(corrupt)
+        assert not ConversionManifest.load(
+            str(tmp_path / "out")).is_up_to_date(source, output, "mp3",
+                                                 "High")
+
+
+def test_changed_files_are_out_of_date(tmp_path):
+    source, output = convert(tmp_path)
+    manifest = ConversionManifest(str(tmp_path / "out"))
+    manifest.record(source, output, "mp3", "High")
+    touch(output)
+    assert not manifest.is_up_to_date(source, output, "mp3", "High")
+
+    manifest.record(source, output, "mp3", "High")
+    with open(source, "ab") as stream:
+        stream.write(b" more")
+    assert not manifest.is_up_to_date(source, output, "mp3", "High")
+
+    manifest.record(source, output, "mp3", "High")
+    os.remove(output)
+    assert not manifest.is_up_to_date(source, output, "mp3", "High")
+
+
+def test_touched_source_needs_the_hash(tmp_path):
+    source, output = convert(tmp_path)
+    plain = ConversionManifest(str(tmp_path / "out"))
+    hashed = ConversionManifest(str(tmp_path / "out"), use_hash=True)
+    plain.record(source, output, "mp3", "High")
+    hashed.record(source, output, "mp3", "High")
+    touch(source)
+    assert not plain.is_up_to_date(source, output, "mp3", "High")
+    assert hashed.is_up_to_date(source, output, "mp3", "High")
+    # The new modification time was remembered
+    hashed.save()
+    reloaded = ConversionManifest.load(str(tmp_path / "out"))
+    assert reloaded.is_up_to_date(source, output, "mp3", "High")
+
+
+def test_forget(tmp_path):
+    source, output = convert(tmp_path)
+    manifest = ConversionManifest(str(tmp_path / "out"))
+    manifest.record(source, output, "mp3", "High")
+    assert manifest.forget(output)["strategy"] == "mp3"
+    assert manifest.forget(output) is None
+    assert not manifest.is_up_to_date(source, output, "mp3", "High")
+
+
+def test_save_only_writes_changes(tmp_path):
+    ConversionManifest(str(tmp_path)).save()
+    assert not os.path.exists(tmp_path / MANIFEST_NAME)
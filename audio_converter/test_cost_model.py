@@ -0,0 +1,111 @@
+"""Tests for :mod:`cost_model`."""
+
+
+import pytest
+
+from conversion_strategies import (Mp3ConversionStrategy,
+                                   WavConversionStrategy)
+from cost_model import (DEFAULT_OVERHEADS, DEFAULT_SPEEDS, FFMPEG,
+                        IN_PROCESS, BatchEstimate, BatchForecast, CostModel,
+                        FileEstimate)
+from media_probe import MediaInfo
+
+MP3 = Mp3ConversionStrategy()
+FLAC_INFO = MediaInfo(duration=60.0, codec="flac", bitrate=900_000)
+
+
+def estimate(model, info=FLAC_INFO, source="song.flac"):
+    return model.estimate_file(source, info, [MP3], "High")
+
+
+def test_plan_picks_in_process_ffmpeg_or_remux():
+    wav = MediaInfo(duration=1.0, codec="pcm_s24le", sample_rate=44100,
+                    channels=2)
+    assert CostModel.plan("a.wav", wav, [WavConversionStrategy()],
+                          "High") == (IN_PROCESS, [
+                              ("in-process:WavConversionStrategy",
+                               44100 * 2 * 16)])
+    assert CostModel.plan("a.flac", FLAC_INFO, [MP3], "High") == (
+        FFMPEG, [("Mp3ConversionStrategy:High", 320_000)])
+    mp3 = MediaInfo(duration=1.0, codec="mp3", bitrate=128_000)
+    assert CostModel.plan("a.mp3", mp3, [MP3], "High") == (
+        FFMPEG, [("StreamCopyStrategy", 128_000)])
+    assert CostModel.plan("a.mp3", mp3, [MP3], "High",
+                          normalize=True)[1] == [
+        ("Mp3ConversionStrategy:High", 320_000), ("loudnorm", None)]
+
+
+def test_default_estimate():
+    result = estimate(CostModel())
+    speed = DEFAULT_SPEEDS["Mp3ConversionStrategy"]
+    assert result.known
+    assert result.seconds == pytest.approx(DEFAULT_OVERHEADS[FFMPEG]
+                                           + 60.0 / speed)
+    assert result.size == pytest.approx(320_000 * 60.0 / 8)
+    assert not estimate(CostModel(), info=None).known
+
+
+def test_observations_calibrate_time_and_size(tmp_path):
+    model = CostModel(str(tmp_path / "cost.json"))
+    kind, steps = CostModel.plan("song.flac", FLAC_INFO, [MP3], "High")
+    measured, written = 5.0, 3_000_000
+    for _ in range(40):
+        model.observe(kind, steps, 60.0, measured, [written])
+    result = estimate(model)
+    assert result.seconds == pytest.approx(measured, rel=1e-3)
+    assert result.size == pytest.approx(written, rel=1e-3)
+
+    model.save()
+    loaded = estimate(CostModel.load(str(tmp_path / "cost.json")))
+    assert loaded.seconds == pytest.approx(result.seconds)
+    assert loaded.size == pytest.approx(result.size)
+
+
+def test_outliers_are_clamped_and_bad_observations_ignored():
+    model = CostModel()
+    before = estimate(model).seconds
+    kind, steps = CostModel.plan("song.flac", FLAC_INFO, [MP3], "High")
+    model.observe(kind, steps, 60.0, before * 1e6)
+    assert estimate(model).seconds == pytest.approx(before * 10 ** 0.3)
+    model.observe(kind, steps, 0.0, 1.0)
+    model.observe(kind, steps, 60.0, 0.0)
+    assert estimate(model).seconds == pytest.approx(before * 10 ** 0.3)
+
+
+def test_missing_or_corrupt_calibration_gives_defaults(tmp_path):
+    path = tmp_path / "cost.json"
+    assert estimate(CostModel.load(str(path))).seconds == pytest.approx(
+        estimate(CostModel()).seconds)
+    path.write_text("[]")
+    assert estimate(CostModel.load(str(path))).seconds == pytest.approx(
+        estimate(CostModel()).seconds)
+
+
+def test_batch_estimate_counts_unknown_files_at_the_mean():
+    files = [FileEstimate("a", 60.0, 4.0, 100.0),
+             FileEstimate("b", 30.0, 2.0, 50.0),
+             FileEstimate("c", None, 0.0, 0.0)]
+    batch = BatchEstimate(files, workers=2)
+    assert batch.unknown == 1
+    assert batch.work_seconds == pytest.approx(9.0)
+    assert batch.size == pytest.approx(225.0)
+    assert batch.seconds == pytest.approx(4.5)
+    # A single long file bounds the wall-clock time
+    assert BatchEstimate(files[:1], workers=8).seconds == 4.0
+
+
+def test_forecast_before_and_after_completions():
+    files = [FileEstimate("a", 60.0, 4.0, 0.0),
+             FileEstimate("b", 60.0, 4.0, 0.0)]
+    forecast = BatchForecast(BatchEstimate(files, workers=2))
+    assert forecast.remaining() == pytest.approx(4.0)
+
+    forecast.add(FileEstimate("c", 30.0, 2.0, 0.0))
+    assert forecast.remaining() == pytest.approx(5.0)
+    forecast.complete("a")
+    # Finished sources no longer count, and late estimates are ignored
+    forecast.add(FileEstimate("a", 60.0, 100.0, 0.0))
+    assert 0.0 < forecast.remaining()
+    forecast.complete("b")
+    forecast.complete("c")
+    assert forecast.remaining() == 0.0
@@ -0,0 +1,79 @@
+"""Tests for :mod:`ffmpeg_progress`."""
+
+
+import pytest
+
+from ffmpeg_progress import (STDERR_TAIL_LINES, BatchProgress,
+                             FFmpegProgressParser, ProgressState,
+                             parse_speed, with_progress_output)
+
+
+def test_with_progress_output_keeps_the_program_first():
+    assert with_progress_output(["ffmpeg", "-i", "in.wav", "out.mp3"]) == [
+        "ffmpeg", "-nostats", "-progress", "pipe:1", "-i", "in.wav",
+        "out.mp3"]
+
+
+def test_parse_speed():
+    assert parse_speed("35.2x") == pytest.approx(35.2)
+    assert parse_speed(" 1x\n") == 1.0
+    assert parse_speed("N/A") is None
+
+
+def test_state_is_reported_once_per_block():
+    parser = FFmpegProgressParser(duration=10.0)
+    assert parser.feed_progress_line("out_time_us=2500000\n") is None
+    assert parser.feed_progress_line("speed=20x\n") is None
+    state = parser.feed_progress_line("progress=continue\n")
+    assert state is not None
+    assert state.out_time == 2.5
+    assert state.speed == 20.0
+    assert state.fraction == 0.25
+    assert not state.finished
+
+    parser.feed_progress_line("out_time_us=N/A")
+    parser.feed_progress_line("garbage")
+    state = parser.feed_progress_line("progress=end")
+    assert state.out_time == 2.5
+    assert state.finished and state.fraction == 1.0
+
+
+def test_duration_is_read_from_stderr():
+    parser = FFmpegProgressParser()
+    parser.feed_stderr_line("  Duration: 01:02:03.50, start: 0.000000\n")
+    parser.feed_stderr_line("  Duration: 00:00:01.00, start: 0.000000\n")
+    assert parser.state.duration == pytest.approx(3723.5)
+
+
+def test_stderr_keeps_only_the_tail():
+    parser = FFmpegProgressParser(duration=1.0)
+    for index in range(STDERR_TAIL_LINES + 5):
+        parser.feed_stderr_line(f"line {index}\n")
+    lines = parser.stderr.split("\n")
+    assert len(lines) == STDERR_TAIL_LINES
+    assert lines[0] == "line 5"
+    assert lines[-1] == f"line {STDERR_TAIL_LINES + 4}"
+
+
+def test_fraction_is_clamped_and_zero_without_duration():
+    assert ProgressState(out_time=5.0).fraction == 0.0
+    assert ProgressState(duration=4.0, out_time=5.0).fraction == 1.0
+    assert ProgressState(duration=4.0, out_time=-1.0).fraction == 0.0
+
+
+def test_batch_progress_aggregates_jobs():
+    batch = BatchProgress(total_jobs=4)
+    batch.update("a", ProgressState(duration=10.0, out_time=5.0, speed=30.0))
+    batch.update("b", ProgressState(duration=10.0, out_time=10.0,
+                                    speed=10.0))
+    assert batch.fraction == pytest.approx(1.5 / 4)
+    assert batch.speed == 40.0
+
+    batch.update("b", ProgressState(speed=10.0, finished=True))
+    batch.complete("c")
+    assert batch.fraction == pytest.approx(2.5 / 4)
+    assert batch.speed == 30.0
+
+
+def test_empty_batch_does_not_divide_by_zero():
+    assert BatchProgress(total_jobs=0).fraction == 0.0
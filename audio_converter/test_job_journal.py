@@ -0,0 +1,95 @@
+"""Tests for :mod:`job_journal`."""
+
+
+import pytest
+
+from job_journal import (FAILED, PENDING, RETRY_BASE_DELAY,
+                         RETRY_MAX_DELAY, RUNNING, JobJournal, retry_delay)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.sqlite3"), max_attempts=3)
+    yield journal
+    journal.close()
+
+
+def test_retry_delay_doubles_up_to_the_maximum():
+    assert retry_delay(1) == RETRY_BASE_DELAY
+    assert retry_delay(2) == 2 * RETRY_BASE_DELAY
+    assert retry_delay(100) == RETRY_MAX_DELAY
+
+
+def test_batch_round_trip(tmp_path, journal):
+    settings = {"formats": ["mp3"], "quality": "High"}
+    batch_id, ids = journal.create_batch(settings, ["a.wav", "b.wav"])
+    added = journal.add_jobs(batch_id, ["c.wav", "d.wav"])
+    assert sorted(added) == ["c.wav", "d.wav"]
+    journal.remove_jobs([added["d.wav"]])
+    journal.mark_running(ids["a.wav"])
+    journal.mark_done(ids["a.wav"])
+    journal.close()
+
+    reopened = JobJournal(str(tmp_path / "jobs.sqlite3"), max_attempts=3)
+    try:
+        assert reopened.unfinished_batch() == (batch_id, settings, 2)
+        jobs = reopened.resumable_jobs(batch_id)
+        assert [job.source for job in jobs] == ["b.wav", "c.wav"]
+        assert [job.status for job in jobs] == [PENDING, PENDING]
+    finally:
+        reopened.close()
+
+
+def test_failed_jobs_are_retried_until_out_of_attempts(journal):
+    batch_id, ids = journal.create_batch({}, ["a.wav"])
+    job_id = ids["a.wav"]
+    for attempt in (1, 2):
+        assert journal.mark_running(job_id) == attempt
+        assert journal.mark_failed(job_id, attempt, "boom") == retry_delay(
+            attempt)
+        (job,) = journal.resumable_jobs(batch_id)
+        assert (job.status, job.error) == (FAILED, "boom")
+    assert journal.mark_running(job_id) == 3
+    assert journal.mark_failed(job_id, 3, "boom") == -1
+    assert journal.resumable_jobs(batch_id) == []
+    assert journal.unfinished_batch() is None
+
+
+def test_non_transient_failure_is_given_up_at_once(journal):
+    batch_id, ids = journal.create_batch({}, ["a.wav"])
+    attempts = journal.mark_running(ids["a.wav"])
+    assert journal.mark_failed(ids["a.wav"], attempts, "unsupported",
+                               retry=False) == -1
+    assert journal.resumable_jobs(batch_id) == []
+
+
+def test_interrupted_job_gets_its_attempt_back(journal):
+    batch_id, ids = journal.create_batch({}, ["a.wav"])
+    journal.mark_running(ids["a.wav"])
+    (job,) = journal.resumable_jobs(batch_id)
+    assert (job.status, job.attempts) == (RUNNING, 1)
+    journal.mark_pending(ids["a.wav"])
+    (job,) = journal.resumable_jobs(batch_id)
+    assert (job.status, job.attempts) == (PENDING, 0)
+    # Only running jobs are put back
+    journal.mark_done(ids["a.wav"])
+    journal.mark_pending(ids["a.wav"])
+    assert journal.resumable_jobs(batch_id) == []
+
+
+def test_new_batch_supersedes_the_unfinished_one(journal):
+    old_batch, _ = journal.create_batch({}, ["a.wav"])
+    new_batch, _ = journal.create_batch({}, ["b.wav"])
+    assert journal.resumable_jobs(old_batch) == []
+    assert journal.unfinished_batch()[0] == new_batch
+    journal.discard_batch(new_batch)
+    assert journal.unfinished_batch() is None
+
+
+def test_done_jobs_are_not_resumed(journal):
+    batch_id, ids = journal.create_batch({}, ["a.wav", "b.wav"])
+    for job_id in ids.values():
+        journal.mark_running(job_id)
+        journal.mark_done(job_id)
+    assert journal.resumable_jobs(batch_id) == []
+    assert journal.unfinished_batch() is None
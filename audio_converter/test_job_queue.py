@@ -0,0 +1,70 @@
+"""Tests for :mod:`job_queue`."""
+
+
+from job_queue import HIGH, LOW, JobQueue, estimated_duration
+from media_probe import MediaInfo
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_longest_job_first_then_submission_order():
+    costs = {"a": 10.0, "b": 300.0, "c": 10.0, "d": 60.0}
+    queue = JobQueue(costs.__getitem__)
+    queue.add(costs)
+    assert list(queue) == ["b", "d", "a", "c"]
+
+
+def test_priority_beats_length():
+    costs = {"long": 3600.0, "short": 1.0, "tiny": 0.5}
+    queue = JobQueue(costs.__getitem__)
+    queue.add(["long"], LOW)
+    queue.add(["short", "tiny"], lambda job: HIGH if job == "tiny" else 0)
+    assert list(queue) == ["tiny", "short", "long"]
+
+
+def test_waiting_makes_up_for_one_priority_level():
+    clock = FakeClock()
+    queue = JobQueue(lambda job: 1.0, aging_period=60.0, clock=clock)
+    queue.add(["early"])
+    clock.now = 59.0
+    queue.add(["urgent-soon"], HIGH)
+    clock.now = 60.0
+    queue.add(["urgent-late"], HIGH)
+    # Same rank as "early" after one period, so submission order decides
+    assert list(queue) == ["urgent-soon", "early", "urgent-late"]
+
+
+def test_set_priority_reorders_queued_jobs():
+    queue = JobQueue(lambda job: 1.0)
+    queue.add(["a", "b", "c"])
+    assert queue.set_priority("c", HIGH)
+    assert not queue.set_priority("missing", HIGH)
+    assert len(queue) == 3
+    assert list(queue) == ["c", "a", "b"]
+
+
+def test_duplicates_are_ignored_and_a_dry_queue_refuses_jobs():
+    queue = JobQueue(lambda job: 1.0)
+    assert queue.add(["a", "a"])
+    assert queue.add(["a"])
+    assert len(queue) == 1
+    assert queue.pop() == "a"
+    assert queue.pop() is None
+    assert not queue.add(["b"])
+    assert len(queue) == 0
+
+
+def test_estimated_duration_falls_back_to_size(tmp_path):
+    source = tmp_path / "song.mp3"
+    source.write_bytes(b"\0" * 32000)
+    assert estimated_duration(str(source), MediaInfo(duration=7.5)) == 7.5
+    assert estimated_duration(str(source), None) == 2.0
+    assert estimated_duration(str(tmp_path / "missing.mp3"), None) == 0.0
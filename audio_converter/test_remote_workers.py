@@ -0,0 +1,155 @@
+"""Tests for :mod:`remote_workers` with daemons on localhost."""
+
+
+import asyncio
+import os
+import shutil
+import stat
+from typing import Any, List, Optional, Tuple
+
+import pytest
+
+from conversion_engine import ConversionScheduler, engine_loop
+from remote_workers import WorkerPool, WorkerServer, parse_address
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None,
+                                reason="FFmpeg is not installed")
+
+
+def tone_command(output: str, program: str = "ffmpeg") -> List[str]:
+    """Return an FFmpeg command writing a short tone to *output*."""
+    return [program, "-v", "error", "-y", "-f", "lavfi", "-i",
+            "sine=frequency=440:duration=0.5", output]
+
+
+class DroppingServer(WorkerServer):
+    """Daemon that disconnects, for good, as soon as it gets a job."""
+
+    listening: Optional[asyncio.AbstractServer] = None
+    received = 0
+
+    async def _run(self, message: Any, writer: asyncio.StreamWriter) -> None:
+        self.received += 1
+        if self.listening is not None:
+            self.listening.close()
+        writer.transport.abort()
+
+
+class CountingPool(WorkerPool):
+    """Pool counting the jobs put back after a disconnect."""
+
+    requeued = 0
+
+    def _requeue(self, job: Any, address: str) -> None:
+        if not job.future.done():
+            self.requeued += 1
+        super()._requeue(job, address)
+
+
+async def start_daemons(*servers: WorkerServer
+                        ) -> Tuple[List[str], List[asyncio.AbstractServer]]:
+    """Listen on ephemeral localhost ports; return addresses and servers."""
+    addresses, listening = [], []
+    for server in servers:
+        serving = await server.serve("127.0.0.1:0")
+        port = serving.sockets[0].getsockname()[1]
+        addresses.append(f"127.0.0.1:{port}")
+        listening.append(serving)
+    return addresses, listening
+
+
+def run(coroutine: Any) -> Any:
+    return engine_loop().submit(coroutine).result(timeout=60)
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/w.sock") == ("unix", "/tmp/w.sock")
+    assert parse_address("example:9000") == ("tcp", ("example", 9000))
+    assert parse_address("example") == ("tcp", ("example", 7878))
+    assert parse_address(":9000") == ("tcp", ("127.0.0.1", 9000))
+    with pytest.raises(ValueError):
+        parse_address("example:port")
+
+
+def test_jobs_run_on_two_daemons(tmp_path):
+    outputs = [str(tmp_path / f"out_{index}.wav") for index in range(6)]
+
+    async def scenario() -> List[Tuple[int, str]]:
+        servers = [WorkerServer(ConversionScheduler(max_workers=2))
+                   for _ in range(2)]
+        addresses, listening = await start_daemons(*servers)
+        pool = WorkerPool(addresses)
+        try:
+            assert await pool.start() == 4
+            scheduler = ConversionScheduler()
+            return await asyncio.gather(
+                *(pool.run_ffmpeg_async(scheduler, tone_command(output))
+                  for output in outputs))
+        finally:
+            await pool.close()
+            for serving in listening:
+                serving.close()
+
+    results = run(scenario())
+    assert [returncode for returncode, _ in results] == [0] * len(outputs)
+    assert all(os.path.getsize(output) for output in outputs)
+
+
+def test_jobs_of_a_lost_daemon_are_requeued(tmp_path):
+    outputs = [str(tmp_path / f"out_{index}.wav") for index in range(4)]
+    dropping = DroppingServer(ConversionScheduler(max_workers=2))
+
+    async def scenario() -> Tuple[List[Tuple[int, str]], int]:
+        steady = WorkerServer(ConversionScheduler(max_workers=2))
+        addresses, listening = await start_daemons(dropping, steady)
+        dropping.listening = listening[0]
+        pool = CountingPool(addresses, reconnect_interval=0.1)
+        try:
+            await pool.start()
+            scheduler = ConversionScheduler()
+            results = await asyncio.gather(
+                *(pool.run_ffmpeg_async(scheduler, tone_command(output))
+                  for output in outputs))
+            return results, pool.requeued
+        finally:
+            await pool.close()
+            for serving in listening:
+                serving.close()
+
+    results, requeued = run(scenario())
+    assert dropping.received >= 1
+    assert requeued == dropping.received
+    assert [returncode for returncode, _ in results] == [0] * len(outputs)
+    assert all(os.path.getsize(output) for output in outputs)
+
+
+def test_only_the_daemons_own_ffmpeg_runs(tmp_path):
+    marker = tmp_path / "ran"
+    impostor = tmp_path / "bin" / "ffmpeg"
+    impostor.parent.mkdir()
+    impostor.write_text(f"#!/bin/sh\ntouch {marker}\n")
+    impostor.chmod(impostor.stat().st_mode | stat.S_IEXEC)
+    output = str(tmp_path / "out.wav")
+
+    async def scenario() -> Tuple[Tuple[int, str], Tuple[int, str]]:
+        server = WorkerServer(ConversionScheduler(max_workers=1))
+        addresses, listening = await start_daemons(server)
+        pool = WorkerPool(addresses)
+        try:
+            await pool.start()
+            scheduler = ConversionScheduler()
+            refused = await pool.run_ffmpeg_async(
+                scheduler, ["sh", "-c", f"touch {marker}"])
+            renamed = await pool.run_ffmpeg_async(
+                scheduler, tone_command(output, str(impostor)))
+            return refused, renamed
+        finally:
+            await pool.close()
+            listening[0].close()
+
+    refused, renamed = run(scenario())
+    assert refused[0] == -1 and "Refused" in refused[1]
+    # Named ffmpeg, but only its arguments were used
+    assert renamed[0] == 0
+    assert os.path.getsize(output)
+    assert not marker.exists()
@@ -0,0 +1,80 @@
+"""Tests for :mod:`segment_encoder`."""
+
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from conversion_engine import ConversionScheduler, engine_loop
+from conversion_strategies import default_strategies
+from segment_encoder import SegmentEncoder, can_segment, plan_segments
+from wav_fast_path import wav_duration
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None,
+                                  reason="FFmpeg is not installed")
+
+
+def generate_tone(path: str, duration: float) -> str:
+    """Write *duration* seconds of a 16‑bit stereo tone to *path*."""
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i",
+         f"sine=frequency=440:sample_rate=44100:duration={duration}",
+         "-ac", "2", "-c:a", "pcm_s16le", path],
+        check=True)
+    return path
+
+
+def test_plan_segments_covers_the_duration():
+    segments = plan_segments(95.0, 30.0)
+    assert segments == [(0.0, 30.0), (30.0, 30.0), (60.0, 30.0),
+                        (90.0, 5.0)]
+    assert sum(length for _, length in segments) == pytest.approx(95.0)
+
+
+def test_plan_segments_short_input_is_one_segment():
+    assert plan_segments(10.0, 600.0) == [(0.0, 10.0)]
+    assert plan_segments(0.0, 600.0) == []
+
+
+def test_can_segment_rejects_flac():
+    assert can_segment(["a.mp3", "b.WAV", "c.m4a"])
+    assert not can_segment(["a.mp3", "b.flac"])
+
+
+@needs_ffmpeg
+def test_segments_join_to_the_source_duration(tmp_path):
+    source = generate_tone(str(tmp_path / "source.wav"), 95.0)
+    output = str(tmp_path / "out" / "joined.wav")
+    os.makedirs(os.path.dirname(output))
+    scheduler = ConversionScheduler(max_workers=4)
+    encoder = SegmentEncoder(scheduler, segment_seconds=30.0)
+
+    segmented = engine_loop().submit(encoder.encode_async(
+        source, [(default_strategies()["wav"], output)], "High",
+        95.0)).result()
+
+    assert segmented
+    # PCM joins are sample exact
+    assert wav_duration(output) == pytest.approx(wav_duration(source),
+                                                 abs=1e-6)
+    # The scratch directory is gone and every lent worker is back
+    assert os.listdir(os.path.dirname(output)) == ["joined.wav"]
+    assert scheduler.borrow_workers(4) == 4
+
+
+@needs_ffmpeg
+def test_no_lendable_worker_falls_back(tmp_path):
+    source = generate_tone(str(tmp_path / "source.wav"), 5.0)
+    output = str(tmp_path / "out.wav")
+    scheduler = ConversionScheduler(max_workers=1)
+    encoder = SegmentEncoder(scheduler, segment_seconds=1.0)
+
+    segmented = engine_loop().submit(encoder.encode_async(
+        source, [(default_strategies()["wav"], output)], "High",
+        5.0)).result()
+
+    assert not segmented
+    assert not os.path.exists(output)
+    assert sorted(os.listdir(tmp_path)) == ["source.wav"]
@@ -0,0 +1,64 @@
+"""Tests for :mod:`source_dedup`."""
+
+
+import os
+
+from source_dedup import (DedupSavings, content_digest, find_duplicates,
+                          link_or_copy)
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_content_digest_reads_in_chunks(tmp_path):
+    data = bytes(range(256)) * 100
+    path = write(tmp_path / "a.wav", data)
+    assert content_digest(path, chunk_size=7) == content_digest(path)
+    assert content_digest(path) != content_digest(
+        write(tmp_path / "b.wav", data[:-1] + b"x"))
+
+
+def test_find_duplicates_groups_by_content(tmp_path):
+    a = write(tmp_path / "a.wav", b"song one")
+    b = write(tmp_path / "b.wav", b"song two")  # same size, other content
+    c = write(tmp_path / "c.wav", b"song one")
+    d = write(tmp_path / "d.wav", b"another song")
+    e = write(tmp_path / "e.wav", b"song one")
+    missing = str(tmp_path / "missing.wav")
+
+    groups = find_duplicates([a, b, missing, c, d, e], max_workers=2)
+
+    assert groups.primaries == [a, b, missing, d]
+    assert groups.duplicates_of(a) == [c, e]
+    assert groups.duplicates_of(b) == []
+    assert groups.duplicate_count == 2
+    assert groups.size(c) == 8
+    assert groups.size(missing) == 0
+
+
+def test_empty_files_are_not_grouped(tmp_path):
+    a = write(tmp_path / "a.wav", b"")
+    b = write(tmp_path / "b.wav", b"")
+    assert find_duplicates([a, b]).primaries == [a, b]
+
+
+def test_link_or_copy_replaces_the_destination(tmp_path):
+    source = write(tmp_path / "a.mp3", b"encoded")
+    destination = write(tmp_path / "b.mp3", b"stale")
+    linked = link_or_copy(source, destination)
+    with open(destination, "rb") as stream:
+        assert stream.read() == b"encoded"
+    if linked:
+        assert os.path.samefile(source, destination)
+    # No partial file is left behind
+    assert sorted(os.listdir(tmp_path)) == ["a.mp3", "b.mp3"]
+
+
+def test_dedup_savings_add_up():
+    savings = DedupSavings()
+    savings.add(1000, 2.5, linked=True)
+    savings.add(500, 1.0, linked=False)
+    assert (savings.files, savings.linked, savings.bytes) == (2, 1, 1500)
+    assert savings.seconds == 3.5
@@ -0,0 +1,86 @@
+"""Tests for :mod:`wav_fast_path`."""
+
+
+import wave
+
+import pytest
+
+import wav_fast_path
+from wav_fast_path import (PcmFormat, UnsupportedWav, convert_wav, read_wav,
+                           wav_duration)
+
+pytestmark = pytest.mark.skipif(not wav_fast_path.available(),
+                                reason="NumPy is not installed")
+
+
+def write_wav(path, sample_width, frames, sample_rate=8000, channels=2):
+    with wave.open(str(path), "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(sample_width)
+        writer.setframerate(sample_rate)
+        writer.writeframes(frames)
+    return str(path)
+
+
+def int16_frames(*samples):
+    return b"".join(sample.to_bytes(2, "little", signed=True)
+                    for sample in samples)
+
+
+def test_widening_and_narrowing_round_trip(tmp_path):
+    samples = (0, 1, -1, 32767, -32768, 1234)
+    source = write_wav(tmp_path / "in.wav", 2, int16_frames(*samples))
+    wide = str(tmp_path / "wide.wav")
+    narrow = str(tmp_path / "narrow.wav")
+
+    assert convert_wav(source, wide, sample_width=3) == PcmFormat(8000, 2, 2)
+    pcm, frames = read_wav(wide)
+    assert pcm == PcmFormat(8000, 2, 3)
+    assert frames[:6] == b"\0\0\0\0\x01\0"
+
+    convert_wav(wide, narrow)
+    assert read_wav(narrow) == (PcmFormat(8000, 2, 2),
+                                int16_frames(*samples))
+
+
+def test_unsigned_8_bit_is_centred(tmp_path):
+    source = write_wav(tmp_path / "in.wav", 1, bytes([128, 255, 0, 129]),
+                       channels=1)
+    output = str(tmp_path / "out.wav")
+    convert_wav(source, output)
+    assert read_wav(output)[1] == int16_frames(0, 127 << 8, -128 << 8, 256)
+
+
+def test_same_format_is_copied(tmp_path):
+    frames = int16_frames(5, -5, 7, -7)
+    source = write_wav(tmp_path / "in.wav", 2, frames)
+    output = str(tmp_path / "out.wav")
+    convert_wav(source, output)
+    assert read_wav(output) == (PcmFormat(8000, 2, 2), frames)
+
+
+def test_truncated_frame_is_dropped(tmp_path):
+    source = write_wav(tmp_path / "in.wav", 2, int16_frames(1, 2, 3),
+                       channels=2)
+    assert read_wav(source)[1] == int16_frames(1, 2)
+
+
+def test_unsupported_sources_leave_the_output_alone(tmp_path):
+    source = tmp_path / "in.wav"
+    source.write_bytes(b"not a wav file at all")
+    output = tmp_path / "out.wav"
+    with pytest.raises(UnsupportedWav):
+        convert_wav(str(source), str(output))
+    with pytest.raises(UnsupportedWav):
+        convert_wav(write_wav(tmp_path / "ok.wav", 2, int16_frames(1, 2)),
+                    str(output), sample_width=5)
+    assert not output.exists()
+
+
+def test_wav_duration(tmp_path):
+    source = write_wav(tmp_path / "in.wav", 2, int16_frames(*[0] * 8000),
+                       channels=1)
+    assert wav_duration(source) == 1.0
+    (tmp_path / "bad.wav").write_bytes(b"RIFF")
+    assert wav_duration(str(tmp_path / "bad.wav")) is None
+    assert wav_duration(str(tmp_path / "missing.wav")) is None
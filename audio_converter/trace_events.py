@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+#
+# Chrome trace-event recording of conversion batches
+
+"""Trace events
+
+Records where a batch spends its time — probing, command building, FFmpeg
+child processes, staging, UI updates — as spans that can be saved in the
+Chrome trace‑event format and opened in ``chrome://tracing`` or Perfetto.
+
+Each span is drawn on a *lane*.  Jobs of a batch run on
+:func:`worker_lane` s numbered from 1, so concurrent jobs never share a
+lane and idle workers show up as gaps; work outside a job (the Tk thread,
+the batch itself, executor threads) is drawn on one lane per thread.  A
+counter track plots the number of busy workers.
+
+Tracing is off unless :func:`start_tracing` was called; :func:`span` and
+the other helpers then cost a single global lookup.
+"""
+
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+#: Process id written to every event (the trace holds one process).
+TRACE_PID = 1
+
+#: First lane of per‑thread spans; worker lanes count up from 1.
+THREAD_LANE_BASE = 1000
+
+_worker: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "trace_worker", default=None)
+
+
+class Tracer:
+    """Collects the spans of one batch."""
+
+    def __init__(self) -> None:
+        self._origin = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        self._lane_names: Dict[int, str] = {}
+        self._thread_lanes: Dict[int, int] = {}
+        self._busy: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def timestamp(self) -> float:
+        """Return the current time in µs since the tracer was created."""
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def lane(self) -> int:
+        """Return the lane of the calling job, or of the calling thread."""
+        worker = _worker.get()
+        if worker is not None:
+            return worker
+        ident = threading.get_ident()
+        with self._lock:
+            lane = self._thread_lanes.get(ident)
+            if lane is None:
+                lane = THREAD_LANE_BASE + len(self._thread_lanes)
+                self._thread_lanes[ident] = lane
+                self._lane_names[lane] = threading.current_thread().name
+        return lane
+
+    def add_span(self, name: str, category: str, start: float, end: float,
+                 lane: int, args: Dict[str, Any]) -> None:
+        """Record a finished span (times from :meth:`timestamp`)."""
+        event = {"name": name, "cat": category, "ph": "X", "ts": start,
+                 "dur": max(0.0, end - start), "pid": TRACE_PID,
+                 "tid": lane}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+
+    def add_counter(self, name: str, **values: float) -> None:
+        """Record the current *values* of the counter track *name*."""
+        event = {"name": name, "ph": "C", "ts": self.timestamp(),
+                 "pid": TRACE_PID, "args": values}
+        with self._lock:
+            self._events.append(event)
+
+    def acquire_worker(self) -> int:
+        """Return the lowest idle worker lane and mark it busy."""
+        with self._lock:
+            lane = 1
+            while lane in self._busy:
+                lane += 1
+            self._busy.add(lane)
+            self._lane_names.setdefault(lane, f"worker {lane}")
+            busy = len(self._busy)
+        self.add_counter("workers", busy=busy)
+        return lane
+
+    def release_worker(self, lane: int) -> None:
+        """Mark the worker lane *lane* idle again."""
+        with self._lock:
+            self._busy.discard(lane)
+            busy = len(self._busy)
+        self.add_counter("workers", busy=busy)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the trace as a Chrome trace‑event JSON object."""
+        with self._lock:
+            events = list(self._events)
+            names = dict(self._lane_names)
+        metadata = [{"name": "process_name", "ph": "M", "pid": TRACE_PID,
+                     "args": {"name": "audio_converter"}}]
+        for lane, name in sorted(names.items()):
+            metadata.append({"name": "thread_name", "ph": "M",
+                             "pid": TRACE_PID, "tid": lane,
+                             "args": {"name": name}})
+            metadata.append({"name": "thread_sort_index", "ph": "M",
+                             "pid": TRACE_PID, "tid": lane,
+                             "args": {"sort_index": lane}})
+        return {"traceEvents": metadata + events,
+                "displayTimeUnit": "ms"}
+
+    def save(self, path: str) -> None:
+        """Atomically write the trace to *path*."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as stream:
+            json.dump(self.to_dict(), stream)
+        os.replace(tmp_path, path)
+
+
+_active: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    """Start recording into a new :class:`Tracer` and return it."""
+    global _active
+    _active = Tracer()
+    return _active
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop recording; return the tracer that was active, if any."""
+    global _active
+    tracer, _active = _active, None
+    return tracer
+
+
+def active_tracer() -> Optional[Tracer]:
+    """Return the tracer currently recording, or ``None``."""
+    return _active
+
+
+@contextmanager
+def span(name: str, category: str = "convert",
+         **args: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Record the enclosed block as a span.
+
+    Yields the span's *args*, which the block may extend (e.g. with a
+    child's pid); a span left by an exception notes its type.
+    """
+    tracer = _active
+    if tracer is None:
+        yield args
+        return
+    lane = tracer.lane()
+    start = tracer.timestamp()
+    try:
+        yield args
+    except BaseException as exc:
+        args["error"] = type(exc).__name__
+        raise
+    finally:
+        tracer.add_span(name, category, start, tracer.timestamp(), lane,
+                        args)
+
+
+@contextmanager
+def worker_lane() -> Iterator[None]:
+    """Run the enclosed job on an idle worker lane."""
+    tracer = _active
+    if tracer is None:
+        yield
+        return
+    lane = tracer.acquire_worker()
+    token = _worker.set(lane)
+    try:
+        yield
+    finally:
+        _worker.reset(token)
+        tracer.release_worker(lane)
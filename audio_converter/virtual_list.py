@@ -0,0 +1,480 @@
+#!/usr/bin/env python
+#
+# Virtualized, sortable and filterable list widget
+
+"""Virtual list
+
+A canvas‑backed list that keeps every row in plain Python structures and
+only materializes the rows currently visible.  Inserting, deleting,
+sorting or filtering tens of thousands of rows therefore costs a handful
+of Tk calls instead of one per row.
+"""
+
+
+import bisect
+import itertools
+import tkinter as tk
+from typing import (Any, Callable, Dict, Hashable, Iterable, List, Optional,
+                    Sequence, Set, Tuple)
+
+import ttkbootstrap as ttk
+
+Row = Dict[str, Any]
+
+
+def _clip(text: str, width: int) -> str:
+    """Shorten *text* to roughly fit *width* pixels of 10pt text."""
+    limit = max(1, width // 7)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class Column:
+    """Description of one list column."""
+
+    def __init__(self, key: str, heading: str, width: int,
+                 anchor: str = tk.W,
+                 formatter: Callable[[Any], str] = str) -> None:
+        """
+        Parameters
+        ----------
+        key:
+            Row field displayed (and sorted on) in this column.
+        heading:
+            Column title.
+        width:
+            Column width in pixels; the last column stretches.
+        anchor:
+            Text anchor inside the cell (``tk.W`` or ``tk.E``).
+        formatter:
+            Turns the raw field value into display text.
+        """
+        self.key = key
+        self.heading = heading
+        self.width = width
+        self.anchor = anchor
+        self.formatter = formatter
+
+
+class VirtualList(ttk.Frame):
+    """Scrollable multi‑column list that only draws visible rows."""
+
+    ROW_HEIGHT = 22
+    PADDING = 6
+
+    def __init__(self, master: tk.Misc, columns: Sequence[Column],
+                 **kwargs: Any) -> None:
+        super().__init__(master, **kwargs)
+        self.columns = list(columns)
+
+        # Model: all rows by key, plus the filtered & sorted view order
+        self._rows: Dict[Hashable, Row] = {}
+        self._view: List[Hashable] = []
+        self._sort_values: List[Tuple[Any, ...]] = []
+        self._view_values: Dict[Hashable, Tuple[Any, ...]] = {}
+        self._sequence: Dict[Hashable, int] = {}
+        self._counter = itertools.count()
+        self._sort_column: Optional[str] = None
+        self._sort_reverse = False
+        self._filter: Optional[Callable[[Row], bool]] = None
+        self._selection: Set[Hashable] = set()
+        self._anchor: Optional[int] = None
+        self._top = 0
+
+        # Canvas item pool, one entry per visible slot
+        self._slots: List[Tuple[int, List[int]]] = []
+        self._render_pending = False
+
+        colors = ttk.Style().colors
+        self._colors = {
+            "bg": colors.inputbg,
+            "alt": colors.bg,
+            "fg": colors.inputfg,
+            "select_bg": colors.selectbg,
+            "select_fg": colors.selectfg,
+            "header_bg": colors.secondary,
+            "header_fg": colors.selectfg,
+        }
+
+        self._build()
+
+    # --------------------------------------------------------------------- #
+    # Widgets
+    # --------------------------------------------------------------------- #
+
+    def _build(self) -> None:
+        # Headings share the body's x positions; click one to sort by it
+        self.header = tk.Canvas(self, highlightthickness=0,
+                                height=self.ROW_HEIGHT,
+                                background=self._colors["header_bg"])
+        self.header.pack(side=tk.TOP, fill=tk.X)
+        self._heading_items: Dict[str, int] = {}
+        for column, x in zip(self.columns, self._column_offsets()):
+            self._heading_items[column.key] = self.header.create_text(
+                self._text_x(column, x), self.ROW_HEIGHT // 2,
+                text=column.heading, anchor=column.anchor,
+                fill=self._colors["header_fg"],
+                font=("Helvetica", 10, "bold"))
+        self.header.bind("<Button-1>", self._on_heading_click)
+
+        body = ttk.Frame(self)
+        body.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(body, highlightthickness=0,
+                                background=self._colors["bg"],
+                                height=6 * self.ROW_HEIGHT)
+        self.scrollbar = ttk.Scrollbar(body, orient="vertical",
+                                       command=self._on_scrollbar)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.canvas.bind("<Configure>", lambda _e: self.refresh())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Shift-Button-1>", self._on_shift_click)
+        self.canvas.bind("<Control-Button-1>", self._on_control_click)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda _e: self.scroll(-3))
+        self.canvas.bind("<Button-5>", lambda _e: self.scroll(3))
+        self.canvas.bind("<Up>", lambda _e: self._move_selection(-1))
+        self.canvas.bind("<Down>", lambda _e: self._move_selection(1))
+        self.canvas.bind("<Control-a>", lambda _e: self.select_all())
+
+    def _column_offsets(self) -> List[int]:
+        offsets, x = [], self.PADDING
+        for column in self.columns:
+            offsets.append(x)
+            x += column.width
+        return offsets
+
+    def _text_x(self, column: Column, x: int) -> int:
+        return x + column.width - 2 * self.PADDING if column.anchor == tk.E \
+            else x
+
+    def _on_heading_click(self, event: tk.Event) -> None:
+        for column, x in zip(self.columns, self._column_offsets()):
+            if event.x < x + column.width or column is self.columns[-1]:
+                self.sort_by(column.key)
+                return
+
+    def bind_row(self, sequence: str,
+                 callback: Callable[[tk.Event, Optional[Hashable]], None]
+                 ) -> None:
+        """Call *callback(event, key)* for *sequence* on a row."""
+        self.canvas.bind(sequence, lambda event: callback(
+            event, self._key_at(event.y)))
+
+    # --------------------------------------------------------------------- #
+    # Model operations
+    # --------------------------------------------------------------------- #
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def visible_count(self) -> int:
+        """Number of rows passing the current filter."""
+        return len(self._view)
+
+    def keys(self) -> List[Hashable]:
+        """Return the keys of the filtered rows in display order."""
+        return list(self._display_order())
+
+    def row(self, key: Hashable) -> Row:
+        """Return the field dictionary of *key*."""
+        return self._rows[key]
+
+    def insert(self, rows: Iterable[Tuple[Hashable, Row]]) -> None:
+        """Add or replace rows without rebuilding the list."""
+        for key, row in rows:
+            self._remove_from_view(key)
+            if key not in self._rows:
+                self._sequence[key] = next(self._counter)
+            self._rows[key] = row
+            if self._filter is None or self._filter(row):
+                self._add_to_view(key, row)
+        self.refresh()
+
+    def update_row(self, key: Hashable, **fields: Any) -> None:
+        """Update some fields of an existing row."""
+        row = self._rows.get(key)
+        if row is None:
+            return
+        row.update(fields)
+        visible = self._filter is None or self._filter(row)
+        if (visible != (key in self._view_values)
+                or (visible and self._sort_column in fields)):
+            self._remove_from_view(key)
+            if visible:
+                self._add_to_view(key, row)
+        self.refresh()
+
+    def delete(self, keys: Iterable[Hashable]) -> None:
+        """Remove the rows of *keys*."""
+        doomed = {key for key in keys if key in self._rows}
+        if not doomed:
+            return
+        for key in doomed:
+            del self._rows[key]
+            del self._sequence[key]
+            self._view_values.pop(key, None)
+        keep = [i for i, key in enumerate(self._view) if key not in doomed]
+        self._view = [self._view[i] for i in keep]
+        self._sort_values = [self._sort_values[i] for i in keep]
+        self._selection -= doomed
+        self._anchor = None
+        self.refresh()
+
+    def clear(self) -> None:
+        """Remove every row."""
+        self._rows.clear()
+        self._sequence.clear()
+        self._view.clear()
+        self._sort_values.clear()
+        self._view_values.clear()
+        self._selection.clear()
+        self._anchor = None
+        self._top = 0
+        self.refresh()
+
+    def sort_by(self, column: Optional[str],
+                reverse: Optional[bool] = None) -> None:
+        """
+        Sort by *column*; ``None`` restores insertion order.
+
+        Without *reverse*, sorting by the current column again toggles the
+        direction.
+        """
+        if reverse is None:
+            reverse = (column == self._sort_column
+                       and not self._sort_reverse)
+        self._sort_column = column
+        self._sort_reverse = reverse
+        self._rebuild_view()
+        for item in self.columns:
+            arrow = ""
+            if item.key == self._sort_column:
+                arrow = " ▼" if self._sort_reverse else " ▲"
+            self.header.itemconfigure(self._heading_items[item.key],
+                                      text=item.heading + arrow)
+
+    def set_filter(self, predicate: Optional[Callable[[Row], bool]]) -> None:
+        """Only show rows for which *predicate* is true (``None``: all)."""
+        self._filter = predicate
+        self._rebuild_view()
+
+    def _sort_value(self, key: Hashable, row: Row) -> Tuple[Any, ...]:
+        """Return the ascending sort key of *row* (insertion order breaks ties)."""
+        sequence = self._sequence[key]
+        if self._sort_column is None:
+            return (sequence,)
+        value = row.get(self._sort_column)
+        if isinstance(value, str):
+            value = value.lower()
+        # None sorts last regardless of the value type
+        return (value is None, value if value is not None else 0, sequence)
+
+    def _rebuild_view(self) -> None:
+        # Always stored ascending so bisect keeps working; a descending sort
+        # is handled by _display_index()
+        decorated = sorted(
+            (self._sort_value(key, row), key)
+            for key, row in self._rows.items()
+            if self._filter is None or self._filter(row))
+        self._sort_values = [value for value, _ in decorated]
+        self._view = [key for _, key in decorated]
+        self._view_values = dict(zip(self._view, self._sort_values))
+        self._selection &= self._view_values.keys()
+        self._anchor = None
+        self._top = 0
+        self.refresh()
+
+    def _add_to_view(self, key: Hashable, row: Row) -> None:
+        value = self._sort_value(key, row)
+        index = bisect.bisect_right(self._sort_values, value)
+        self._sort_values.insert(index, value)
+        self._view.insert(index, key)
+        self._view_values[key] = value
+
+    def _remove_from_view(self, key: Hashable) -> None:
+        value = self._view_values.pop(key, None)
+        if value is None:
+            return
+        index = bisect.bisect_left(self._sort_values, value)
+        del self._sort_values[index]
+        del self._view[index]
+
+    def _display_index(self, index: int) -> int:
+        """Map a display position to a position in ``_view``."""
+        if self._sort_reverse and self._sort_column is not None:
+            return len(self._view) - 1 - index
+        return index
+
+    def _display_order(self) -> Iterable[Hashable]:
+        if self._sort_reverse and self._sort_column is not None:
+            return reversed(self._view)
+        return self._view
+
+    # --------------------------------------------------------------------- #
+    # Selection
+    # --------------------------------------------------------------------- #
+
+    def selection(self) -> List[Hashable]:
+        """Return the selected keys in display order."""
+        return [key for key in self._display_order()
+                if key in self._selection]
+
+    def select_all(self) -> None:
+        """Select every visible row."""
+        self._selection = set(self._view)
+        self.refresh()
+
+    def _key_at(self, y: int) -> Optional[Hashable]:
+        index = self._index_at(y)
+        if index is None:
+            return None
+        return self._view[self._display_index(index)]
+
+    def _index_at(self, y: int) -> Optional[int]:
+        index = self._top + int(self.canvas.canvasy(y)) // self.ROW_HEIGHT
+        return index if 0 <= index < len(self._view) else None
+
+    def _on_click(self, event: tk.Event) -> None:
+        self.canvas.focus_set()
+        index = self._index_at(event.y)
+        self._selection.clear()
+        if index is not None:
+            self._selection.add(self._view[self._display_index(index)])
+            self._anchor = index
+        self.refresh()
+
+    def _on_control_click(self, event: tk.Event) -> None:
+        index = self._index_at(event.y)
+        if index is None:
+            return
+        self._selection ^= {self._view[self._display_index(index)]}
+        self._anchor = index
+        self.refresh()
+
+    def _on_shift_click(self, event: tk.Event) -> None:
+        index = self._index_at(event.y)
+        if index is None:
+            return
+        anchor = self._anchor if self._anchor is not None else index
+        low, high = sorted((anchor, index))
+        self._selection = {self._view[self._display_index(i)]
+                           for i in range(low, high + 1)}
+        self.refresh()
+
+    def _move_selection(self, delta: int) -> None:
+        if not self._view:
+            return
+        current = self._anchor if self._anchor is not None else -delta
+        index = min(max(current + delta, 0), len(self._view) - 1)
+        self._selection = {self._view[self._display_index(index)]}
+        self._anchor = index
+        self.see(index)
+        self.refresh()
+
+    # --------------------------------------------------------------------- #
+    # Scrolling & rendering
+    # --------------------------------------------------------------------- #
+
+    @property
+    def page_size(self) -> int:
+        """Number of rows fitting in the canvas."""
+        return max(1, self.canvas.winfo_height() // self.ROW_HEIGHT)
+
+    def visible_keys(self) -> List[Hashable]:
+        """Return the keys of the rows currently on screen."""
+        end = min(len(self._view), self._top + self.page_size + 1)
+        return [self._view[self._display_index(i)]
+                for i in range(self._top, end)]
+
+    def scroll(self, rows: int) -> None:
+        """Scroll by *rows* (negative: up)."""
+        self._set_top(self._top + rows)
+
+    def see(self, index: int) -> None:
+        """Scroll so the row at display position *index* is visible."""
+        if index < self._top:
+            self._set_top(index)
+        elif index >= self._top + self.page_size:
+            self._set_top(index - self.page_size + 1)
+
+    def _set_top(self, top: int) -> None:
+        top = max(0, min(top, len(self._view) - self.page_size))
+        if top != self._top:
+            self._top = top
+            self.refresh()
+
+    def _on_scrollbar(self, *args: str) -> None:
+        if args[0] == "moveto":
+            self._set_top(int(float(args[1]) * len(self._view)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.page_size
+            self.scroll(amount)
+
+    def _on_mousewheel(self, event: tk.Event) -> None:
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def refresh(self) -> None:
+        """Schedule a redraw of the visible rows (coalesced)."""
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _ensure_slots(self, count: int) -> None:
+        width = max(self.canvas.winfo_width(), 1)
+        while len(self._slots) < count:
+            y = len(self._slots) * self.ROW_HEIGHT
+            background = self.canvas.create_rectangle(
+                0, y, width, y + self.ROW_HEIGHT, width=0)
+            texts = [
+                self.canvas.create_text(
+                    self._text_x(column, x), y + self.ROW_HEIGHT // 2,
+                    anchor=column.anchor, font=("Helvetica", 10))
+                for column, x in zip(self.columns, self._column_offsets())
+            ]
+            self._slots.append((background, texts))
+
+    def _render(self) -> None:
+        self._render_pending = False
+        self._top = max(0, min(self._top, len(self._view) - self.page_size))
+        count = self.page_size + 1
+        self._ensure_slots(count)
+        width = max(self.canvas.winfo_width(), 1)
+
+        for slot, (background, texts) in enumerate(self._slots):
+            index = self._top + slot
+            if slot >= count or index >= len(self._view):
+                self.canvas.itemconfigure(background, state=tk.HIDDEN)
+                for text in texts:
+                    self.canvas.itemconfigure(text, state=tk.HIDDEN)
+                continue
+
+            key = self._view[self._display_index(index)]
+            row = self._rows[key]
+            selected = key in self._selection
+            fill = (self._colors["select_bg"] if selected
+                    else self._colors["alt"] if index % 2
+                    else self._colors["bg"])
+            y = slot * self.ROW_HEIGHT
+            self.canvas.coords(background, 0, y, width, y + self.ROW_HEIGHT)
+            self.canvas.itemconfigure(background, fill=fill,
+                                      state=tk.NORMAL)
+            foreground = (self._colors["select_fg"] if selected
+                          else self._colors["fg"])
+            for column, text in zip(self.columns, texts):
+                value = column.formatter(row.get(column.key))
+                if column is not self.columns[-1]:
+                    value = _clip(value, column.width)
+                self.canvas.itemconfigure(text, text=value, fill=foreground,
+                                          state=tk.NORMAL)
+
+        total = len(self._view)
+        if total:
+            self.scrollbar.set(self._top / total,
+                               min(1.0, (self._top + self.page_size) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.event_generate("<<VirtualListRendered>>")
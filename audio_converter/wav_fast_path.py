@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+#
+# In-process PCM WAV conversion without spawning FFmpeg
+
+"""WAV fast path
+
+Converts integer PCM WAV files to WAV entirely in process with the
+standard :mod:`wave` module and NumPy, keeping the sample rate and
+channels just as FFmpeg does: only the sample format (bit depth) is
+converted, vectorized over the whole clip.  For the thousands of short
+clips typical of sample libraries, starting an FFmpeg process costs far
+more than the conversion itself.
+
+Anything this path does not handle raises :class:`UnsupportedWav` before
+the output is touched, so the caller can fall back to FFmpeg:
+
+* NumPy is not installed;
+* the source is not a WAV file the :mod:`wave` module can read (e.g.
+  floating‑point or ``WAVE_FORMAT_EXTENSIBLE`` files);
+* the source is larger than :data:`MAX_SOURCE_BYTES`, where spawning
+  FFmpeg no longer matters and streaming beats loading the clip.
+"""
+
+
+import os
+import wave
+from typing import Any, Optional, Tuple
+
+#: NumPy, imported on first use by :func:`available` so that importing
+#: this module (and the command‑line front end) stays cheap.
+np: Any = None
+
+#: Larger sources are left to FFmpeg.
+MAX_SOURCE_BYTES = 64 * 1024 * 1024
+
+#: ``wave`` sample widths (bytes) and the FFmpeg codec each one is.
+PCM_CODECS = {1: "pcm_u8", 2: "pcm_s16le", 3: "pcm_s24le", 4: "pcm_s32le"}
+
+
+class UnsupportedWav(Exception):
+    """Raised when a conversion must be left to FFmpeg."""
+
+
+class PcmFormat:
+    """Sample rate, channel count and sample width (bytes) of PCM audio."""
+
+    def __init__(self, sample_rate: int, channels: int,
+                 sample_width: int) -> None:
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, PcmFormat)
+                and (self.sample_rate, self.channels, self.sample_width)
+                == (other.sample_rate, other.channels, other.sample_width))
+
+    def __repr__(self) -> str:
+        return (f"PcmFormat({self.sample_rate}, {self.channels}, "
+                f"{self.sample_width})")
+
+
+def available() -> bool:
+    """Return ``True`` if the fast path can be used at all (NumPy found)."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # the fast path is optional
+            return False
+        np = numpy
+    return True
+
+
+# ------------------------------------------------------------------------- #
+# Sample decoding and encoding
+# ------------------------------------------------------------------------- #
+
+def decode_samples(frames: bytes, sample_width: int,
+                   channels: int) -> "np.ndarray":
+    """
+    Return ``(frames, channels)`` int32 samples scaled to the full 32‑bit
+    range, whatever the input width.
+    """
+    if sample_width == 1:  # unsigned
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.int32)
+                   - 128) << 24
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.int32) << 16
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        samples = ((raw[:, 0].astype(np.int32) << 8)
+                   | (raw[:, 1].astype(np.int32) << 16)
+                   | (raw[:, 2].astype(np.int32) << 24))
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.int32)
+    else:
+        raise UnsupportedWav(f"{sample_width * 8}-bit samples")
+    return samples.reshape(-1, channels)
+
+
+def encode_samples(samples: "np.ndarray", sample_width: int) -> bytes:
+    """
+    Inverse of :func:`decode_samples`.
+
+    Extra bits are dropped (no rounding or dither), which gives the same
+    samples as FFmpeg's default sample‑format conversion.
+    """
+    flat = samples.reshape(-1) >> (32 - 8 * sample_width)
+    if sample_width == 1:
+        return (flat + 128).astype(np.uint8).tobytes()
+    if sample_width == 2:
+        return flat.astype("<i2").tobytes()
+    if sample_width == 3:
+        return (flat.astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3]
+                .tobytes())
+    return flat.astype("<i4").tobytes()
+
+
+# ------------------------------------------------------------------------- #
+# Files
+# ------------------------------------------------------------------------- #
+
+def read_wav(path: str) -> Tuple[PcmFormat, bytes]:
+    """
+    Return the format and raw frames of the PCM WAV file at *path*.
+
+    Raises
+    ------
+    UnsupportedWav
+        If the file is too large or not a WAV :mod:`wave` understands.
+    """
+    try:
+        if os.path.getsize(path) > MAX_SOURCE_BYTES:
+            raise UnsupportedWav("file too large for the fast path")
+        with wave.open(path, "rb") as reader:
+            pcm = PcmFormat(reader.getframerate(), reader.getnchannels(),
+                            reader.getsampwidth())
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError) as exc:
+        raise UnsupportedWav(str(exc)) from exc
+    if pcm.sample_width not in PCM_CODECS:
+        raise UnsupportedWav(f"{pcm.sample_width * 8}-bit samples")
+    # A truncated file may end in the middle of a frame
+    frame_size = pcm.sample_width * pcm.channels
+    return pcm, frames[:len(frames) - len(frames) % frame_size]
+
+
+def wav_duration(path: str) -> Optional[float]:
+    """Return the duration of a WAV file from its header, or ``None``."""
+    try:
+        with wave.open(path, "rb") as reader:
+            return reader.getnframes() / reader.getframerate()
+    except (OSError, wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+def convert_wav(source_file: str, output_file: str,
+                sample_width: int = 2) -> PcmFormat:
+    """
+    Write *source_file* to *output_file* as PCM WAV with *sample_width*
+    bytes per sample, in process.  Returns the source format.
+
+    Raises
+    ------
+    UnsupportedWav
+        If the conversion must be done by FFmpeg; nothing is written then.
+    OSError
+        If a file cannot be read or written.
+    """
+    if not available():
+        raise UnsupportedWav("NumPy is not installed")
+    if sample_width not in PCM_CODECS:
+        raise UnsupportedWav(f"{sample_width * 8}-bit output")
+    source, frames = read_wav(source_file)
+    target = PcmFormat(source.sample_rate, source.channels, sample_width)
+
+    if target != source:
+        samples = decode_samples(frames, source.sample_width,
+                                 source.channels)
+        frames = encode_samples(samples, target.sample_width)
+
+    with wave.open(output_file, "wb") as writer:
+        writer.setnchannels(target.channels)
+        writer.setsampwidth(target.sample_width)
+        writer.setframerate(target.sample_rate)
+        writer.writeframes(frames)
+    return source
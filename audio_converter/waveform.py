@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+#
+# Waveform thumbnails of source files
+
+"""Waveform
+
+Compact waveform thumbnails for the file list, so silent or clipped files
+stand out without opening each one in a player.
+
+FFmpeg decodes the source to 16‑bit PCM on a pipe; the samples are read
+in fixed‑size chunks and reduced with NumPy to per‑chunk minima and
+maxima of small blocks.  Whenever the reduced series reaches twice the
+thumbnail width, neighbouring blocks are merged pairwise, so memory stays
+constant however long the file is and its length need not be known up
+front.
+
+Thumbnails are cached in SQLite keyed by the source's identity (path,
+size, mtime) and generated on a small pool only for the rows that
+:class:`WaveformGenerator` is currently asked for, i.e. the visible ones.
+"""
+
+
+import json
+import math
+import os
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Set, Tuple)
+
+try:
+    import numpy as np
+except ImportError:  # thumbnails are optional
+    np = None
+
+from app_paths import user_cache_dir
+from media_probe import file_identity
+
+WAVEFORM_CACHE_NAME = "waveform_cache.sqlite3"
+
+#: Bins (characters) of a thumbnail.
+WAVEFORM_BINS = 16
+
+#: Interleaved 16‑bit samples read from FFmpeg at a time.
+CHUNK_SAMPLES = 16384
+
+#: Samples per bin before any merging; the resolution of short clips.
+BLOCK_SAMPLES = 256
+
+#: Concurrent FFmpeg decodes used by :class:`WaveformGenerator`.
+DEFAULT_WAVEFORM_WORKERS = 2
+
+#: Peaks at or above this level (just below full scale) count as clipped.
+CLIP_LEVEL = 32767 / 32768
+
+#: Peaks below this level (−60 dBFS) count as silence.
+SILENCE_LEVEL = 0.001
+
+#: Level range (dB below full scale) spanned by the sparkline glyphs.
+DISPLAY_RANGE_DB = 48
+
+#: Sparkline glyphs from silence to full scale.
+LEVELS = " ▁▂▃▄▅▆▇█"
+
+
+def available() -> bool:
+    """Return ``True`` if thumbnails can be computed at all (NumPy found)."""
+    return np is not None
+
+
+class Waveform:
+    """
+    Per‑bin sample minima and maxima of a file, scaled to [−1, 1].
+
+    Waveforms order by their peak, so sorting the list by this column puts
+    silent files first and clipped ones last.
+    """
+
+    def __init__(self, minima: List[float], maxima: List[float]) -> None:
+        self.minima = minima
+        self.maxima = maxima
+
+    @property
+    def peaks(self) -> List[float]:
+        """Absolute peak level of every bin."""
+        return [max(abs(low), abs(high))
+                for low, high in zip(self.minima, self.maxima)]
+
+    @property
+    def peak(self) -> float:
+        """Absolute peak level of the whole file."""
+        return max(self.peaks, default=0.0)
+
+    @property
+    def clipped(self) -> bool:
+        """``True`` if some sample reaches full scale."""
+        return self.peak >= CLIP_LEVEL
+
+    @property
+    def silent(self) -> bool:
+        """``True`` if no sample rises above :data:`SILENCE_LEVEL`."""
+        return self.peak < SILENCE_LEVEL
+
+    def sparkline(self) -> str:
+        """
+        Return the bin peaks as a row of block characters on a dB scale;
+        silent bins are blank.
+        """
+        top = len(LEVELS) - 1
+        glyphs = []
+        for level in self.peaks:
+            if level < SILENCE_LEVEL:
+                glyphs.append(LEVELS[0])
+                continue
+            height = 1 + 20 * math.log10(level) / DISPLAY_RANGE_DB
+            glyphs.append(LEVELS[max(1, min(top, math.ceil(height * top)))])
+        return "".join(glyphs)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Waveform):
+            return NotImplemented
+        return self.peak == other.peak
+
+    def __lt__(self, other: "Waveform") -> bool:
+        return self.peak < other.peak
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the bins as a JSON‑serialisable dictionary."""
+        return {"minima": self.minima, "maxima": self.maxima}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Waveform":
+        """Inverse of :meth:`to_dict`."""
+        return cls(list(data["minima"]), list(data["maxima"]))
+
+
+# ------------------------------------------------------------------------- #
+# Streaming reduction
+# ------------------------------------------------------------------------- #
+
+def waveform_command(source_file: str) -> List[str]:
+    """Return the FFmpeg command decoding *source_file* to raw PCM."""
+    return ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error",
+            "-i", source_file, "-map", "0:a:0", "-vn",
+            "-f", "s16le", "-acodec", "pcm_s16le", "-"]
+
+
+def read_chunks(stream: Any, chunk_samples: int = CHUNK_SAMPLES
+                ) -> Iterator["np.ndarray"]:
+    """Yield the 16‑bit samples of *stream* in arrays of fixed size."""
+    size = 2 * chunk_samples
+    while True:
+        data = stream.read(size)
+        if not data:
+            return
+        # A truncated stream may end in the middle of a sample
+        yield np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2")
+
+
+class PeakReducer:
+    """
+    Running per‑bin minima and maxima of a sample stream.
+
+    Samples are reduced in blocks of *span* samples; whenever
+    ``2 * bins`` blocks have accumulated, neighbours are merged and the
+    span doubles.  An unfinished block is kept as its minimum, maximum and
+    sample count only.
+    """
+
+    def __init__(self, bins: int = WAVEFORM_BINS,
+                 block_samples: int = BLOCK_SAMPLES) -> None:
+        self.bins = bins
+        self.span = block_samples
+        self._lows = np.empty(0, dtype=np.int32)
+        self._highs = np.empty(0, dtype=np.int32)
+        self._tail_low = self._tail_high = self._tail_count = 0
+
+    def _fold_tail(self, low: int, high: int, count: int) -> None:
+        if self._tail_count:
+            low = min(low, self._tail_low)
+            high = max(high, self._tail_high)
+        self._tail_low, self._tail_high = low, high
+        self._tail_count += count
+
+    def add(self, samples: "np.ndarray") -> None:
+        """Reduce the next *samples* of the stream."""
+        if self._tail_count and len(samples):
+            head = samples[:self.span - self._tail_count]
+            samples = samples[len(head):]
+            self._fold_tail(int(head.min()), int(head.max()), len(head))
+            if self._tail_count < self.span:
+                return
+            self._lows = np.append(self._lows, self._tail_low)
+            self._highs = np.append(self._highs, self._tail_high)
+            self._tail_count = 0
+        full = len(samples) - len(samples) % self.span
+        if full:
+            blocks = samples[:full].reshape(-1, self.span)
+            self._lows = np.concatenate((self._lows, blocks.min(axis=1)))
+            self._highs = np.concatenate((self._highs, blocks.max(axis=1)))
+        if full < len(samples):
+            rest = samples[full:]
+            self._fold_tail(int(rest.min()), int(rest.max()), len(rest))
+
+        while len(self._lows) >= 2 * self.bins:
+            if len(self._lows) % 2:  # half a merged block
+                self._fold_tail(int(self._lows[-1]), int(self._highs[-1]),
+                                self.span)
+                self._lows, self._highs = self._lows[:-1], self._highs[:-1]
+            self._lows = self._lows.reshape(-1, 2).min(axis=1)
+            self._highs = self._highs.reshape(-1, 2).max(axis=1)
+            self.span *= 2
+
+    def result(self) -> Tuple[List[int], List[int]]:
+        """
+        Return the minima and maxima of at most *bins* bins.
+
+        Clips shorter than *bins* blocks give one bin per block.
+        """
+        lows, highs = self._lows, self._highs
+        if self._tail_count:
+            lows = np.append(lows, self._tail_low)
+            highs = np.append(highs, self._tail_high)
+        if len(lows) > self.bins:
+            bounds = np.linspace(0, len(lows), self.bins + 1).astype(int)
+            lows = np.minimum.reduceat(lows, bounds[:-1])
+            highs = np.maximum.reduceat(highs, bounds[:-1])
+        return lows.tolist(), highs.tolist()
+
+
+def compute_waveform(source_file: str, bins: int = WAVEFORM_BINS,
+                     on_start: Optional[Callable[[subprocess.Popen], None]]
+                     = None) -> Optional[Waveform]:
+    """
+    Decode *source_file* and return its :class:`Waveform`, or ``None``
+    if NumPy or FFmpeg is missing or the file has no decodable audio.
+
+    *on_start(process)* is called with the FFmpeg child once it runs, so
+    the caller can kill it.
+    """
+    if np is None:
+        return None
+    try:
+        process = subprocess.Popen(
+            waveform_command(source_file), stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        return None
+    if on_start is not None:
+        on_start(process)
+    reducer = PeakReducer(bins)
+    with process:
+        for chunk in read_chunks(process.stdout):
+            reducer.add(chunk)
+    minima, maxima = reducer.result()
+    if process.returncode or not minima:
+        return None
+    return Waveform([low / 32768 for low in minima],
+                    [high / 32768 for high in maxima])
+
+
+# ------------------------------------------------------------------------- #
+# Persistent cache
+# ------------------------------------------------------------------------- #
+
+class WaveformCache:
+    """SQLite cache of :class:`Waveform` keyed by (path, size, mtime)."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(user_cache_dir(),
+                                         WAVEFORM_CACHE_NAME)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS waveforms ("
+            " path TEXT NOT NULL, bins INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " waveform TEXT NOT NULL, PRIMARY KEY (path, bins))")
+
+    def get(self, identity: Tuple[str, int, int],
+            bins: int = WAVEFORM_BINS) -> Optional[Waveform]:
+        """Return the cached waveform of *identity* if it is still current."""
+        path, size, mtime_ns = identity
+        with self._lock:
+            row = self._db.execute(
+                "SELECT waveform FROM waveforms WHERE path = ? AND "
+                "bins = ? AND size = ? AND mtime_ns = ?",
+                (path, bins, size, mtime_ns)).fetchone()
+        if row is None:
+            return None
+        return Waveform.from_dict(json.loads(row[0]))
+
+    def put(self, identity: Tuple[str, int, int], waveform: Waveform,
+            bins: int = WAVEFORM_BINS) -> None:
+        """Store *waveform* for *identity*, replacing stale entries."""
+        path, size, mtime_ns = identity
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO waveforms VALUES (?, ?, ?, ?, ?)",
+                (path, bins, size, mtime_ns,
+                 json.dumps(waveform.to_dict())))
+
+
+# ------------------------------------------------------------------------- #
+# Lazy generation
+# ------------------------------------------------------------------------- #
+
+class WaveformGenerator:
+    """
+    Compute thumbnails on a bounded pool, consulting the cache.
+
+    Only the paths of the latest :meth:`request` are wanted: queued files
+    that scrolled out of view meanwhile are skipped when their turn comes.
+    """
+
+    def __init__(self, cache: Optional[WaveformCache] = None,
+                 bins: int = WAVEFORM_BINS,
+                 max_workers: int = DEFAULT_WAVEFORM_WORKERS) -> None:
+        self.cache = cache
+        self.bins = bins
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="waveform")
+        self._lock = threading.Lock()
+        self._wanted: Set[str] = set()
+        self._queued: Set[str] = set()
+        self._processes: Set[subprocess.Popen] = set()
+
+    def waveform(self, source_file: str) -> Optional[Waveform]:
+        """Return the thumbnail of *source_file*, decoding it if not cached."""
+        identity = file_identity(source_file)
+        if identity is None:
+            return None
+        if self.cache is not None:
+            waveform = self.cache.get(identity, self.bins)
+            if waveform is not None:
+                return waveform
+        waveform = compute_waveform(source_file, self.bins,
+                                    on_start=self._started)
+        if waveform is not None and self.cache is not None:
+            self.cache.put(identity, waveform, self.bins)
+        return waveform
+
+    def _started(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+
+    def request(self, paths: Iterable[str],
+                on_result: Callable[[str, Optional[Waveform]], None]
+                ) -> None:
+        """
+        Queue the thumbnails of *paths* without blocking, superseding
+        earlier requests.
+
+        *on_result(path, waveform)* is called from a pool thread per file.
+        """
+        with self._lock:
+            self._wanted = set(paths)
+            new = self._wanted - self._queued
+            self._queued |= new
+        for path in new:
+            self._pool.submit(self._generate_and_report, path, on_result)
+
+    def _generate_and_report(self, path: str,
+                             on_result: Callable[[str, Optional[Waveform]],
+                                                 None]) -> None:
+        with self._lock:
+            wanted = path in self._wanted
+            if not wanted:
+                self._queued.discard(path)
+        if not wanted:
+            return
+        try:
+            waveform = self.waveform(path)
+        finally:
+            with self._lock:
+                self._queued.discard(path)
+                self._processes = {process for process in self._processes
+                                   if process.poll() is None}
+        on_result(path, waveform)
+
+    def shutdown(self) -> None:
+        """Drop queued thumbnails, stop running decodes, release the pool."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()